@@ -2,10 +2,25 @@ import streamlit as st
 import pandas as pd
 import datetime
 import os
+import time
 from utils.config import CONFIG
 from utils.validators import validate_slug, validate_days, validate_dates, validate_time
-from utils.data_processor import process_class_data, load_course_master_data, save_course_master_data
-from utils.export import export_to_csv
+from utils.data_processor import (
+    load_course_master_data, save_course_master_data, update_course, get_course_catalog, rollback_catalog
+)
+from utils.jobs import get_job_runner, run_export_job
+from utils.history import get_history_index
+from utils.request_store import get_request_store, REQUEST_STATUSES, CLASS_TYPES
+from utils.approval_queue import (
+    get_approval_page, page_count, collect_decisions, select_requests, bulk_transition, SORTABLE_COLUMNS
+)
+from utils.ingest import ingest_requests
+from utils.duplicates import find_duplicates
+from utils.conflicts import get_conflict_summary
+from utils.course_import import diff_course_file, preview_course_diff, apply_course_diff
+from utils.course_search import FACETS, get_course_search_index
+from utils.course_tags import get_tag_index, bulk_update_tags, split_tags
+from utils.catalog_snapshots import get_snapshot_store
 import re
 import json
 import traceback
@@ -1314,10 +1329,9 @@ if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
     st.session_state.username = ""
     st.session_state.user_role = ""
-    st.session_state.requests = pd.DataFrame(columns=[
-        'slug', 'meeting_days', 'start_date', 'end_date', 'start_time',
-        'requested_by', 'request_date', 'status'
-    ])
+
+# Class requests are shared by every session and survive restarts
+request_store = get_request_store()
 
 setup_logger()
 
@@ -1364,11 +1378,12 @@ def main():
     
     # Create tabs based on user role
     if st.session_state.user_role == 'admin':
-        tab1, tab2, tab3, tab4 = st.tabs([
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
             "Request New Class", 
             "Approve/Deny Requests", 
             "Export Data",
-            "Manage Courses"
+            "Manage Courses",
+            "Request History"
         ])
     else:
         tab1, tab2 = st.tabs([
@@ -1383,6 +1398,15 @@ def main():
         # Add a success message container that will be shown after submission
         success_container = st.empty()
         
+        duplicate_report = st.session_state.pop("duplicate_report", None)
+        if duplicate_report is not None:
+            if st.session_state.pop("duplicates_rejected", False):
+                st.warning(f"{duplicate_report['row'].nunique()} of your last request(s) repeat an existing request "
+                           "and were not submitted.")
+            else:
+                st.warning(f"{duplicate_report['row'].nunique()} of your last request(s) repeat an existing request.")
+            st.dataframe(duplicate_report.drop(columns=['row']), use_container_width=True, hide_index=True)
+        
         # Create a form key that can be changed to reset the form
         form_key = "class_request_form"
         if "form_reset_counter" not in st.session_state:
@@ -1525,9 +1549,10 @@ def main():
                 # Format excluded meeting dates as comma-separated string
                 excluded_dates_str = ','.join([date.strftime('%Y-%m-%d') for date in excluded_dates]) if excluded_dates else ''
                 
-                # Add each request to the session state
+                # Build one request per course code
+                new_requests = []
                 for slug in slugs:
-                    new_request = {
+                    new_requests.append({
                         'slug': slug,
                         'meeting_days': meeting_days_str,
                         'start_date': start_date,
@@ -1537,16 +1562,39 @@ def main():
                         'requested_by': st.session_state.username,
                         'request_date': datetime.datetime.now().date(),
                         'status': 'Pending'
-                    }
-                    
-                    # Add to session state
-                    st.session_state.requests = pd.concat([
-                        st.session_state.requests, 
-                        pd.DataFrame([new_request])
-                    ], ignore_index=True)
+                    })
+                
+                # Check for the same class already requested or exported, by anyone
+                duplicate_policy = CONFIG['defaults']['duplicate_policy']
+                if duplicate_policy != 'allow':
+                    duplicates = find_duplicates(
+                        new_requests,
+                        request_store,
+                        get_history_index(CONFIG['paths']['history_dir'])
+                    )
+                    if not duplicates.empty:
+                        if duplicate_policy == 'reject':
+                            # Only the repeated course codes are dropped; the rest are submitted
+                            rejected_rows = set(duplicates['row'])
+                            new_requests = [request for row, request in enumerate(new_requests)
+                                            if row not in rejected_rows]
+                            if not new_requests:
+                                duplicate_slugs = sorted(duplicates['slug'].unique())
+                                st.error(
+                                    f"The following course codes have already been requested for these days, "
+                                    f"dates and time: {', '.join(duplicate_slugs)}"
+                                )
+                                st.dataframe(duplicates.drop(columns=['row']), use_container_width=True, hide_index=True)
+                                return
+                            st.session_state.duplicates_rejected = True
+                        # Show the report after the form resets
+                        st.session_state.duplicate_report = duplicates
+                
+                # Add them to the shared request store in one write
+                request_store.add_many(new_requests)
                 
                 # Show success message
-                success_message = f"Successfully submitted {len(slugs)} class request(s)!"
+                success_message = f"Successfully submitted {len(new_requests)} class request(s)!"
                 success_container.markdown(
                     f"""
                     <div class="temp-success-message">
@@ -1566,19 +1614,60 @@ def main():
                 
                 # Rerun the app to reset the form
                 st.rerun()
+        
+        # Bulk upload from a planning spreadsheet
+        with st.expander("Bulk Upload from Spreadsheet"):
+            st.write(
+                "Upload a CSV or XLSX file with columns slug, meeting_days, start_date, end_date, "
+                "start_time and optionally excluded_meeting_dates. Every valid row is submitted as a pending request."
+            )
+            bulk_file = st.file_uploader("Planning File", type=["csv", "xlsx"], key="bulk_request_file")
+            
+            if bulk_file is not None and st.button("Submit Bulk Requests", key="submit_bulk_requests"):
+                result = ingest_requests(
+                    bulk_file,
+                    st.session_state.username,
+                    request_store,
+                    load_course_master_data().keys(),
+                    file_name=bulk_file.name,
+                    history_index=get_history_index(CONFIG['paths']['history_dir'])
+                )
+                
+                if result['added']:
+                    st.success(f"Successfully submitted {result['added']} class request(s)!")
+                if not result['errors'].empty:
+                    st.error(f"{len(result['errors'])} row(s) were rejected.")
+                    st.dataframe(result['errors'], use_container_width=True, hide_index=True)
+                    st.download_button(
+                        label="Download Error Report",
+                        data=result['errors'].to_csv(index=False),
+                        file_name="bulk_request_errors.csv",
+                        mime="text/csv",
+                        key="download_bulk_errors"
+                    )
+                if not result['duplicates'].empty:
+                    st.warning(f"{result['duplicates']['row'].nunique()} row(s) repeat an existing request.")
+                    st.dataframe(result['duplicates'], use_container_width=True, hide_index=True)
+                    st.download_button(
+                        label="Download Duplicate Report",
+                        data=result['duplicates'].to_csv(index=False),
+                        file_name="bulk_request_duplicates.csv",
+                        mime="text/csv",
+                        key="download_bulk_duplicates"
+                    )
     
     # Tab 2: Approve/Deny Requests (admin only) or My Requests (regular users)
     with tab2:
         if st.session_state.user_role == 'admin':
             st.header("Approve/Deny Requests")
             
-            # Filter requests that are pending
-            pending_requests = st.session_state.requests[st.session_state.requests['status'] == 'Pending']
+            # Count pending requests from the status index without building a frame
+            pending_count = request_store.count_by_status().get('Pending', 0)
             
-            if pending_requests.empty:
+            if pending_count == 0:
                 st.info("No pending requests to approve or deny.")
             else:
-                st.write(f"You have {len(pending_requests)} pending requests.")
+                st.write(f"You have {pending_count} pending requests.")
                 
                 col1, col2 = st.columns([1, 1])
 
@@ -1594,67 +1683,161 @@ def main():
                     ["Livestream", "Group Class"],
                     key="bulk_class_type",
                     horizontal=True,
-                    help="This selection will be applied to all requests when using Approve All."
+                    help="This selection will be applied to all requests when using Approve All or Approve Page."
                 )
                 st.caption("This selection will be applied to all requests.")
 
+                actor = st.session_state.username
+                
                 if approve_all_clicked:
-                    pending_indices = pending_requests.index.tolist()
-                    for idx in pending_indices:
-                        st.session_state.requests.at[idx, 'status'] = 'Approved'
-                        st.session_state.requests.at[idx, 'class_type'] = bulk_class_type
-                    st.success(f"All {len(pending_indices)} pending requests have been approved as '{bulk_class_type}'!")
+                    result = bulk_transition(request_store, 'Approved', class_type=bulk_class_type, actor=actor)
+                    st.success(f"All {result['changed']} pending requests have been approved as '{bulk_class_type}'!")
+                    st.rerun()
+                
+                if deny_all_clicked:
+                    result = bulk_transition(request_store, 'Denied', actor=actor)
+                    st.error(f"All {result['changed']} pending requests have been denied.")
                     st.rerun()
                 
+                # Approve or deny a subset, e.g. every vtgsc class starting in June
+                with st.expander("Bulk Update by Selection"):
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        selection_brand = st.text_input("Brand", placeholder="e.g. vtgsc", key="selection_brand")
+                        selection_pattern = st.text_input(
+                            "Course Code Pattern",
+                            placeholder="e.g. vtgsc-math-*",
+                            key="selection_pattern",
+                            help="Use * to match any characters and ? to match one character"
+                        )
+                    with col2:
+                        selection_user = st.text_input("Requested By", key="selection_user")
+                        selection_action = st.radio("Action", ["Approve", "Deny"], key="selection_action", horizontal=True)
+                    with col3:
+                        selection_from = st.date_input("Start Date From", value=None, key="selection_from")
+                        selection_to = st.date_input("Start Date To", value=None, key="selection_to")
+                    
+                    selection = {
+                        'brand': selection_brand.strip() or None,
+                        'slug_pattern': selection_pattern.strip() or None,
+                        'requested_by': selection_user.strip() or None,
+                        'start_date_from': selection_from,
+                        'start_date_to': selection_to
+                    }
+                    matching = select_requests(request_store, **selection)
+                    st.write(f"{len(matching)} pending request(s) match this selection.")
+                    
+                    if st.button(f"{selection_action} Selection", key="apply_selection", disabled=not matching):
+                        if selection_action == "Approve":
+                            result = bulk_transition(request_store, 'Approved', class_type=bulk_class_type, actor=actor, **selection)
+                            st.success(f"Approved {result['changed']} request(s) as '{bulk_class_type}'!")
+                        else:
+                            result = bulk_transition(request_store, 'Denied', actor=actor, **selection)
+                            st.error(f"Denied {result['changed']} request(s).")
+                        st.rerun()
+                
                 st.divider()
                 
-                # Display each request with approve/deny buttons
-                for idx, (request_id, request_data) in enumerate(pending_requests.iterrows(), start=1):
-                    with st.expander(f"Request: {idx}"):
-                        # Create two columns - left for request details, right for approval options
-                        col1, col2 = st.columns([3, 1])
-                        
-                        # Left column - Original Request Details (exactly as they were)
-                        with col1:
-                            # Display the original data exactly as it was
-                            st.write(f"**Course Code:** {request_data.get('slug', '')}")
-                            st.write(f"**Meeting Days:** {request_data.get('meeting_days', '')}")
-                            st.write(f"**Date Range:** {request_data.get('start_date', '')} to {request_data.get('end_date', '')}")
-                            st.write(f"**Start Time:** {request_data.get('start_time', '')}")
-                            st.write(f"**Requested By:** {request_data.get('requested_by', '')}")
-                            st.write(f"**Request Date:** {request_data.get('request_date', '')}")
-                        
-                        # Right column - Approval Options
-                        with col2:
-                            st.subheader("Approval Options")
-                            
-                            # Add radio buttons for class type selection
-                            class_type = st.radio(
-                                "Select Class Type:",
-                                ["Livestream", "Group Class"],
-                                key=f"class_type_{request_id}"
+                # Filtering, sorting and paging happen on the server; only one page is rendered
+                col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
+                with col1:
+                    queue_slug = st.text_input("Course Code Contains", key="queue_slug")
+                with col2:
+                    queue_user = st.text_input("Requested By", key="queue_user")
+                with col3:
+                    queue_sort = st.selectbox("Sort By", SORTABLE_COLUMNS, key="queue_sort")
+                with col4:
+                    queue_ascending = st.toggle("Ascending", value=True, key="queue_ascending")
+                
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col1:
+                    page_size = st.selectbox(
+                        "Page Size",
+                        [25, 50, 100, 250, 500],
+                        index=[25, 50, 100, 250, 500].index(CONFIG['defaults']['approval_page_size']),
+                        key="queue_page_size"
+                    )
+                with col3:
+                    conflicts_only = st.toggle(
+                        "Conflicts Only",
+                        key="queue_conflicts_only",
+                        help="Requests overlapping another request for the same course or an approved livestream"
+                    )
+                
+                # Schedule conflicts are recomputed only after the requests change
+                conflict_summary = get_conflict_summary(request_store)
+                
+                # Page count depends on the filters, so read the page number from the previous run
+                page_df, total = get_approval_page(
+                    request_store,
+                    slug_contains=queue_slug.strip() or None,
+                    requested_by=queue_user.strip() or None,
+                    sort_by=queue_sort,
+                    ascending=queue_ascending,
+                    page=st.session_state.get("queue_page", 1),
+                    page_size=page_size,
+                    conflicts=conflict_summary,
+                    conflicts_only=conflicts_only
+                )
+                pages = max(page_count(total, page_size), 1)
+                if st.session_state.get("queue_page", 1) > pages:
+                    # Filters shrank the result; get_approval_page already clamped to the last page
+                    st.session_state.queue_page = pages
+                with col2:
+                    st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="queue_page")
+                
+                if total == 0:
+                    st.info("No pending requests match these filters.")
+                else:
+                    st.caption(
+                        f"Showing {len(page_df)} of {total} matching requests. "
+                        "Set Status to Approved or Denied and click Save Decisions."
+                    )
+                    edited_df = st.data_editor(
+                        page_df,
+                        # A new key whenever the rows change, so edits never carry over to other requests
+                        key=f"approval_editor_{hash(tuple(page_df.index))}",
+                        use_container_width=True,
+                        disabled=[column for column in page_df.columns if column not in ('status', 'class_type')],
+                        column_config={
+                            'status': st.column_config.SelectboxColumn("Status", options=REQUEST_STATUSES, required=True),
+                            'class_type': st.column_config.SelectboxColumn("Class Type", options=CLASS_TYPES),
+                            'conflicts': st.column_config.TextColumn("Conflicts", width="large")
+                        }
+                    )
+                    
+                    col1, col2 = st.columns([1, 1])
+                    with col1:
+                        save_clicked = st.button("Save Decisions", key="save_decisions")
+                    with col2:
+                        approve_page_clicked = st.button("Approve Page", key="approve_page")
+                    
+                    if save_clicked:
+                        # One batched transition per (status, class type) instead of one write per row
+                        decisions = collect_decisions(page_df, edited_df)
+                        for (status, class_type), request_ids in decisions.items():
+                            if status == 'Approved' and class_type is None:
+                                class_type = bulk_class_type
+                            request_store.transition(
+                                request_ids, status, class_type=class_type,
+                                audit={'action': 'save_decisions', 'actor': actor}
                             )
-                            
-                            # Add approve button - now directly updates the status
-                            if st.button("Approve", key=f"approve_{request_id}", use_container_width=True):
-                                # Update the request status to Approved
-                                st.session_state.requests.at[request_id, 'status'] = 'Approved'
-                                # Store the class type
-                                st.session_state.requests.at[request_id, 'class_type'] = class_type
-                                st.success("Request approved successfully!")
-                                st.rerun()
-                            
-                            # Add deny button - now directly updates the status
-                            if st.button("Deny", key=f"deny_{request_id}", use_container_width=True):
-                                # Update the request status to Denied
-                                st.session_state.requests.at[request_id, 'status'] = 'Denied'
-                                st.error("Request denied.")
-                                st.rerun()
+                        changed = sum(len(request_ids) for request_ids in decisions.values())
+                        st.success(f"Saved decisions for {changed} request(s).")
+                        st.rerun()
+                    
+                    if approve_page_clicked:
+                        request_store.transition(
+                            page_df.index, 'Approved', class_type=bulk_class_type,
+                            audit={'action': 'approve_page', 'actor': actor}
+                        )
+                        st.success(f"Approved {len(page_df)} request(s) as '{bulk_class_type}'!")
+                        st.rerun()
         else:
             st.header("My Requests")
             
             # Filter requests for the current user
-            user_requests = st.session_state.requests[st.session_state.requests['requested_by'] == st.session_state.username]
+            user_requests = request_store.snapshot(requested_by=st.session_state.username)
             
             if user_requests.empty:
                 st.info("You haven't made any requests yet.")
@@ -1687,49 +1870,101 @@ def main():
             st.header("Export Data")
             
             # Get approved requests
-            approved_requests = st.session_state.requests[st.session_state.requests['status'] == 'Approved']
+            approved_requests = request_store.snapshot(status='Approved')
+            
+            # Look up the export job started from this page, if any
+            job_runner = get_job_runner()
+            export_job = job_runner.get(st.query_params.get('export_job'))
             
             if approved_requests.empty:
                 st.info("No approved requests to export.")
             else:
                 st.write(f"You have {len(approved_requests)} approved requests ready for export.")
                 
+                format_col, compression_col = st.columns(2)
+                with format_col:
+                    export_format = st.radio(
+                        "Export Format",
+                        ["CSV", "XLSX"],
+                        horizontal=True,
+                        help="XLSX puts the Bulk Upload and BM Upload sections on separate sheets."
+                    )
+                with compression_col:
+                    compression_choice = st.radio(
+                        "Compression",
+                        ["None", "gzip", "zip"],
+                        horizontal=True,
+                        help="Compressed downloads are smaller to send to the browser."
+                    )
+                
+                split_choice = st.radio(
+                    "Split Files By",
+                    ["None", "Brand", "Business Unit"],
+                    horizontal=True,
+                    help="Write one file per brand (vtgsc, vtp, ...) or per business unit, in the format and "
+                         "compression above, plus an index file; they download together as a zip archive."
+                )
+                
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    if st.button("Process and Export"):
-                        # Process the approved requests
-                        processed_data = process_class_data(approved_requests)
+                    export_running = export_job is not None and not export_job.finished
+                    if st.button("Process and Export", disabled=export_running):
+                        compression = None if compression_choice == "None" else compression_choice
+                        partition_by = {"Brand": 'brand', "Business Unit": 'business_units'}.get(split_choice)
                         
-                        # Export to CSV
-                        export_path = export_to_csv(processed_data, CONFIG['paths']['export_dir'])
-                        
-                        # Show success message
-                        st.success(f"Data exported successfully to {export_path}")
-                        
-                        # Store the export path in session state for download
-                        st.session_state.export_path = export_path
-                        
-                        # Provide download link
-                        with open(export_path, 'rb') as f:
-                            st.download_button(
-                                label="Download CSV",
-                                data=f,
-                                file_name=os.path.basename(export_path),
-                                mime="text/csv",
-                                key="download_csv"
-                            )
+                        # Run the export in the background; the job ID lives in the URL so a
+                        # rerun or browser refresh can pick the job back up
+                        export_job = job_runner.submit(
+                            f"Export {len(approved_requests)} approved requests",
+                            run_export_job,
+                            approved_requests.copy(),
+                            export_format=export_format.lower(),
+                            compression=compression,
+                            partition_by=partition_by
+                        )
+                        st.query_params['export_job'] = export_job.id
                 
                 with col2:
                     if st.button("Clear Approved Requests"):
-                        # Remove approved requests from session state
-                        st.session_state.requests = st.session_state.requests[
-                            st.session_state.requests['status'] != 'Approved'
-                        ].reset_index(drop=True)
+                        # Remove approved requests from the shared store
+                        request_store.remove(approved_requests.index)
                         
                         # Show success message
                         st.success("Approved requests have been cleared from the list.")
                         st.rerun()
+            
+            # Show progress and results for the current export job
+            if export_job is not None:
+                st.divider()
+                st.subheader("Export Progress")
+                st.progress(export_job.progress, text=export_job.stage)
+                
+                if not export_job.finished:
+                    if st.button("Cancel Export", key="cancel_export"):
+                        job_runner.cancel(export_job.id)
+                        st.rerun()
+                elif export_job.status == 'done':
+                    result = export_job.result
+                    if result['cached']:
+                        st.info(f"These requests were already exported. Reusing {result['path']}")
+                    else:
+                        st.success(f"Data exported successfully to {result['path']}")
+                    
+                    # Store the export path in session state for download
+                    st.session_state.export_path = result['path']
+                    
+                    st.download_button(
+                        label="Download Export",
+                        data=result['data'],
+                        file_name=result['file_name'],
+                        mime=result['mime'],
+                        key="download_csv"
+                    )
+                elif export_job.status == 'failed':
+                    st.error(f"Export failed: {export_job.error}")
+                else:
+                    st.warning("Export cancelled.")
     
     # Tab 4: Manage Courses (admin only)
     if st.session_state.user_role == 'admin':
@@ -1740,7 +1975,7 @@ def main():
             course_master = load_course_master_data()
             
             # Create tabs for adding/editing courses
-            course_action = st.radio("Select Action", ["Add New Course", "Edit Existing Course"])
+            course_action = st.radio("Select Action", ["Add New Course", "Edit Existing Course", "Edit Item Tags", "Import Courses from Spreadsheet", "Catalog History"])
             
             if course_action == "Add New Course":
                 with st.form("add_course_form"):
@@ -1806,17 +2041,198 @@ def main():
                         else:
                             st.error("Error saving course data. Please try again.")
             
+            elif course_action == "Edit Item Tags":
+                st.subheader("Edit Item Tags")
+                tag_index = get_tag_index()
+                tag_counts = tag_index.tags()
+                tag_options = list(tag_counts)
+                tag_label = lambda tag: f"{tag} ({tag_counts.get(tag, 0)})"
+                
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    tags_all = st.multiselect("Has All Of", tag_options, format_func=tag_label, key="tags_all")
+                with col2:
+                    tags_any = st.multiselect("Has Any Of", tag_options, format_func=tag_label, key="tags_any")
+                with col3:
+                    tags_none = st.multiselect("Has None Of", tag_options, format_func=tag_label, key="tags_none")
+                
+                # Read before querying, so a rebuild in between is caught when applying
+                tag_generation = tag_index.generation
+                tag_mask = tag_index.query(all_of=tags_all, any_of=tags_any, none_of=tags_none)
+                matched_count = tag_index.count(tag_mask)
+                st.write(f"{matched_count} matching course(s).")
+                
+                if matched_count:
+                    matched_slugs = tag_index.slugs(tag_mask, limit=200)
+                    st.dataframe(
+                        pd.DataFrame({
+                            'Course Code': matched_slugs,
+                            'Item Tags': ['; '.join(tag_index.tags_of(slug)) for slug in matched_slugs]
+                        }),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        tags_to_add = st.text_input("Tags to Add", help="Separate several tags with semicolons")
+                    with col2:
+                        tags_to_remove = st.multiselect("Tags to Remove", tag_options, format_func=tag_label)
+                    
+                    if st.button(f"Apply to {matched_count} Matching Course(s)", key="apply_tag_changes"):
+                        try:
+                            changed = bulk_update_tags(
+                                tag_mask, tag_generation, add=split_tags(tags_to_add), remove=tags_to_remove
+                            )
+                            st.success(f"Updated the tags of {changed} course(s).")
+                        except Exception as e:
+                            st.error(f"Error updating tags: {str(e)}")
+            
+            elif course_action == "Import Courses from Spreadsheet":
+                st.subheader("Import Courses from Spreadsheet")
+                st.write(
+                    "Upload a CSV or XLSX export with a Slug column and any of the catalog columns "
+                    "(State, Parent, Item Name, Price Dollars, ...). Only the columns in the file are "
+                    "updated; new course codes are added."
+                )
+                course_file = st.file_uploader("Course File", type=["csv", "xlsx"], key="course_import_file")
+                
+                if course_file is not None and st.button("Preview Import", key="preview_course_import"):
+                    try:
+                        st.session_state.course_import_diff = diff_course_file(
+                            course_file, course_master, file_name=course_file.name
+                        )
+                        st.session_state.course_import_name = course_file.name
+                    except Exception as e:
+                        st.session_state.pop('course_import_diff', None)
+                        st.error(f"Error reading course file: {str(e)}")
+                
+                course_diff = st.session_state.get('course_import_diff')
+                if course_diff is not None and course_file is not None \
+                        and st.session_state.get('course_import_name') == course_file.name:
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("New Courses", len(course_diff['inserts']))
+                    col2.metric("Updated Courses", len(course_diff['updates']))
+                    col3.metric("Unchanged", course_diff['unchanged'])
+                    col4.metric("Skipped Rows", len(course_diff['errors']))
+                    
+                    if course_diff['inserts'] or course_diff['updates']:
+                        st.dataframe(preview_course_diff(course_diff), use_container_width=True, hide_index=True)
+                    if not course_diff['errors'].empty:
+                        st.warning(f"{len(course_diff['errors'])} row(s) will be skipped.")
+                        st.dataframe(course_diff['errors'], use_container_width=True, hide_index=True)
+                    
+                    if (course_diff['inserts'] or course_diff['updates']) \
+                            and st.button("Apply Import", key="apply_course_import"):
+                        try:
+                            inserted, updated = apply_course_diff(course_diff)
+                            st.session_state.pop('course_import_diff', None)
+                            st.success(f"Imported {inserted} new and {updated} updated course(s).")
+                        except Exception as e:
+                            st.error(f"Error importing courses: {str(e)}")
+            
+            elif course_action == "Catalog History":
+                st.subheader("Catalog History")
+                snapshot_store = get_snapshot_store()
+                snapshots = snapshot_store.list_snapshots(limit=200)
+                
+                if not snapshots:
+                    st.info("No catalog snapshots have been recorded yet.")
+                else:
+                    st.dataframe(
+                        pd.DataFrame([{
+                            'Saved': snapshot['created_at'],
+                            'Snapshot': snapshot['id'][:12],
+                            'Courses': snapshot['courses'],
+                            'Stored (KB)': round(snapshot['stored_bytes'] / 1024, 1),
+                            'Note': snapshot['note'],
+                            'Current': 'Yes' if snapshot['head'] else ''
+                        } for snapshot in snapshots]),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    st.caption(f"Snapshots use {snapshot_store.size() / 2 ** 20:.1f} MiB on disk.")
+                    
+                    # Newest label wins when a snapshot appears more than once (e.g. after a rollback)
+                    snapshot_labels = {}
+                    for snapshot in reversed(snapshots):
+                        snapshot_labels[snapshot['id']] = f"{snapshot['created_at']} - {snapshot['id'][:12]} - {snapshot['note']}"
+                    snapshot_ids = list(reversed(snapshot_labels))
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        selected_snapshot = st.selectbox(
+                            "Snapshot", snapshot_ids, index=min(1, len(snapshot_ids) - 1),
+                            format_func=snapshot_labels.get, key="selected_snapshot"
+                        )
+                    with col2:
+                        compare_snapshot = st.selectbox(
+                            "Compare With", snapshot_ids, index=0,
+                            format_func=snapshot_labels.get, key="compare_snapshot"
+                        )
+                    
+                    if selected_snapshot != compare_snapshot:
+                        snapshot_diff = snapshot_store.diff(selected_snapshot, compare_snapshot)
+                        st.write(
+                            f"From the selected snapshot to the compared one: {len(snapshot_diff['added'])} added, "
+                            f"{len(snapshot_diff['removed'])} removed and {len(snapshot_diff['changed'])} changed course(s)."
+                        )
+                        diff_rows = [{'Course Code': slug, 'Change': 'added', 'Fields': ''} for slug in snapshot_diff['added']]
+                        diff_rows += [{'Course Code': slug, 'Change': 'removed', 'Fields': ''} for slug in snapshot_diff['removed']]
+                        diff_rows += [{'Course Code': slug, 'Change': 'changed', 'Fields': ', '.join(fields)}
+                                      for slug, fields in snapshot_diff['changed'].items()]
+                        if diff_rows:
+                            st.dataframe(pd.DataFrame(diff_rows), use_container_width=True, hide_index=True)
+                    
+                    if selected_snapshot != snapshot_store.head() \
+                            and st.button("Roll Back to Selected Snapshot", key="rollback_catalog"):
+                        try:
+                            restored = rollback_catalog(selected_snapshot)
+                            st.success(f"Catalog rolled back to {selected_snapshot[:12]} ({restored} courses).")
+                        except Exception as e:
+                            st.error(f"Error rolling back the catalog: {str(e)}")
+            
             else:  # Edit Existing Course
                 st.session_state.action = 'edit'
                 
-                # Course selection dropdown
-                course_options = get_course_options()
+                # Narrow the course list with text search and facet filters
+                search_index = get_course_search_index()
                 
-                if not course_options:
+                if not len(search_index):
                     st.warning("No courses found in course_master.json")
                 else:
-                    # Use a selectbox for course selection
-                    selected_course = st.selectbox("Select Course to Edit", course_options)
+                    search_text = st.text_input(
+                        "Search Courses",
+                        key="course_search_text",
+                        help="Words from the course code, parent title or item name"
+                    )
+                    facet_filters = {facet: st.session_state.get(f"course_facet_{facet}", []) for facet in FACETS}
+                    search_result = search_index.search(search_text, facet_filters, limit=500)
+                    
+                    facet_columns = st.columns(len(FACETS))
+                    for column, (facet, label) in zip(facet_columns, FACETS.items()):
+                        counts = search_result['facets'][facet]
+                        # Keep selected values listed even when nothing else matches them
+                        options = list(counts) + [value for value in facet_filters[facet] if value not in counts]
+                        with column:
+                            st.multiselect(
+                                label,
+                                options,
+                                key=f"course_facet_{facet}",
+                                format_func=lambda value, counts=counts: f"{value} ({counts.get(value, 0)})"
+                            )
+                    
+                    if search_result['total'] > len(search_result['slugs']):
+                        st.caption(f"{search_result['total']} matching courses; showing the first "
+                                   f"{len(search_result['slugs'])}. Narrow the search to see the rest.")
+                    else:
+                        st.caption(f"{search_result['total']} matching course{'s' if search_result['total'] != 1 else ''}")
+                    
+                    selected_course = None
+                    if search_result['slugs']:
+                        selected_course = st.selectbox("Select Course to Edit", search_result['slugs'])
+                    else:
+                        st.info("No courses match these filters.")
                     
                     # Automatically load course data when a course is selected
                     if selected_course:
@@ -1883,37 +2299,71 @@ def main():
                                         'field_17': [tag.strip() for tag in item_tags_input.split(',') if tag.strip()]
                                     }
                                     
-                                    # Save updated data to course_master.json
-                                    try:
-                                        file_path = os.path.join('data', 'course_master.json')
-                                        with open(file_path, 'r') as f:
-                                            course_master = json.load(f)
-                                        
-                                        course_master[selected_course] = updated_data
-                                        
-                                        with open(file_path, 'w') as f:
-                                            json.dump(course_master, f, indent=2)
-                                        
-                                        st.success(f"Changes saved for {selected_course}")
-                                    except Exception as e:
-                                        st.error(f"Error saving changes: {str(e)}")
+                                    # Patch only the fields that changed; the catalog writes the file in the background
+                                    patch = {field: value for field, value in updated_data.items()
+                                             if course_data.get(field) != value}
+                                    if not patch:
+                                        st.info("No changes to save.")
+                                    else:
+                                        try:
+                                            update_course(selected_course, patch)
+                                            st.success(f"Changes saved for {selected_course}")
+                                        except Exception as e:
+                                            st.error(f"Error saving changes: {str(e)}")
+    
+    # Tab 5: Request History (admin only)
+    if st.session_state.user_role == 'admin':
+        with tab5:
+            st.header("Request History")
+            
+            history_index = get_history_index(CONFIG['paths']['history_dir'])
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                history_slug = st.text_input(
+                    "Course Code",
+                    help="Exact course code, or a prefix ending in '-' such as 'vtgsc-'"
+                )
+            with col2:
+                history_user = st.selectbox("Requested By", ["Anyone"] + history_index.distinct('requested_by'))
+            with col3:
+                history_status = st.selectbox("Status", ["Any"] + history_index.distinct('status'))
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                history_from = st.date_input("Class Starts On or After", value=None)
+            with col2:
+                history_to = st.date_input("Class Starts On or Before", value=None)
+            with col3:
+                history_limit = st.number_input("Max Results", min_value=10, max_value=10000, value=500, step=10)
+            
+            history_slug = history_slug.strip()
+            history_results = history_index.query(
+                slug=history_slug if history_slug and not history_slug.endswith('-') else None,
+                slug_prefix=history_slug if history_slug.endswith('-') else None,
+                requested_by=None if history_user == "Anyone" else history_user,
+                status=None if history_status == "Any" else history_status,
+                start_date_from=history_from,
+                start_date_to=history_to,
+                limit=history_limit
+            )
+            
+            if history_results.empty:
+                st.info("No past requests match these filters.")
+            else:
+                st.write(f"Showing {len(history_results)} matching requests.")
+                st.dataframe(history_results, use_container_width=True, hide_index=True)
 
 def load_course_data(course_slug):
-    """Load course data from course_master.json for the selected course."""
+    """Load course data from the course catalog for the selected course."""
     try:
-        # Load course_master.json
-        file_path = os.path.join('data', 'course_master.json')
-        with open(file_path, 'r') as f:
-            course_master = json.load(f)
+        course_data = get_course_catalog().get(course_slug)
         
         # Check if course exists
-        if course_slug not in course_master:
+        if course_data is None:
             st.error(f"Course {course_slug} not found in course_master.json")
             return None
         
-        # Get course data
-        course_data = course_master[course_slug]
-        
         # Debug output
         st.write(f"Loaded data for course: {course_slug}")
         
@@ -1922,16 +2372,6 @@ def load_course_data(course_slug):
         st.error(f"Error loading course data: {str(e)}")
         return None
 
-def get_course_options():
-    try:
-        file_path = os.path.join('data', 'course_master.json')
-        with open(file_path, 'r') as f:
-            course_master = json.load(f)
-        return list(course_master.keys())
-    except Exception as e:
-        st.error(f"Error loading course options: {str(e)}")
-        return []
-
 def approve_request(request_id, request_data):
     """Approve a course request by adding it to course_master.json."""
     try:
@@ -1971,11 +2411,18 @@ def approve_request(request_id, request_data):
             json.dump(course_master, f, indent=2)
         
         return True
-        
+    
     except Exception as e:
         st.error(f"Error approving request: {str(e)}")
         print(f"Error details: {str(e)}")  # Debug print
         return False
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
+    
+    # Keep polling while a background export is running so its progress bar updates
+    if st.session_state.get('user_role') == 'admin':
+        running_job = get_job_runner().get(st.query_params.get('export_job'))
+        if running_job is not None and not running_job.finished:
+            time.sleep(1)
+            st.rerun()
\ No newline at end of file
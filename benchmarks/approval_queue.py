@@ -0,0 +1,88 @@
+"""
+Benchmark the paginated approval queue with a large number of pending requests.
+
+Run from the project root:
+    python -m benchmarks.approval_queue --requests 10000
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from utils.config import CONFIG
+from utils.approval_queue import get_approval_page, SORTABLE_COLUMNS
+from utils.request_store import RequestStore
+
+
+def make_requests(count: int) -> list:
+    """
+    Build synthetic pending requests.
+
+    Args:
+        count: Number of requests to generate
+
+    Returns:
+        List of request dictionaries
+    """
+    today = datetime.date.today()
+    return [{
+        'slug': f"vtgsc-course-{i % 900}",
+        'meeting_days': 'Monday,Wednesday',
+        'start_date': today + datetime.timedelta(days=i % 90),
+        'end_date': today + datetime.timedelta(days=i % 90 + 56),
+        'start_time': datetime.time(8 + i % 12, 0),
+        'excluded_meeting_dates': '',
+        'requested_by': f"user{i % 25}",
+        'request_date': today - datetime.timedelta(days=i % 30),
+        'status': 'Pending'
+    } for i in range(count)]
+
+
+def timed(label: str, func, repeat: int = 5) -> None:
+    """Run func repeat times and print the best wall time."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<32} {best * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=10000, help="Pending requests to create")
+    parser.add_argument('--page-size', type=int, default=CONFIG['defaults']['approval_page_size'])
+    parser.add_argument('--no-app', action='store_true', help="Skip the Streamlit rerun measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        requests_file = os.path.join(tmp_dir, 'requests.jsonl')
+        store = RequestStore(requests_file)
+        store.add_many(make_requests(args.requests))
+        store.flush()
+
+        print(f"{args.requests} pending requests, {args.page_size} per page")
+        for sort_by in SORTABLE_COLUMNS:
+            timed(f"page 1 by {sort_by}",
+                  lambda: get_approval_page(store, sort_by=sort_by, page_size=args.page_size))
+        timed("last page, descending",
+              lambda: get_approval_page(store, ascending=False, page=10 ** 6, page_size=args.page_size))
+        timed("slug filter",
+              lambda: get_approval_page(store, slug_contains='course-12', page_size=args.page_size))
+        store.close()
+
+        if not args.no_app:
+            # The app opens the store named in CONFIG on first use
+            from streamlit.testing.v1 import AppTest
+            CONFIG['paths']['requests_file'] = requests_file
+            app = AppTest.from_file(os.path.abspath('app.py'), default_timeout=120)
+            app.session_state['authenticated'] = True
+            app.session_state['username'] = 'admin'
+            app.session_state['user_role'] = 'admin'
+            app.run()
+            timed("app rerun (admin)", app.run, repeat=3)
+
+
+if __name__ == "__main__":
+    main()
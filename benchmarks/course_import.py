@@ -0,0 +1,70 @@
+"""
+Benchmark diffing a large course spreadsheet against the catalog.
+
+The sample export is repeated until it has the requested number of rows; the
+copies get new course codes, so most rows are inserts and the originals are
+compared field by field.
+
+Run from the project root:
+    python -m benchmarks.course_import --rows 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from utils.course_import import diff_course_file
+
+SAMPLE_FILE = os.path.join('data', 'Untitled spreadsheet - Sheet1.csv')
+
+
+def make_sheet(path: str, rows: int) -> None:
+    """
+    Write a course export of the given size based on the sample sheet.
+
+    Args:
+        path: CSV file to write
+        rows: Number of data rows
+    """
+    sample = pd.read_csv(SAMPLE_FILE, dtype=str, keep_default_na=False)
+    copies = -(-rows // len(sample))
+    sheet = pd.concat([sample] * copies, ignore_index=True).head(rows)
+    copy_number = sheet.index // len(sample)
+    sheet['Slug'] = sheet['Slug'].where(copy_number == 0, sheet['Slug'] + '-copy' + copy_number.astype(str))
+    sheet.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000, help="Rows in the generated sheet")
+    parser.add_argument('--chunksize', type=int, default=5000, help="Rows read at a time")
+    args = parser.parse_args()
+
+    with open(os.path.join('data', 'course_master.json'), 'r') as f:
+        catalog = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'courses.csv')
+        make_sheet(path, args.rows)
+
+        started = time.perf_counter()
+        diff = diff_course_file(path, catalog, chunksize=args.chunksize)
+        elapsed = time.perf_counter() - started
+
+        # Measured in a second pass; tracing slows the first one down several times
+        tracemalloc.start()
+        diff_course_file(path, catalog, chunksize=args.chunksize)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    print(f"{args.rows} rows in {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/s), peak {peak / 2 ** 20:.0f} MiB")
+    print(f"inserts {len(diff['inserts'])}  updates {len(diff['updates'])}  "
+          f"unchanged {diff['unchanged']}  errors {len(diff['errors'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark the course search index on a catalog scaled up from course_master.json.
+
+Run from the project root:
+    python -m benchmarks.course_search --courses 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from utils.course_search import CourseSearchIndex
+
+QUERIES = [
+    ('', {}),
+    ('algebra', {}),
+    ('alg', {'brand': ['vtgsc']}),
+    ('', {'grade': ['10th Grade'], 'subject': ['Math']}),
+    ('bridging the gap', {'item_type': ['group course academic']}),
+    ('a', {})
+]
+
+
+def make_catalog(courses: int) -> dict:
+    """
+    Repeat the sample catalog under new course codes until it has the requested size.
+
+    Args:
+        courses: Number of courses to generate
+
+    Returns:
+        Course master data (slug -> record)
+    """
+    with open(os.path.join('data', 'course_master.json'), 'r') as f:
+        sample = [(slug, record) for slug, record in json.load(f).items() if slug]
+    catalog = {}
+    for number in range(courses):
+        slug, record = sample[number % len(sample)]
+        copy = number // len(sample)
+        catalog[f"{slug}-{copy}" if copy else slug] = record
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--courses', type=int, default=100000, help="Courses in the generated catalog")
+    parser.add_argument('--repeat', type=int, default=50, help="Runs per query")
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.courses)
+    started = time.perf_counter()
+    index = CourseSearchIndex(catalog)
+    print(f"Indexed {len(index)} courses in {time.perf_counter() - started:.2f}s")
+
+    for text, filters in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = index.search(text, filters)
+            timings.append(time.perf_counter() - started)
+        print(f"{text!r:20} {str(filters):50} {result['total']:>7} matches  "
+              f"median {statistics.median(timings) * 1000:6.2f} ms  max {max(timings) * 1000:6.2f} ms")
+
+    slug = next(iter(catalog))
+    record = dict(catalog[slug], field_4='Renamed course', field_8='Science')
+    started = time.perf_counter()
+    index.update(slug, record)
+    print(f"Re-indexed one edited course in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark the SQLite request store with several concurrent writer processes.
+
+Each writer process inserts its share of requests in batches, then approves
+them in batches, as separate Streamlit server processes would.
+
+Run from the project root:
+    python -m benchmarks.request_store --requests 20000 --writers 1 2 4 8
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import tempfile
+import time
+
+from utils.request_store import SqliteRequestStore
+
+
+def make_requests(count: int, writer: int) -> list:
+    """
+    Build synthetic pending requests for one writer.
+
+    Args:
+        count: Number of requests to generate
+        writer: Writer number, recorded as the requester
+
+    Returns:
+        List of request dictionaries
+    """
+    today = datetime.date.today()
+    return [{
+        'slug': f"vtgsc-course-{i % 900}",
+        'meeting_days': 'Monday,Wednesday',
+        'start_date': today + datetime.timedelta(days=i % 90),
+        'end_date': today + datetime.timedelta(days=i % 90 + 56),
+        'start_time': datetime.time(8 + i % 12, 0),
+        'excluded_meeting_dates': '',
+        'requested_by': f"writer{writer}",
+        'request_date': today,
+        'status': 'Pending'
+    } for i in range(count)]
+
+
+def run_writer(path: str, writer: int, count: int, batch: int, start_event) -> None:
+    """Insert and then approve count requests in batches."""
+    store = SqliteRequestStore(path)
+    requests = make_requests(count, writer)
+    start_event.wait()
+    request_ids = []
+    for start in range(0, count, batch):
+        request_ids.extend(store.add_many(requests[start:start + batch]))
+    for start in range(0, count, batch):
+        store.transition(request_ids[start:start + batch], 'Approved', class_type='Livestream',
+                         audit={'action': 'benchmark', 'actor': f"writer{writer}"})
+    store.close()
+
+
+def run(writers: int, total: int, batch: int) -> None:
+    """Run one benchmark round and print throughput."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'requests.sqlite3')
+        SqliteRequestStore(path).close()
+
+        start_event = multiprocessing.Event()
+        per_writer = total // writers
+        processes = [
+            multiprocessing.Process(target=run_writer, args=(path, writer, per_writer, batch, start_event))
+            for writer in range(writers)
+        ]
+        for process in processes:
+            process.start()
+        # Let every process open its connection before timing
+        time.sleep(0.5)
+        started = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        store = SqliteRequestStore(path)
+        counts = store.count_by_status()
+        batches = len(store.audit_records())
+        store.close()
+        rows = per_writer * writers
+        print(f"{writers:>2} writer(s)  {elapsed:7.2f}s  {2 * rows / elapsed:10,.0f} row writes/s  "
+              f"approved {counts.get('Approved', 0)}/{rows}  audit batches {batches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000, help="Requests inserted per round")
+    parser.add_argument('--batch', type=int, default=100, help="Requests per transaction")
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 2, 4, 8], help="Writer process counts")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests per round, {args.batch} per transaction")
+    for writers in args.writers:
+        run(writers, args.requests, args.batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark the streaming XLSX exporter against pandas' DataFrame.to_excel.
+
+Run from the project root:
+    python -m benchmarks.xlsx_export --rows 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from utils.export import build_export_sections, write_xlsx_sheets
+
+
+def make_processed_data(rows: int) -> pd.DataFrame:
+    """
+    Build a synthetic DataFrame shaped like the output of process_class_data.
+
+    Args:
+        rows: Number of rows to generate
+
+    Returns:
+        DataFrame with the processed bulk upload columns
+    """
+    brands = ['vtgsc', 'vtp', 'vtpsg', 'vtsaz']
+    return pd.DataFrame({
+        'slug': [f"{brands[i % 4]}-math-grade-{i % 12 + 1}-{i}" for i in range(rows)],
+        'meeting_days': ['mon|wed|fri'] * rows,
+        'start_date': ['2025-06-02'] * rows,
+        'end_date': ['2025-08-29'] * rows,
+        'excluded_meeting_dates': [''] * rows,
+        'meeting_start_time': ['3:00 PM'] * rows,
+        'time_zone': ['America/Chicago'] * rows,
+        'parent': ['Varsity Tutors'] * rows,
+        'state': ['Published'] * rows,
+        'product_type': ['small_group'] * rows,
+        'subject_name': ['Math'] * rows,
+        'subject_id': ['1'] * rows,
+        'content.meta.title': ['Bridging the Gap in Algebra 2'] * rows,
+        'content.meta.description': ['Bridging the Gap in Algebra 2'] * rows,
+        'content.meta.keywords': ['Bridging the Gap in Algebra 2'] * rows,
+        'grades': ['10|11|12'] * rows,
+        'course_title': ["Bridging the Gap in Algebra 2 06023HGC"] * rows,
+        'meeting_duration': ['60'] * rows,
+        'duration_hours': ['6.0'] * rows,
+        'capacity': ['900'] * rows,
+        'instructor_name': [''] * rows,
+        'rate_type': ['group course academic'] * rows,
+        'business_units': [''] * rows,
+        'price_dollars': ['$269.00'] * rows,
+        'IMAGE file name': [''] * rows,
+        'sponsor_client_id': [''] * rows,
+        'sponsor_waiting_room': [''] * rows,
+        'sponsor_price_dollars': [''] * rows,
+    })
+
+
+def measure(label: str, func) -> None:
+    """Run func once and print wall time and peak traced memory."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {elapsed:8.2f}s  peak {peak / 1024 / 1024:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help="Rows to export")
+    args = parser.parse_args()
+
+    export_data, bm_data = build_export_sections(make_processed_data(args.rows))
+    sheets = {'Bulk Upload': export_data, 'BM Upload': bm_data}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        def run_to_excel():
+            with pd.ExcelWriter(os.path.join(tmp_dir, 'to_excel.xlsx'), engine='openpyxl') as writer:
+                for sheet_name, df in sheets.items():
+                    df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+        def run_write_only():
+            write_xlsx_sheets(sheets, os.path.join(tmp_dir, 'write_only.xlsx'))
+
+        print(f"Exporting {args.rows} rows to two sheets")
+        measure("to_excel", run_to_excel)
+        measure("write-only", run_write_only)
+
+
+if __name__ == "__main__":
+    main()
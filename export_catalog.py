@@ -0,0 +1,40 @@
+import argparse
+import os
+import sys
+from utils.config import CONFIG
+from utils.catalog_export import CATALOG_COLUMNS, export_catalog
+
+def main():
+    """
+    Export course_master.json to an XLSX or CSV file.
+    
+    Columns default to the full catalog layout (Slug, State, ..., Item Tags);
+    list values such as grade tags are joined with ", ".
+    """
+    parser = argparse.ArgumentParser(description="Export the course catalog to an XLSX or CSV file.")
+    parser.add_argument('output', nargs='?', default=os.path.join(CONFIG['paths']['data_dir'], 'course_master.xlsx'),
+                        help="Output file; .xlsx or .csv (default: course_master.xlsx in the data directory)")
+    parser.add_argument('--columns', help="Comma-separated headers or field names to export, in order "
+                                          f"(default: all of {', '.join(CATALOG_COLUMNS)})")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes used to format rows; worth raising only for very large catalogs on "
+                             "multi-core machines (default 1 formats them inline)")
+    parser.add_argument('--chunksize', type=int, default=2000, help="Courses formatted per task")
+    args = parser.parse_args()
+    
+    columns = [column for column in args.columns.split(',') if column.strip()] if args.columns else None
+    catalog_path = os.path.join(CONFIG['paths']['data_dir'], 'course_master.json')
+    
+    try:
+        result = export_catalog(args.output, catalog_path, columns=columns,
+                                workers=args.workers, chunksize=args.chunksize)
+    except Exception as e:
+        print(f"Error exporting course catalog: {str(e)}")
+        return 1
+    
+    print(f"Exported {result['rows']} courses to {result['path']} in {result['seconds']:.2f}s "
+          f"({result['rows_per_second']:,.0f} rows/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,15 @@
 import pandas as pd
 import os
 from utils.config import CONFIG
+from utils.reference_data import load_reference_data
 
 def extract_reference_data():
     """
     Extract reference data from the spreadsheet and save to CSV files.
+    
+    The tabs are pulled from Google Sheets (through the local reference cache)
+    when CONFIG['data']['reference_spreadsheet_id'] is set, and read from the
+    local workbook otherwise.
     """
     # Get configuration
     spreadsheet_path = CONFIG['data']['spreadsheet_path']
@@ -14,9 +19,17 @@ def extract_reference_data():
     # Create data directory if it doesn't exist
     os.makedirs(data_dir, exist_ok=True)
     
-    print(f"Loading spreadsheet from {spreadsheet_path}...")
-    
     try:
+        if CONFIG['data']['reference_spreadsheet_id']:
+            print("Loading reference tabs from Google Sheets...")
+            frames = load_reference_data()
+            parent_data = frames['parent_data']
+            subject_key = frames['subject_key']
+            grade_lookup = frames['grade_lookup']
+            return _save_reference_csvs(data_dir, parent_data, subject_key, grade_lookup)
+        
+        print(f"Loading spreadsheet from {spreadsheet_path}...")
+        
         # Read the reference tabs
         parent_data = pd.read_excel(
             spreadsheet_path, 
@@ -33,16 +46,18 @@ def extract_reference_data():
             sheet_name=reference_sheets['grade_lookup']
         )
         
-        # Save to CSV files
-        parent_data.to_csv(os.path.join(data_dir, 'parent_data.csv'), index=False)
-        subject_key.to_csv(os.path.join(data_dir, 'subject_key.csv'), index=False)
-        grade_lookup.to_csv(os.path.join(data_dir, 'grade_lookup.csv'), index=False)
-        
-        print("Reference data extracted and saved to CSV files.")
-        return True
+        return _save_reference_csvs(data_dir, parent_data, subject_key, grade_lookup)
     except Exception as e:
         print(f"Error extracting reference data: {str(e)}")
         return False
 
+def _save_reference_csvs(data_dir, parent_data, subject_key, grade_lookup):
+    parent_data.to_csv(os.path.join(data_dir, 'parent_data.csv'), index=False)
+    subject_key.to_csv(os.path.join(data_dir, 'subject_key.csv'), index=False)
+    grade_lookup.to_csv(os.path.join(data_dir, 'grade_lookup.csv'), index=False)
+    
+    print("Reference data extracted and saved to CSV files.")
+    return True
+
 if __name__ == "__main__":
     extract_reference_data() 
\ No newline at end of file
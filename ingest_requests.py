@@ -0,0 +1,53 @@
+import argparse
+import sys
+from utils.config import CONFIG
+from utils.data_processor import load_course_master_data
+from utils.duplicates import DUPLICATE_POLICIES
+from utils.history import get_history_index
+from utils.ingest import ingest_requests
+from utils.request_store import get_request_store
+
+def main():
+    """
+    Bulk-add class requests from a CSV or XLSX planning file.
+    
+    Expected columns: slug, meeting_days, start_date, end_date, start_time and
+    optionally excluded_meeting_dates (human-readable headers such as
+    "Course Code" or "Start Date" also work).
+    """
+    parser = argparse.ArgumentParser(description="Bulk-add class requests from a CSV or XLSX file.")
+    parser.add_argument('path', help="CSV or XLSX planning file")
+    parser.add_argument('--user', required=True, help="Username to record as the requester")
+    parser.add_argument('--chunksize', type=int, default=5000, help="Rows validated at a time")
+    parser.add_argument('--errors', help="Write rejected rows to this CSV file")
+    parser.add_argument('--duplicates', choices=DUPLICATE_POLICIES, default=CONFIG['defaults']['duplicate_policy'],
+                        help="Reject, flag or allow rows repeating an existing request")
+    parser.add_argument('--duplicate-report', help="Write matched existing requests to this CSV file")
+    args = parser.parse_args()
+    
+    course_master = load_course_master_data()
+    store = get_request_store()
+    
+    result = ingest_requests(
+        args.path, args.user, store, course_master.keys(), chunksize=args.chunksize,
+        duplicate_policy=args.duplicates, history_index=get_history_index(CONFIG['paths']['history_dir'])
+    )
+    store.flush()
+    
+    print(f"Added {result['added']} request(s); rejected {len(result['errors'])} row(s).")
+    if not result['duplicates'].empty:
+        print(f"{result['duplicates']['row'].nunique()} row(s) repeat an existing request.")
+        if args.duplicate_report:
+            result['duplicates'].to_csv(args.duplicate_report, index=False)
+            print(f"Duplicate report written to {args.duplicate_report}")
+    if not result['errors'].empty:
+        if args.errors:
+            result['errors'].to_csv(args.errors, index=False)
+            print(f"Error report written to {args.errors}")
+        else:
+            print(result['errors'].to_string(index=False))
+    
+    return 0 if result['errors'].empty else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,67 +1,54 @@
-import json
-import os
-from utils.config import CONFIG
+import argparse
+import sys
+from utils.catalog_migrations import MIGRATIONS, LATEST_VERSION, get_schema_version, migrate_catalog
 
-def update_course_master():
+def update_course_master(target_version=None, dry_run=False):
     """
-    Update the course_master.json file to ensure all courses have all 17 fields.
-    """
-    # Path to the course master file
-    master_data_path = os.path.join(CONFIG['paths']['data_dir'], 'course_master.json')
+    Migrate course_master.json to the latest catalog schema.
+    
+    Stop the app first: the catalog file is replaced when the migration finishes.
+    
+    Args:
+        target_version: Schema version to migrate to (defaults to the latest)
+        dry_run: Report what would change without writing
     
+    Returns:
+        True if the migration succeeded, False otherwise
+    """
     try:
-        # Load existing data
-        with open(master_data_path, 'r') as f:
-            course_master = json.load(f)
-        
-        # Default values for all fields
-        default_values = {
-            'field_0': '',  # slug (will be overwritten)
-            'field_1': 'Published',  # state
-            'field_2': 'Varsity Tutors',  # parent
-            'field_3': '',  # parent_title
-            'field_4': '',  # item_name
-            'field_5': '',  # commodity
-            'field_6': '',  # item_type
-            'field_7': '',  # (skipped)
-            'field_8': '',  # subject_name
-            'field_9': '',  # subject_id
-            'field_10': '',  # content_title
-            'field_11': '',  # content_description
-            'field_12': '',  # content_keywords
-            'field_13': '',  # grades
-            'field_14': '',  # course_title
-            'field_15': '',  # business_units
-            'field_16': '0',  # price_dollars
-            'field_17': ''   # image_file_name
-        }
+        result = migrate_catalog(target_version=target_version, dry_run=dry_run)
         
-        # Update each course to ensure it has all fields
-        updated_courses = {}
-        for slug, course_data in course_master.items():
-            # Start with default values
-            updated_course = default_values.copy()
-            
-            # Set the slug
-            updated_course['field_0'] = slug
-            
-            # Update with existing values
-            for field, value in course_data.items():
-                updated_course[field] = value
-            
-            # Add to updated courses
-            updated_courses[slug] = updated_course
+        if result['to_version'] == result['from_version']:
+            print(f"Course master data is already at schema version {result['from_version']}")
+            return True
         
-        # Save the updated data
-        with open(master_data_path, 'w') as f:
-            json.dump(updated_courses, f, indent=2)
-        
-        print(f"Successfully updated {len(updated_courses)} courses in {master_data_path}")
+        descriptions = {version: description for version, description, _ in MIGRATIONS}
+        for version, count in result['affected'].items():
+            print(f"  {version}. {descriptions[version]}: {count} course(s) {'would change' if dry_run else 'changed'}")
+        action = "Would migrate" if dry_run else "Migrated"
+        print(f"{action} {result['records']} courses from schema version {result['from_version']} "
+              f"to {result['to_version']}")
         return True
     
     except Exception as e:
         print(f"Error updating course master data: {str(e)}")
         return False
 
+def main():
+    parser = argparse.ArgumentParser(description="Migrate course_master.json to the latest catalog schema.")
+    parser.add_argument('--to', type=int, default=LATEST_VERSION, help="Schema version to migrate to")
+    parser.add_argument('--dry-run', action='store_true', help="Report affected courses without writing")
+    parser.add_argument('--status', action='store_true', help="Show the current schema version and exit")
+    args = parser.parse_args()
+    
+    if args.status:
+        current = get_schema_version()
+        print(f"Schema version {current} (latest {LATEST_VERSION})")
+        for version, description, _ in MIGRATIONS:
+            print(f"  {version}. {description} [{'applied' if version <= current else 'pending'}]")
+        return 0
+    
+    return 0 if update_course_master(args.to, dry_run=args.dry_run) else 1
+
 if __name__ == "__main__":
-    update_course_master() 
\ No newline at end of file
+    sys.exit(main())
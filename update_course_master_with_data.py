@@ -1,63 +1,143 @@
+import argparse
 import json
 import os
+import sys
+from typing import Any, Dict, Optional, Tuple
 import pandas as pd
 from utils.config import CONFIG
+from utils.course_import import LIST_FIELDS, canonical_course_value, parse_list_cell, stored_course_value
+from utils.data_processor import get_course_catalog
 
-def update_course_master_with_data():
+def _parse_list_or_none(value: str) -> Optional[list]:
+    """Parse a list cell, returning None (treated as missing) if it is invalid."""
+    try:
+        return parse_list_cell(value)
+    except ValueError:
+        return None
+
+def merge_parent_data(parent_data: pd.DataFrame, course_master: Dict[str, Dict[str, Any]],
+                      column_map: Dict[str, str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
     """
-    Update the course_master.json file with actual data from the parent data tab.
+    Merge parent data into the catalog by course code.
+    
+    Only non-empty cells are applied, and only where they differ from the
+    catalog; fields without a mapped column are left as they are. If a course
+    code appears more than once, each field takes its last non-empty value.
+    
+    Args:
+        parent_data: Parent data, all values as strings
+        course_master: Course master data (slug -> record)
+        column_map: Parent data column -> catalog field; the column mapped to
+            'field_0' holds the course code
+    
+    Returns:
+        Tuple of (slug -> changed fields, counts)
+    """
+    key_columns = [column for column, field in column_map.items() if field == 'field_0']
+    if not key_columns or key_columns[0] not in parent_data.columns:
+        raise ValueError("The parent data has no course code column")
+    
+    mapped = {column: field for column, field in column_map.items() if column in parent_data.columns}
+    parent = parent_data[list(mapped)].rename(columns=mapped)
+    parent = parent.apply(lambda column: column.str.strip()).replace('', pd.NA)
+    fields = [field for field in parent.columns if field != 'field_0']
+    
+    rows = len(parent)
+    parent = parent[parent['field_0'].notna()]
+    missing_key = rows - len(parent)
+    deduplicated = parent.groupby('field_0', sort=False).last()
+    duplicate_rows = len(parent) - len(deduplicated)
+    
+    catalog = pd.DataFrame.from_dict(course_master, orient='index').reindex(columns=fields)
+    in_catalog = deduplicated.index.isin(catalog.index)
+    matched = deduplicated[in_catalog]
+    current = catalog.loc[matched.index]
+    
+    invalid_cells = 0
+    for field in fields:
+        if field in LIST_FIELDS:
+            present = matched[field].notna()
+            matched[field] = matched[field].map(_parse_list_or_none, na_action='ignore')
+            invalid_cells += int((present & matched[field].isna()).sum())
+    
+    # One vectorized comparison per field; only the changed cells are collected
+    patches = {}
+    fields_updated = 0
+    for field in fields:
+        new = matched[field]
+        old = current[field].map(lambda value: canonical_course_value(field, value))
+        changed = new.notna() & (new != old)
+        fields_updated += int(changed.sum())
+        for slug, value in new[changed].items():
+            patches.setdefault(slug, {})[field] = stored_course_value(field, value, current.at[slug, field])
+    
+    counts = {
+        'rows': rows,
+        'missing_key': missing_key,
+        'duplicate_rows': duplicate_rows,
+        'not_in_catalog': int((~in_catalog).sum()),
+        'invalid_cells': invalid_cells,
+        'matched': len(matched),
+        'updated': len(patches),
+        'unchanged': len(matched) - len(patches),
+        'fields_updated': fields_updated
+    }
+    return patches, counts
+
+def update_course_master_with_data(parent_data_path: Optional[str] = None,
+                                   column_map: Optional[Dict[str, str]] = None,
+                                   dry_run: bool = False) -> Optional[Dict[str, int]]:
     """
-    # Path to the course master file
-    master_data_path = os.path.join(CONFIG['paths']['data_dir'], 'course_master.json')
+    Update the course_master.json file with actual data from the parent data tab.
+    
+    Args:
+        parent_data_path: Parent data CSV (defaults to parent_data.csv in the data directory)
+        column_map: Column mapping (defaults to CONFIG['parent_data_columns'])
+        dry_run: Report the counts without writing the catalog
     
-    # Path to the parent data file (assuming it's a CSV)
-    parent_data_path = os.path.join(CONFIG['paths']['data_dir'], 'parent_data.csv')
+    Returns:
+        Counts from merge_parent_data, or None if the update failed
+    """
+    if parent_data_path is None:
+        parent_data_path = os.path.join(CONFIG['paths']['data_dir'], 'parent_data.csv')
+    if column_map is None:
+        column_map = CONFIG['parent_data_columns']
     
     try:
-        # Load existing course master data
-        with open(master_data_path, 'r') as f:
-            course_master = json.load(f)
+        # Only the mapped columns are read
+        parent_data = pd.read_csv(parent_data_path, dtype=str, keep_default_na=False,
+                                  usecols=lambda column: column in column_map)
         
-        # Load parent data
-        parent_data = pd.read_csv(parent_data_path)
+        catalog = get_course_catalog()
+        patches, counts = merge_parent_data(parent_data, catalog.snapshot(), column_map)
+        if patches and not dry_run:
+            catalog.upsert_many(patches)
         
-        # Map parent data to course master
-        for _, row in parent_data.iterrows():
-            slug = row.get('slug', '')
-            
-            if slug and slug in course_master:
-                # Update course with parent data
-                course_master[slug] = {
-                    'field_0': slug,
-                    'field_1': row.get('state', 'Published'),
-                    'field_2': row.get('parent', 'Varsity Tutors'),
-                    'field_3': row.get('parent_title', ''),
-                    'field_4': row.get('item_name', ''),
-                    'field_5': row.get('commodity', ''),
-                    'field_6': row.get('item_type', ''),
-                    'field_7': row.get('field_7', ''),  # Include field_7 even if skipped in UI
-                    'field_8': row.get('subject_name', ''),
-                    'field_9': row.get('subject_id', ''),
-                    'field_10': row.get('content_title', ''),
-                    'field_11': row.get('content_description', ''),
-                    'field_12': row.get('content_keywords', ''),
-                    'field_13': row.get('grades', ''),
-                    'field_14': row.get('course_title', ''),
-                    'field_15': row.get('business_units', ''),
-                    'field_16': row.get('price_dollars', '0'),
-                    'field_17': row.get('image_file_name', '')
-                }
-        
-        # Save the updated data
-        with open(master_data_path, 'w') as f:
-            json.dump(course_master, f, indent=2)
-        
-        print(f"Successfully updated {len(course_master)} courses in {master_data_path}")
-        return True
+        print(f"{'Would update' if dry_run else 'Updated'} {counts['updated']} of {counts['matched']} matched courses "
+              f"({counts['fields_updated']} fields); {counts['unchanged']} unchanged")
+        print(f"Skipped: {counts['not_in_catalog']} unknown course codes, {counts['missing_key']} rows without "
+              f"a course code, {counts['duplicate_rows']} repeated rows, {counts['invalid_cells']} invalid list cells")
+        return counts
     
     except Exception as e:
         print(f"Error updating course master data: {str(e)}")
-        return False
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Update course_master.json from a parent data CSV.")
+    parser.add_argument('path', nargs='?', help="Parent data CSV (default: parent_data.csv in the data directory)")
+    parser.add_argument('--mapping', help="JSON file mapping CSV columns to catalog fields "
+                                          "(default: CONFIG['parent_data_columns'])")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would change without saving")
+    args = parser.parse_args()
+    
+    column_map = None
+    if args.mapping:
+        with open(args.mapping, 'r') as f:
+            column_map = json.load(f)
+    
+    counts = update_course_master_with_data(args.path, column_map, dry_run=args.dry_run)
+    return 0 if counts is not None else 1
 
 if __name__ == "__main__":
-    update_course_master_with_data() 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import math
+import fnmatch
+import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+from utils.request_store import RequestStore, CATEGORICAL_COLUMNS
+
+# Columns shown in the approval queue, in order; status and class_type are editable
+QUEUE_COLUMNS = [
+    'slug', 'meeting_days', 'start_date', 'end_date', 'start_time',
+    'requested_by', 'request_date', 'status', 'class_type', 'conflicts'
+]
+
+SORTABLE_COLUMNS = ['request_date', 'slug', 'start_date', 'start_time', 'requested_by']
+
+def get_approval_page(store: RequestStore, status: str = 'Pending', slug_contains: Optional[str] = None,
+                      requested_by: Optional[str] = None, sort_by: str = 'request_date',
+                      ascending: bool = True, page: int = 1, page_size: int = 50,
+                      conflicts: Optional[Dict[str, str]] = None,
+                      conflicts_only: bool = False) -> Tuple[pd.DataFrame, int]:
+    """
+    Filter, sort and paginate requests on the server side.
+    
+    Only the requested page is turned into a DataFrame, so the cost of a rerun
+    depends on the page size rather than on the number of pending requests.
+    
+    Args:
+        store: RequestStore to read from
+        status: Status to list
+        slug_contains: Case-insensitive course code substring
+        requested_by: Requesting username
+        sort_by: One of SORTABLE_COLUMNS
+        ascending: Sort direction
+        page: 1-based page number (clamped to the available pages)
+        page_size: Requests per page
+        conflicts: Request ID to conflict description (see conflicts.get_conflict_summary),
+            shown in the conflicts column
+        conflicts_only: Only list requests that have conflicts
+    
+    Returns:
+        Tuple of (page DataFrame indexed by request ID, total matching requests)
+    """
+    if sort_by not in SORTABLE_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {sort_by}")
+    
+    records = store.records(store.ids_where(status=status, requested_by=requested_by))
+    if slug_contains:
+        needle = slug_contains.lower()
+        records = [(request_id, record) for request_id, record in records
+                   if needle in str(record.get('slug') or '').lower()]
+    conflicts = conflicts or {}
+    if conflicts_only:
+        records = [(request_id, record) for request_id, record in records if request_id in conflicts]
+    
+    # Missing values sort last in either direction; the request ID breaks ties
+    # in submission order
+    present = [item for item in records if item[1].get(sort_by) is not None]
+    missing = [item for item in records if item[1].get(sort_by) is None]
+    present.sort(key=lambda item: (item[1][sort_by], item[0]), reverse=not ascending)
+    missing.sort(key=lambda item: item[0])
+    records = present + missing
+    
+    total = len(records)
+    page = min(max(page, 1), max(page_count(total, page_size), 1))
+    start = (page - 1) * page_size
+    page_records = records[start:start + page_size]
+    
+    df = pd.DataFrame.from_dict(dict(page_records), orient='index')
+    df['conflicts'] = [conflicts.get(request_id, '') for request_id, _ in page_records]
+    df = df.reindex(columns=QUEUE_COLUMNS)
+    df.index.name = 'request_id'
+    for column in ('status', 'class_type'):
+        df[column] = pd.Categorical(df[column], categories=CATEGORICAL_COLUMNS[column])
+    return df, total
+
+def page_count(total: int, page_size: int) -> int:
+    """Number of pages needed for total rows."""
+    return math.ceil(total / page_size) if page_size else 0
+
+def collect_decisions(original: pd.DataFrame, edited: pd.DataFrame) -> Dict[Tuple[str, Any], list]:
+    """
+    Group the rows whose status was changed in the data editor by (status, class_type).
+    
+    Args:
+        original: Page DataFrame passed to st.data_editor
+        edited: DataFrame returned by st.data_editor
+    
+    Returns:
+        Dictionary mapping (status, class_type) to the request IDs to transition
+    """
+    changed = edited[edited['status'].astype(object) != original['status'].astype(object)]
+    decisions = {}
+    for request_id, row in changed.iterrows():
+        class_type = row['class_type'] if row['status'] == 'Approved' else None
+        if pd.isna(class_type):
+            class_type = None
+        decisions.setdefault((row['status'], class_type), []).append(request_id)
+    return decisions
+
+def select_requests(store: RequestStore, status: Optional[str] = 'Pending', brand: Optional[str] = None,
+                    slug_pattern: Optional[str] = None, requested_by: Optional[str] = None,
+                    start_date_from: Optional[datetime.date] = None,
+                    start_date_to: Optional[datetime.date] = None) -> List[str]:
+    """
+    Find the requests matching a selection, evaluated as vectorized masks.
+    
+    Args:
+        store: RequestStore to read from
+        status: Current status to select (None for any)
+        brand: Brand code, i.e. the slug prefix before the first '-' (e.g. 'vtgsc')
+        slug_pattern: Shell-style course code pattern, e.g. 'vtgsc-math-*'
+        requested_by: Requesting username
+        start_date_from: Earliest start date, inclusive
+        start_date_to: Latest start date, inclusive
+    
+    Returns:
+        Matching request IDs in submission order
+    """
+    # Status and requester come straight from the store's indexes
+    df = store.snapshot(status=status, requested_by=requested_by)
+    if df.empty:
+        return []
+    
+    slugs = df['slug'].fillna('').astype(str)
+    start_dates = pd.to_datetime(df['start_date'], errors='coerce')
+    mask = pd.Series(True, index=df.index)
+    if brand:
+        mask &= slugs.str.split('-', n=1).str[0].str.lower() == brand.lower()
+    if slug_pattern:
+        mask &= slugs.str.match(fnmatch.translate(slug_pattern), case=False)
+    if start_date_from:
+        mask &= start_dates >= pd.Timestamp(start_date_from)
+    if start_date_to:
+        mask &= start_dates <= pd.Timestamp(start_date_to)
+    return list(df.index[mask])
+
+def bulk_transition(store: RequestStore, to_status: str, class_type: Optional[str] = None,
+                    actor: Optional[str] = None, **selection) -> Dict[str, Any]:
+    """
+    Move every request matching a selection to a new status in one batched write.
+    
+    The change is a single log event carrying one audit record with the actor,
+    the selection and the number of requests changed.
+    
+    Example:
+        bulk_transition(store, 'Approved', class_type='Livestream', actor='admin',
+                        brand='vtgsc', start_date_from=date(2025, 6, 1),
+                        start_date_to=date(2025, 6, 30))
+    
+    Args:
+        store: RequestStore to change
+        to_status: New status, one of REQUEST_STATUSES
+        class_type: Class type to record (e.g. on approval)
+        actor: Username making the change
+        **selection: Filters accepted by select_requests (status defaults to 'Pending')
+    
+    Returns:
+        Dictionary with 'changed' (count) and 'request_ids'
+    """
+    request_ids = select_requests(store, **selection)
+    audit = {
+        'action': 'bulk_transition',
+        'actor': actor,
+        'selection': {key: value.isoformat() if isinstance(value, datetime.date) else value
+                      for key, value in selection.items() if value is not None}
+    }
+    changed = store.transition(request_ids, to_status, class_type=class_type, audit=audit) if request_ids else 0
+    return {
+        'changed': changed,
+        'request_ids': request_ids
+    }
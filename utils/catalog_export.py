@@ -0,0 +1,143 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from openpyxl import Workbook
+from utils.catalog_migrations import iter_catalog
+from utils.data_processor import COURSE_HEADERS
+
+# Export header -> catalog field, in column order
+CATALOG_COLUMNS = {header: field for field, header in COURSE_HEADERS.items()}
+
+def resolve_columns(columns: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Resolve requested columns to export headers.
+    
+    Args:
+        columns: Headers ("Price Dollars") or field names ("field_15"), matched
+            case-insensitively; all columns if None
+    
+    Returns:
+        Export headers in the requested order
+    
+    Raises:
+        ValueError: If a column is unknown
+    """
+    if columns is None:
+        return list(CATALOG_COLUMNS)
+    lookup = {header.lower(): header for header in CATALOG_COLUMNS}
+    lookup.update({field: header for header, field in CATALOG_COLUMNS.items()})
+    headers = []
+    for column in columns:
+        header = lookup.get(column.strip().lower())
+        if header is None:
+            raise ValueError(f"Unknown column: {column}")
+        headers.append(header)
+    return headers
+
+def _cell_text(value: Any) -> str:
+    if isinstance(value, list):
+        return ', '.join(str(item) for item in value if item is not None)
+    return str(value) if value is not None else ''
+
+def stringify_courses(courses: List[Tuple[str, Dict[str, Any]]], headers: List[str]) -> List[List[str]]:
+    """
+    Turn course records into rows of text, joining list values with ", ".
+    
+    The field_N value is used when present, falling back to the record's
+    copy under the human-readable header.
+    
+    Args:
+        courses: (course code, record) pairs
+        headers: Export headers to include
+    
+    Returns:
+        One list of strings per course
+    """
+    rows = []
+    for slug, record in courses:
+        row = []
+        for header in headers:
+            field = CATALOG_COLUMNS[header]
+            if field == 'field_0':
+                row.append(slug)
+            else:
+                row.append(_cell_text(record.get(field, record.get(header))))
+        rows.append(row)
+    return rows
+
+def _chunks(items: Iterator, size: int) -> Iterator[list]:
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _iter_rows(catalog_path: str, headers: List[str], workers: int, chunksize: int) -> Iterator[List[str]]:
+    """Yield export rows in catalog order, stringifying chunks in worker processes."""
+    chunks = _chunks(iter_catalog(catalog_path), chunksize)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from stringify_courses(chunk, headers)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep at most two chunks per worker in flight so memory stays bounded
+        pending = []
+        for chunk in chunks:
+            pending.append(executor.submit(stringify_courses, chunk, headers))
+            if len(pending) >= 2 * workers:
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
+
+def export_catalog(output_path: str, catalog_path: str, columns: Optional[Iterable[str]] = None,
+                   workers: int = 1, chunksize: int = 2000) -> Dict[str, Any]:
+    """
+    Export the catalog to XLSX or CSV, streaming it from disk to disk.
+    
+    The catalog is read one record at a time and XLSX files are written with
+    openpyxl's write-only mode, so memory does not grow with the catalog.
+    
+    Args:
+        output_path: File to write; the .xlsx or .csv extension picks the format
+        catalog_path: Path to course_master.json
+        columns: Columns to export (see resolve_columns); all if None
+        workers: Processes used to stringify chunks of courses
+        chunksize: Courses per chunk
+    
+    Returns:
+        Dictionary with path, rows, seconds and rows_per_second
+    """
+    headers = resolve_columns(columns)
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension not in ('.xlsx', '.csv'):
+        raise ValueError("The output file must end in .xlsx or .csv")
+    
+    started = time.perf_counter()
+    rows = 0
+    if extension == '.xlsx':
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(title='Courses')
+        worksheet.append(headers)
+        for row in _iter_rows(catalog_path, headers, workers, chunksize):
+            worksheet.append(row)
+            rows += 1
+        workbook.save(output_path)
+    else:
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            for row in _iter_rows(catalog_path, headers, workers, chunksize):
+                writer.writerow(row)
+                rows += 1
+    
+    seconds = time.perf_counter() - started
+    return {
+        'path': output_path,
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0
+    }
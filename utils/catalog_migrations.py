@@ -0,0 +1,224 @@
+import os
+import json
+import datetime
+import tempfile
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from utils.config import CONFIG
+from utils.course_import import COURSE_FIELDS, LIST_FIELDS, parse_list_cell
+from utils.data_processor import replace_keeping_mode
+
+try:
+    import ijson
+except ImportError:  # Optional; the built-in incremental parser is used instead
+    ijson = None
+
+# Bytes read at a time when streaming the catalog
+READ_SIZE = 1 << 16
+
+def _fill_missing_fields(slug: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Give every course field_0..field_17, with field_0 set to the course code."""
+    filled = dict(record)
+    if not filled.get('field_0'):
+        filled['field_0'] = slug
+    for field in COURSE_FIELDS:
+        if field not in filled or filled[field] is None:
+            filled[field] = [] if field in LIST_FIELDS else ''
+    return filled
+
+def _parse_grade_tags(slug: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Store grade tags saved as text ('["10th Grade"]' or '10th Grade, 11th Grade') as lists."""
+    changed = dict(record)
+    for field in LIST_FIELDS:
+        value = changed.get(field)
+        if isinstance(value, str):
+            try:
+                changed[field] = parse_list_cell(value)
+            except ValueError:
+                changed[field] = [value.strip()]
+    return changed
+
+# (schema version, description, function(slug, record) -> record); applied in order.
+# Never edit a released migration; add a new one with the next version.
+MIGRATIONS: List[Tuple[int, str, Callable[[str, Dict[str, Any]], Dict[str, Any]]]] = [
+    (1, "Fill missing catalog fields (field_0 is the course code)", _fill_missing_fields),
+    (2, "Store grade tags as lists", _parse_grade_tags)
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def _catalog_path() -> str:
+    return os.path.join(CONFIG['paths']['data_dir'], 'course_master.json')
+
+def _meta_path(catalog_path: str) -> str:
+    """Sidecar file holding the schema version; the catalog itself maps course codes to records."""
+    return os.path.splitext(catalog_path)[0] + '.meta.json'
+
+def get_schema_version(catalog_path: Optional[str] = None) -> int:
+    """
+    Get the schema version of the catalog.
+    
+    Args:
+        catalog_path: Path to course_master.json (defaults to the data directory)
+    
+    Returns:
+        Version recorded by the last migration, or 0 if it was never migrated
+    """
+    meta_path = _meta_path(catalog_path or _catalog_path())
+    if not os.path.exists(meta_path):
+        return 0
+    with open(meta_path, 'r') as f:
+        return int(json.load(f).get('schema_version', 0))
+
+def iter_catalog(catalog_path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream (course code, record) pairs from the catalog without loading it whole.
+    
+    Uses ijson when it is installed, otherwise decodes one record at a time
+    from a small read buffer.
+    
+    Args:
+        catalog_path: Path to course_master.json
+    
+    Yields:
+        (course code, record) pairs in file order
+    """
+    if ijson is not None:
+        with open(catalog_path, 'rb') as f:
+            yield from ijson.kvitems(f, '', use_float=True)
+        return
+    
+    decoder = json.JSONDecoder()
+    with open(catalog_path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        position = 0
+        at_end = False
+        
+        def next_token() -> str:
+            nonlocal buffer, position, at_end
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position < len(buffer) or at_end:
+                    return buffer[position:position + 1]
+                buffer, position = f.read(READ_SIZE), 0
+                at_end = not buffer
+        
+        def next_value() -> Any:
+            nonlocal buffer, position, at_end
+            next_token()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                    # A number may continue past the end of the buffer (e.g. "1.5" of "1.5e3")
+                    number_may_continue = (isinstance(value, (int, float))
+                                           and not buffer[end:].lstrip('0123456789+-.eE'))
+                    if at_end or not number_may_continue:
+                        position = end
+                        return value
+                except json.JSONDecodeError:
+                    if at_end:
+                        raise
+                # Incomplete value: keep the unread part and read more, doubling
+                # the read for values larger than the buffer
+                chunk = f.read(max(READ_SIZE, len(buffer) - position))
+                at_end = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+        
+        def expect(token: str):
+            nonlocal position
+            found = next_token()
+            if found != token:
+                raise ValueError(f"Malformed catalog: expected {token!r}, found {found or 'end of file'!r}")
+            position += 1
+        
+        expect('{')
+        if next_token() == '}':
+            return
+        while True:
+            slug = next_value()
+            expect(':')
+            yield slug, next_value()
+            if next_token() == ',':
+                position += 1
+            else:
+                expect('}')
+                return
+
+def migrate_catalog(catalog_path: Optional[str] = None, target_version: Optional[int] = None,
+                    dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Bring the catalog up to a schema version in one streaming pass.
+    
+    Every pending migration is applied to each record as it is read, and the
+    result is written to a temporary file that replaces the catalog only once
+    the whole pass has succeeded, so memory use stays at one record and a
+    failed run leaves the catalog untouched.
+    
+    Args:
+        catalog_path: Path to course_master.json (defaults to the data directory)
+        target_version: Version to migrate to (defaults to LATEST_VERSION)
+        dry_run: Count the records each migration would change without writing
+    
+    Returns:
+        Dictionary with from_version, to_version, records and affected
+        (migration version -> number of records it changed)
+    """
+    catalog_path = catalog_path or _catalog_path()
+    target_version = LATEST_VERSION if target_version is None else target_version
+    from_version = get_schema_version(catalog_path)
+    if target_version < from_version:
+        raise ValueError(f"The catalog is at version {from_version}; migrations cannot be reversed")
+    pending = [(version, apply) for version, _, apply in MIGRATIONS if from_version < version <= target_version]
+    affected = {version: 0 for version, _ in pending}
+    records = 0
+    
+    if not pending:
+        return {'from_version': from_version, 'to_version': from_version, 'records': 0, 'affected': affected}
+    
+    directory = os.path.dirname(catalog_path) or '.'
+    output = None
+    temp_path = None
+    if not dry_run:
+        fd, temp_path = tempfile.mkstemp(prefix='.course_master-', suffix='.json', dir=directory)
+        output = os.fdopen(fd, 'w')
+    
+    try:
+        for slug, record in iter_catalog(catalog_path):
+            for version, apply in pending:
+                migrated = apply(slug, record)
+                if migrated != record:
+                    affected[version] += 1
+                record = migrated
+            
+            if output is not None:
+                # Same layout as json.dump(catalog, f, indent=2)
+                output.write('{\n  ' if records == 0 else ',\n  ')
+                output.write(json.dumps(slug) + ': ' + json.dumps(record, indent=2).replace('\n', '\n  '))
+            records += 1
+        
+        if output is not None:
+            output.write('\n}' if records else '{}')
+            output.flush()
+            os.fsync(output.fileno())
+            output.close()
+            output = None
+            replace_keeping_mode(temp_path, catalog_path)
+            _write_meta(catalog_path, target_version)
+    except Exception:
+        if output is not None:
+            output.close()
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return {'from_version': from_version, 'to_version': target_version, 'records': records, 'affected': affected}
+
+def _write_meta(catalog_path: str, version: int):
+    meta_path = _meta_path(catalog_path)
+    fd, temp_path = tempfile.mkstemp(prefix='.course_master-', suffix='.meta.json',
+                                     dir=os.path.dirname(meta_path) or '.')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'schema_version': version, 'migrated_at': datetime.datetime.now().isoformat()}, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    replace_keeping_mode(temp_path, meta_path)
@@ -0,0 +1,271 @@
+import os
+import json
+import zlib
+import hashlib
+import datetime
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.config import CONFIG
+
+# A chunk ends after a course whose code hashes to 0 modulo this, so chunks
+# average this many courses and their boundaries depend only on the course
+# codes: editing a course rewrites one chunk, adding one splits at most one.
+CHUNK_COURSES = 64
+
+# Chunk hashes are grouped into index nodes the same way
+INDEX_FANOUT = 64
+
+Course = Tuple[str, Dict[str, Any]]
+
+def _boundary(key: str, modulus: int) -> bool:
+    return zlib.crc32(key.encode('utf-8')) % modulus == 0
+
+def _split(items: List[Any], key, modulus: int) -> List[List[Any]]:
+    """Split items into runs ending at content-defined boundaries."""
+    runs = []
+    run = []
+    for item in items:
+        run.append(item)
+        if _boundary(key(item), modulus):
+            runs.append(run)
+            run = []
+    if run:
+        runs.append(run)
+    return runs
+
+class SnapshotStore:
+    """
+    Content-addressed history of the course catalog.
+    
+    The catalog is cut into chunks of consecutive courses at boundaries
+    chosen by hashing the course codes, and every chunk is stored once,
+    zlib-compressed, under the SHA-256 of its contents. Index nodes list
+    chunk hashes the same way, and a snapshot is the list of its index
+    node hashes. Unchanged chunks are shared between snapshots, so each
+    snapshot only adds the chunks its changes touched.
+    
+    The chunks of the last recorded snapshot are remembered with the record
+    objects they were built from. The catalog replaces a record when it
+    patches it, so a chunk whose records are all the same objects is reused
+    without serializing it again.
+    
+    Layout under root:
+        objects/ab/abcdef...   compressed chunks and index nodes
+        snapshots.jsonl        one line per recorded or restored snapshot
+        HEAD                   ID of the snapshot the catalog is at
+    """
+    
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._chunk_cache = {}
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+    
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+    
+    def _put(self, payload: Any) -> Tuple[str, int]:
+        """Store a JSON value unless it exists; returns its hash and the bytes written."""
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        compressed = zlib.compress(data, 6)
+        _atomic_write(path, compressed)
+        return digest, len(compressed)
+    
+    def _get(self, digest: str) -> Any:
+        with open(self._object_path(digest), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()).decode('utf-8'))
+    
+    def head(self) -> Optional[str]:
+        """ID of the current snapshot, or None if nothing was recorded yet."""
+        try:
+            with open(os.path.join(self.root, 'HEAD'), 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def _set_head(self, snapshot_id: str, entry: Dict[str, Any]):
+        with open(os.path.join(self.root, 'snapshots.jsonl'), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        _atomic_write(os.path.join(self.root, 'HEAD'), snapshot_id.encode('utf-8'))
+    
+    def record(self, courses: Iterable[Course], note: str = '') -> Optional[Dict[str, Any]]:
+        """
+        Store the catalog as a snapshot and make it HEAD.
+        
+        Args:
+            courses: (course code, record) pairs in catalog order
+            note: What caused the change, shown in the history
+        
+        Returns:
+            The history entry, or None if the catalog equals HEAD
+        """
+        courses = list(courses)
+        with self._lock:
+            stored = 0
+            chunk_hashes = []
+            chunk_cache = {}
+            for chunk in _split(courses, lambda course: course[0], CHUNK_COURSES):
+                slugs = tuple(slug for slug, _ in chunk)
+                records = tuple(record for _, record in chunk)
+                cached = self._chunk_cache.get(slugs)
+                if cached is not None and all(old is new for old, new in zip(cached[0], records)):
+                    digest = cached[1]
+                else:
+                    digest, written = self._put(chunk)
+                    stored += written
+                chunk_hashes.append(digest)
+                chunk_cache[slugs] = (records, digest)
+            self._chunk_cache = chunk_cache
+            tree = []
+            for node in _split(chunk_hashes, lambda digest: digest, INDEX_FANOUT):
+                digest, written = self._put(node)
+                tree.append(digest)
+                stored += written
+            snapshot_id, written = self._put(tree)
+            stored += written
+            
+            if snapshot_id == self.head():
+                return None
+            entry = {
+                'id': snapshot_id,
+                'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'courses': len(courses),
+                'stored_bytes': stored,
+                'note': note
+            }
+            self._set_head(snapshot_id, entry)
+            return entry
+    
+    def list_snapshots(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        History entries, newest first; the entry that set HEAD has 'head': True.
+        
+        Args:
+            limit: Maximum entries to return
+        
+        Returns:
+            List of dictionaries with id, created_at, courses, stored_bytes and note
+        """
+        path = os.path.join(self.root, 'snapshots.jsonl')
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        entries.reverse()
+        head = self.head()
+        for position, entry in enumerate(entries):
+            entry['head'] = position == 0 and entry['id'] == head
+        return entries[:limit] if limit is not None else entries
+    
+    def _chunk_hashes(self, snapshot_id: str) -> List[str]:
+        return [digest for node in self._get(snapshot_id) for digest in self._get(node)]
+    
+    def load(self, snapshot_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Rebuild the catalog of a snapshot.
+        
+        Args:
+            snapshot_id: ID from list_snapshots
+        
+        Returns:
+            Course master data (slug -> record) in its original order
+        """
+        courses = {}
+        for digest in self._chunk_hashes(snapshot_id):
+            for slug, record in self._get(digest):
+                courses[slug] = record
+        return courses
+    
+    def diff(self, old_id: str, new_id: str) -> Dict[str, Any]:
+        """
+        Compare two snapshots; chunks they share are skipped without being read.
+        
+        Args:
+            old_id: Earlier snapshot ID
+            new_id: Later snapshot ID
+        
+        Returns:
+            Dictionary with 'added' and 'removed' course codes and 'changed'
+            (course code -> list of fields that differ)
+        """
+        old_hashes = self._chunk_hashes(old_id)
+        new_hashes = self._chunk_hashes(new_id)
+        shared = set(old_hashes) & set(new_hashes)
+        old = {slug: record for digest in old_hashes if digest not in shared for slug, record in self._get(digest)}
+        new = {slug: record for digest in new_hashes if digest not in shared for slug, record in self._get(digest)}
+        
+        changed = {}
+        for slug in old.keys() & new.keys():
+            fields = [field for field in dict.fromkeys([*old[slug], *new[slug]])
+                      if old[slug].get(field) != new[slug].get(field)]
+            if fields:
+                changed[slug] = fields
+        # A course moved between chunks appears in both without changes
+        return {
+            'added': sorted(new.keys() - old.keys()),
+            'removed': sorted(old.keys() - new.keys()),
+            'changed': dict(sorted(changed.items()))
+        }
+    
+    def restore(self, snapshot_id: str, note: str = '') -> Dict[str, Dict[str, Any]]:
+        """
+        Move HEAD to an earlier snapshot without storing anything new.
+        
+        Args:
+            snapshot_id: ID from list_snapshots
+            note: Shown in the history
+        
+        Returns:
+            The snapshot's catalog, for the caller to load
+        """
+        with self._lock:
+            courses = self.load(snapshot_id)
+            self._set_head(snapshot_id, {
+                'id': snapshot_id,
+                'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'courses': len(courses),
+                'stored_bytes': 0,
+                'note': note or f"Rolled back to {snapshot_id[:12]}"
+            })
+            return courses
+    
+    def size(self) -> int:
+        """Bytes used by stored objects."""
+        total = 0
+        for directory, _, files in os.walk(os.path.join(self.root, 'objects')):
+            total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        return total
+
+def _atomic_write(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_snapshot_store(root: Optional[str] = None) -> SnapshotStore:
+    """
+    Get the snapshot store for a directory (defaults to CONFIG['paths']['catalog_snapshots_dir']).
+    
+    Returns:
+        SnapshotStore instance
+    """
+    root = root or CONFIG['paths']['catalog_snapshots_dir']
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = SnapshotStore(root)
+        return _stores[root]
@@ -30,8 +30,13 @@ CONFIG = {
     'paths': {
         'data_dir': 'data',
         'export_dir': 'exports',
-        'history_dir': 'history'  # New directory for history files
+        'history_dir': 'history',  # New directory for history files
+        'requests_file': os.path.join('data', 'requests.jsonl'),  # Shared request event log
+        'requests_db': os.path.join('data', 'requests.sqlite3'),  # Used when request_backend is 'sqlite'
+        'catalog_snapshots_dir': os.path.join('data', 'catalog_snapshots'),  # History of course_master.json
+        'reference_cache': os.path.join('data', 'reference_cache.pkl')  # Reference tabs pulled from Google Sheets
     },
+    'data': load_config()['data'],  # Reference spreadsheet settings from config.json
     'slug_format': {
         'pattern': r'^[a-zA-Z]+-[a-zA-Z0-9-]+$',
         'example': 'vtp-math-grade-6'
@@ -47,6 +52,33 @@ CONFIG = {
         }
     },
     'defaults': {
-        'default_duration_minutes': 60
+        'default_duration_minutes': 60,
+        'export_workers': 2,  # Background export jobs that may run at once
+        'approval_page_size': 50,  # Requests per page in the approval queue
+        'duplicate_policy': 'flag',  # 'flag', 'reject' or 'allow' repeated class requests
+        'request_backend': 'jsonl',  # 'sqlite' to share requests between several server processes
+        'catalog_flush_seconds': 0.5,  # Course edits made within this window share one file write
+        'catalog_snapshots': True  # Keep a snapshot of the catalog after every write for rollback
+    },
+    # parent_data.csv column -> course_master.json field, used by update_course_master_with_data.py
+    'parent_data_columns': {
+        'slug': 'field_0',
+        'state': 'field_1',
+        'parent': 'field_2',
+        'parent_title': 'field_3',
+        'item_name': 'field_4',
+        'commodity': 'field_5',
+        'item_type': 'field_6',
+        'business_units': 'field_7',
+        'subject_name': 'field_8',
+        'subject_id': 'field_9',
+        'grades': 'field_10',
+        'days_of_week': 'field_11',
+        'course_hours': 'field_12',
+        'session_count': 'field_13',
+        'capacity': 'field_14',
+        'price_dollars': 'field_15',
+        'image_file_name': 'field_16',
+        'item_tags': 'field_17'
     }
 } 
\ No newline at end of file
@@ -0,0 +1,226 @@
+import heapq
+import datetime
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import pandas as pd
+from utils.config import CONFIG
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Requests that occupy their time slots; denied requests never run
+ACTIVE_STATUSES = ('Pending', 'Approved')
+
+CONFLICT_COLUMNS = [
+    'request_id', 'other_id', 'kind', 'slug', 'status', 'other_slug', 'other_status', 'sessions', 'first_overlap'
+]
+
+# (session start, session end, request ID, anchor); see sweep_overlaps
+Interval = Tuple[datetime.datetime, datetime.datetime, str, bool]
+
+def expand_sessions(record: Dict[str, Any], duration_minutes: int) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Expand a request into its concrete class sessions.
+    
+    Args:
+        record: Request with meeting_days ("Monday,Wednesday"), start_date,
+            end_date, start_time and excluded_meeting_dates ("YYYY-MM-DD,...")
+        duration_minutes: Length of each session
+    
+    Returns:
+        List of (start, end) datetimes in date order; empty if the request is incomplete
+    """
+    start_date = record.get('start_date')
+    end_date = record.get('end_date')
+    start_time = record.get('start_time')
+    if not (isinstance(start_date, datetime.date) and isinstance(end_date, datetime.date)
+            and isinstance(start_time, datetime.time)):
+        return []
+    
+    weekdays = {DAY_NAMES.index(day.strip()) for day in str(record.get('meeting_days') or '').split(',')
+                if day.strip() in DAY_NAMES}
+    excluded = set(filter(None, str(record.get('excluded_meeting_dates') or '').split(',')))
+    duration = datetime.timedelta(minutes=duration_minutes)
+    
+    sessions = []
+    for weekday in weekdays:
+        day = start_date + datetime.timedelta(days=(weekday - start_date.weekday()) % 7)
+        while day <= end_date:
+            if day.isoformat() not in excluded:
+                start = datetime.datetime.combine(day, start_time)
+                sessions.append((start, start + duration))
+            day += datetime.timedelta(days=7)
+    sessions.sort()
+    return sessions
+
+def sweep_overlaps(intervals: List[Interval]) -> Iterator[Tuple[str, str, datetime.datetime]]:
+    """
+    Find overlapping intervals of different requests with a sweep line.
+    
+    Intervals are sorted by start once; the intervals still open at each start
+    are kept in min-heaps by end time, so every reported pair is found directly
+    and the total cost is O((n + k) log n) for n intervals and k overlaps.
+    
+    A pair is reported only if at least one of its intervals is an anchor, so
+    callers can look for e.g. clashes with approved classes without paying
+    for every overlap among pending ones.
+    
+    Args:
+        intervals: (start, end, request ID, anchor) tuples; end is exclusive
+    
+    Yields:
+        (request ID, other request ID, overlap start) for each overlapping pair
+    """
+    open_anchors = []
+    open_others = []
+    for start, end, request_id, anchor in sorted(intervals, key=lambda interval: interval[0]):
+        for heap in (open_anchors, open_others):
+            while heap and heap[0][0] <= start:
+                heapq.heappop(heap)
+        
+        candidates = open_anchors + open_others if anchor else open_anchors
+        for _, other_id in candidates:
+            if other_id != request_id:
+                yield other_id, request_id, start
+        heapq.heappush(open_anchors if anchor else open_others, (end, request_id))
+
+def find_conflicts(records: Iterable[Tuple[str, Dict[str, Any]]],
+                   duration_minutes: Optional[int] = None) -> pd.DataFrame:
+    """
+    Report pairs of active requests whose sessions overlap.
+    
+    Two kinds of conflict are checked:
+    - 'same course': two requests for the same slug overlap
+    - 'livestream slot': a request overlaps an approved Livestream class
+      (pending requests may still be approved as Livestream)
+    
+    Args:
+        records: (request ID, request) pairs, e.g. from RequestStore.records
+        duration_minutes: Session length (defaults to CONFIG['defaults']['default_duration_minutes'])
+    
+    Returns:
+        DataFrame with one row per conflicting pair and kind (CONFLICT_COLUMNS)
+    """
+    if duration_minutes is None:
+        duration_minutes = CONFIG['defaults']['default_duration_minutes']
+    
+    requests = {}
+    by_slug = {}
+    livestream = []
+    for request_id, record in records:
+        if record.get('status') not in ACTIVE_STATUSES:
+            continue
+        sessions = expand_sessions(record, duration_minutes)
+        if not sessions:
+            continue
+        requests[request_id] = record
+        by_slug.setdefault(record.get('slug'), []).extend(
+            (start, end, request_id, True) for start, end in sessions
+        )
+        is_live = record.get('status') == 'Approved' and record.get('class_type') == 'Livestream'
+        livestream.extend((start, end, request_id, is_live) for start, end in sessions)
+    
+    # Overlapping sessions are counted per request pair; the sweep runs in
+    # start order, so the first overlap seen for a pair is its earliest
+    slugs = {request_id: record.get('slug') for request_id, record in requests.items()}
+    pairs = {}
+    groups = [('same course', intervals) for intervals in by_slug.values() if len(intervals) > 1]
+    groups.append(('livestream slot', livestream))
+    for kind, intervals in groups:
+        check_slug = kind == 'livestream slot'
+        for request_id, other_id, overlap_start in sweep_overlaps(intervals):
+            if check_slug and slugs[request_id] == slugs[other_id]:
+                # Already reported as the same course
+                continue
+            key = (request_id, other_id, kind) if request_id < other_id else (other_id, request_id, kind)
+            entry = pairs.get(key)
+            if entry is None:
+                pairs[key] = [1, overlap_start]
+            else:
+                entry[0] += 1
+    
+    rows = []
+    for (request_id, other_id, kind), (sessions, first_overlap) in sorted(pairs.items()):
+        rows.append({
+            'request_id': request_id,
+            'other_id': other_id,
+            'kind': kind,
+            'slug': requests[request_id].get('slug'),
+            'status': requests[request_id].get('status'),
+            'other_slug': requests[other_id].get('slug'),
+            'other_status': requests[other_id].get('status'),
+            'sessions': sessions,
+            'first_overlap': first_overlap
+        })
+    return pd.DataFrame(rows, columns=CONFLICT_COLUMNS)
+
+def summarize_conflicts(conflicts: pd.DataFrame) -> Dict[str, str]:
+    """
+    Describe each request's conflicts in one line, e.g.
+    "same course: vtgsc-math-1 (Approved, 8 sessions from 2025-06-02 15:00)".
+    
+    Args:
+        conflicts: DataFrame from find_conflicts
+    
+    Returns:
+        Dictionary mapping request ID to its description
+    """
+    descriptions = {}
+    for row in conflicts.itertuples(index=False):
+        detail = f"{row.sessions} session{'s' if row.sessions != 1 else ''} from {row.first_overlap:%Y-%m-%d %H:%M}"
+        descriptions.setdefault(row.request_id, []).append(
+            f"{row.kind}: {row.other_slug} ({row.other_status}, {detail})"
+        )
+        descriptions.setdefault(row.other_id, []).append(
+            f"{row.kind}: {row.slug} ({row.status}, {detail})"
+        )
+    return {request_id: '; '.join(items) for request_id, items in descriptions.items()}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def get_conflicts(store) -> pd.DataFrame:
+    """
+    Get the conflicts among the store's active requests, recomputed only when
+    the store has changed since the last call.
+    
+    Args:
+        store: RequestStore
+    
+    Returns:
+        DataFrame from find_conflicts
+    """
+    return _cached(store)['conflicts']
+
+def get_conflict_summary(store) -> Dict[str, str]:
+    """
+    Get summarize_conflicts() of get_conflicts(store), cached the same way.
+    
+    Args:
+        store: RequestStore
+    
+    Returns:
+        Dictionary mapping request ID to a description of its conflicts
+    """
+    entry = _cached(store)
+    with _cache_lock:
+        if entry['summary'] is None:
+            entry['summary'] = summarize_conflicts(entry['conflicts'])
+        return entry['summary']
+
+def _cached(store) -> Dict[str, Any]:
+    duration_minutes = CONFIG['defaults']['default_duration_minutes']
+    with _cache_lock:
+        entry = _cache.get(id(store))
+        if entry and entry['stamp'] == (store.version, duration_minutes):
+            return entry
+        version = store.version
+        records = []
+        for status in ACTIVE_STATUSES:
+            records.extend(store.records(store.ids_by_status(status)))
+        entry = {
+            'stamp': (version, duration_minutes),
+            'conflicts': find_conflicts(records, duration_minutes),
+            'summary': None
+        }
+        _cache[id(store)] = entry
+        return entry
@@ -0,0 +1,217 @@
+import json
+import hashlib
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+import pandas as pd
+from utils.ingest import read_table
+from utils.data_processor import get_course_catalog
+
+COURSE_FIELDS = [f'field_{number}' for number in range(1, 18)]
+
+# Spreadsheet headers (matched case-insensitively) for the course code and each catalog field
+COURSE_FIELD_HEADERS = {
+    'slug': ['slug', 'course code', 'field_0'],
+    'field_1': ['state'],
+    'field_2': ['parent'],
+    'field_3': ['parent title'],
+    'field_4': ['item name'],
+    'field_5': ['commodity type', 'commodity'],
+    'field_6': ['item type'],
+    'field_7': ['business units'],
+    'field_8': ['subject name - general', 'subject name'],
+    'field_9': ['subject id'],
+    'field_10': ['parent grade tags', 'grade tags'],
+    'field_11': ['days of week'],
+    'field_12': ['parent course hours'],
+    'field_13': ['session count'],
+    'field_14': ['capacity'],
+    'field_15': ['price dollars', 'price in dollars'],
+    'field_16': ['content product image', 'content product image link'],
+    'field_17': ['item tags']
+}
+
+# Fields stored as lists in course_master.json
+LIST_FIELDS = ('field_10',)
+
+def _map_headers(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Rename human-readable headers (or field_N headers) to catalog field names."""
+    lookup = {field: field for field in COURSE_FIELD_HEADERS}
+    lookup.update({alias: field for field, aliases in COURSE_FIELD_HEADERS.items() for alias in aliases})
+    renamed = {}
+    for column in chunk.columns:
+        field = lookup.get(str(column).strip().lower())
+        if field and field not in renamed.values():
+            renamed[column] = field
+    return chunk[list(renamed)].rename(columns=renamed)
+
+def parse_list_cell(value: str) -> List[str]:
+    """
+    Parse a list cell such as '["10th Grade","11th Grade"]' or '10th Grade, 11th Grade'.
+    
+    Raises:
+        ValueError: If the cell looks like JSON but is not a list of values
+    """
+    value = value.strip()
+    if not value:
+        return []
+    if value.startswith('['):
+        parsed = json.loads(value)
+        if not isinstance(parsed, list):
+            raise ValueError("not a list")
+        return [item if item is None else str(item) for item in parsed]
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def canonical_course_value(field: str, value: Any) -> Any:
+    """Comparable form of a catalog value; a few item tags are stored as one-element lists."""
+    if value is None:
+        return [] if field in LIST_FIELDS else ''
+    if field == 'field_17' and isinstance(value, list):
+        return ';'.join(str(item) for item in value)
+    return value
+
+def stored_course_value(field: str, value: Any, current: Any) -> Any:
+    """Store a new value in the form the course already holds, keeping one-element item tag lists as lists."""
+    if field == 'field_17' and isinstance(current, list):
+        return [value] if value else []
+    return value
+
+def course_digest(record: Dict[str, Any], fields: List[str]) -> str:
+    """
+    Hash the given fields of a course record.
+    
+    Args:
+        record: Course record
+        fields: Fields to include, in order
+    
+    Returns:
+        Hex SHA-1 digest
+    """
+    payload = json.dumps([canonical_course_value(field, record.get(field)) for field in fields], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def diff_course_file(source: Union[str, IO], catalog: Dict[str, Dict[str, Any]], chunksize: int = 5000,
+                     file_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compare a course spreadsheet with the catalog, reading it in chunks.
+    
+    Only the columns present in the file are compared and imported, so a sheet
+    with just "Slug" and "Price Dollars" updates prices and nothing else. Each
+    record is compared by content hash, so unchanged rows cost one hash each.
+    
+    Args:
+        source: Path or binary file object of a CSV or XLSX file
+        catalog: Course master data (slug -> record)
+        chunksize: Rows read at a time
+        file_name: File name used to detect the format when source is a file object
+    
+    Returns:
+        Dictionary with:
+        - 'fields': catalog fields found in the file
+        - 'inserts': slug -> new record
+        - 'updates': slug -> {field: (old value, new value)} for changed fields only
+        - 'unchanged': number of rows identical to the catalog
+        - 'errors': DataFrame of skipped rows (row, slug, error)
+    """
+    fields = None
+    inserts = {}
+    updates = {}
+    unchanged = 0
+    errors = []
+    seen = set()
+    catalog_digests = {}
+    row_offset = 0
+    
+    for chunk in read_table(source, chunksize=chunksize, file_name=file_name):
+        chunk = _map_headers(chunk)
+        if 'slug' not in chunk.columns:
+            raise ValueError("The file has no Slug column")
+        if fields is None:
+            fields = [field for field in COURSE_FIELDS if field in chunk.columns]
+        
+        # Column lists are much cheaper to walk than to_dict('records') on string columns
+        slugs = chunk['slug'].astype(str).str.strip().tolist()
+        values = [chunk[field].astype(str).tolist() if field in LIST_FIELDS
+                  else chunk[field].astype(str).str.strip().tolist() for field in fields]
+        for position, (slug, row) in enumerate(zip(slugs, zip(*values))):
+            # Spreadsheet row numbers: header is row 1
+            row_number = row_offset + position + 2
+            if not slug:
+                errors.append((row_number, slug, "Missing course code"))
+                continue
+            if slug in seen:
+                errors.append((row_number, slug, "Course code repeated in file; the first row is used"))
+                continue
+            seen.add(slug)
+            
+            try:
+                record = {field: parse_list_cell(value) if field in LIST_FIELDS else value
+                          for field, value in zip(fields, row)}
+            except ValueError as e:
+                errors.append((row_number, slug, f"Invalid list value: {str(e)}"))
+                continue
+            
+            existing = catalog.get(slug)
+            if existing is None:
+                inserts[slug] = record
+                continue
+            if slug not in catalog_digests:
+                catalog_digests[slug] = course_digest(existing, fields)
+            if course_digest(record, fields) == catalog_digests[slug]:
+                unchanged += 1
+                continue
+            updates[slug] = {
+                field: (existing.get(field), value) for field, value in record.items()
+                if canonical_course_value(field, existing.get(field)) != value
+            }
+        row_offset += len(chunk)
+    
+    return {
+        'fields': fields or [],
+        'inserts': inserts,
+        'updates': updates,
+        'unchanged': unchanged,
+        'errors': pd.DataFrame(errors, columns=['row', 'slug', 'error'])
+    }
+
+def preview_course_diff(diff: Dict[str, Any], limit: int = 1000) -> pd.DataFrame:
+    """
+    Build a preview table of an import: one row per inserted or updated course.
+    
+    Args:
+        diff: Result of diff_course_file
+        limit: Maximum rows to include
+    
+    Returns:
+        DataFrame with slug, action and changes columns
+    """
+    rows = []
+    for slug in list(diff['inserts'])[:limit]:
+        rows.append({'slug': slug, 'action': 'insert', 'changes': ''})
+    for slug, changes in list(diff['updates'].items())[:max(limit - len(rows), 0)]:
+        rows.append({
+            'slug': slug,
+            'action': 'update',
+            'changes': '; '.join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in changes.items())
+        })
+    return pd.DataFrame(rows, columns=['slug', 'action', 'changes'])
+
+def apply_course_diff(diff: Dict[str, Any], catalog=None) -> Tuple[int, int]:
+    """
+    Apply an import to the catalog in one batched write.
+    
+    Args:
+        diff: Result of diff_course_file
+        catalog: CourseCatalog (defaults to the process-wide catalog)
+    
+    Returns:
+        Tuple of (courses inserted, courses updated)
+    """
+    if catalog is None:
+        catalog = get_course_catalog()
+    
+    # New courses get every catalog field, blank where the file has no column for it
+    blank = {field: [] if field in LIST_FIELDS else '' for field in COURSE_FIELDS}
+    patches = {slug: {'field_0': slug, **blank, **record} for slug, record in diff['inserts'].items()}
+    patches.update({slug: {field: stored_course_value(field, new, old) for field, (old, new) in changes.items()}
+                    for slug, changes in diff['updates'].items()})
+    catalog.upsert_many(patches)
+    return len(diff['inserts']), len(diff['updates'])
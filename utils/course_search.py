@@ -0,0 +1,232 @@
+import re
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+import numpy as np
+from utils.data_processor import get_catalog_index
+
+# Facet name -> label shown in Manage Courses
+FACETS = {
+    'brand': 'Brand',
+    'item_type': 'Item Type',
+    'subject': 'Subject',
+    'grade': 'Grade'
+}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def tokenize(text: Any) -> List[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return TOKEN_PATTERN.findall(str(text or '').lower())
+
+def course_tokens(slug: str, record: Dict[str, Any]) -> Set[str]:
+    """Searchable tokens of a course: its code, parent title (field_3) and item name (field_4)."""
+    return set(tokenize(slug)) | set(tokenize(record.get('field_3'))) | set(tokenize(record.get('field_4')))
+
+def course_facets(slug: str, record: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Facet values of a course.
+    
+    Args:
+        slug: Course code; its prefix before the first "-" is the brand
+        record: Course record
+    
+    Returns:
+        Facet name -> values (grade has one value per grade tag)
+    """
+    grades = record.get('field_10') or []
+    if not isinstance(grades, list):
+        grades = [grades]
+    facets = {
+        'brand': [slug.split('-', 1)[0]] if slug else [],
+        'item_type': [record.get('field_6')],
+        'subject': [record.get('field_8')],
+        'grade': grades
+    }
+    return {facet: [str(value).strip() for value in values if value is not None and str(value).strip()]
+            for facet, values in facets.items()}
+
+def mask_from_ids(ids: Iterable[int], size: int) -> int:
+    """Build an int bitset with the given bits set."""
+    bits = np.zeros(size, dtype=bool)
+    bits[np.fromiter(ids, dtype=np.int64)] = True
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+def ids_from_mask(mask: int, limit: Optional[int] = None) -> List[int]:
+    """The set bits of an int bitset, lowest first (only the first limit if given)."""
+    if not mask:
+        return []
+    data = np.frombuffer(mask.to_bytes((mask.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(data, bitorder='little'))[:limit].tolist()
+
+class CourseSearchIndex:
+    """
+    Inverted index and facet bitsets over the course catalog.
+    
+    Text tokens map to sets of course numbers. Each facet value maps to an
+    int bitset with one bit per course, so filtering is a few big-int ANDs
+    and every facet count is a popcount. Courses are numbered in catalog
+    order, and results come back in that order.
+    
+    Facet counts are disjunctive: the counts for one facet apply every
+    filter except that facet's own, so picking a brand still shows the
+    other brands and how many courses each would add.
+    """
+    
+    def __init__(self, courses: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.version = None
+        self._lock = threading.RLock()
+        self.build(courses or {})
+    
+    def build(self, courses: Dict[str, Dict[str, Any]]):
+        """Index every course from scratch."""
+        with self._lock:
+            self._slugs = list(courses)
+            self._ids = {slug: number for number, slug in enumerate(self._slugs)}
+            self._terms = []
+            postings = {}
+            facet_ids = {facet: {} for facet in FACETS}
+            for number, (slug, record) in enumerate(courses.items()):
+                tokens = course_tokens(slug, record)
+                facets = course_facets(slug, record)
+                self._terms.append((tokens, facets))
+                for token in tokens:
+                    postings.setdefault(token, set()).add(number)
+                for facet, values in facets.items():
+                    for value in values:
+                        facet_ids[facet].setdefault(value, []).append(number)
+            
+            size = len(self._slugs)
+            self._postings = postings
+            self._tokens = sorted(postings)
+            self._all = (1 << size) - 1
+            self._facets = {facet: {value: mask_from_ids(ids, size) for value, ids in values.items()}
+                            for facet, values in facet_ids.items()}
+    
+    def update(self, slug: str, record: Dict[str, Any]):
+        """Add a course or re-index an edited one."""
+        with self._lock:
+            number = self._ids.get(slug)
+            if number is None:
+                number = len(self._slugs)
+                self._slugs.append(slug)
+                self._ids[slug] = number
+                self._terms.append((set(), {}))
+                self._all |= 1 << number
+            bit = 1 << number
+            
+            old_tokens, old_facets = self._terms[number]
+            tokens = course_tokens(slug, record)
+            facets = course_facets(slug, record)
+            for token in old_tokens - tokens:
+                self._postings[token].discard(number)
+            for token in tokens - old_tokens:
+                if token not in self._postings:
+                    self._postings[token] = set()
+                    bisect.insort(self._tokens, token)
+                self._postings[token].add(number)
+            for facet in FACETS:
+                old_values = set(old_facets.get(facet, []))
+                new_values = set(facets[facet])
+                masks = self._facets[facet]
+                for value in old_values - new_values:
+                    masks[value] &= ~bit
+                    if not masks[value]:
+                        del masks[value]
+                for value in new_values - old_values:
+                    masks[value] = masks.get(value, 0) | bit
+            self._terms[number] = (tokens, facets)
+    
+    def __len__(self) -> int:
+        return len(self._slugs)
+    
+    def _text_mask(self, text: str) -> int:
+        """Courses matching every word; the last word also matches as a prefix (search as you type)."""
+        words = tokenize(text)
+        if not words:
+            return self._all
+        matches = []
+        for word in words[:-1]:
+            matches.append(self._postings.get(word, set()))
+        last = words[-1]
+        start = bisect.bisect_left(self._tokens, last)
+        prefixed = set()
+        for token in self._tokens[start:]:
+            if not token.startswith(last):
+                break
+            prefixed |= self._postings[token]
+        matches.append(prefixed)
+        matches.sort(key=len)
+        result = set(matches[0])
+        for match in matches[1:]:
+            result &= match
+            if not result:
+                return 0
+        return mask_from_ids(result, len(self._slugs)) if result else 0
+    
+    def search(self, text: str = '', filters: Optional[Dict[str, Iterable[str]]] = None,
+               limit: int = 200) -> Dict[str, Any]:
+        """
+        Find courses by text and facet values.
+        
+        Args:
+            text: Words to match in the course code, parent title or item name
+            filters: Facet name -> accepted values; values of one facet are
+                alternatives, different facets must all match
+            limit: Maximum course codes to return
+        
+        Returns:
+            Dictionary with:
+            - 'total': number of matching courses
+            - 'slugs': up to limit matching course codes, in catalog order
+            - 'facets': facet name -> {value: count}, most common first
+        """
+        filters = {facet: list(values) for facet, values in (filters or {}).items() if values}
+        with self._lock:
+            base = self._text_mask(text)
+            selected = {}
+            for facet, values in filters.items():
+                masks = self._facets.get(facet, {})
+                mask = 0
+                for value in values:
+                    mask |= masks.get(value, 0)
+                selected[facet] = mask
+            
+            result = base
+            for mask in selected.values():
+                result &= mask
+            
+            facet_counts = {}
+            for facet, masks in self._facets.items():
+                scope = base
+                for other, mask in selected.items():
+                    if other != facet:
+                        scope &= mask
+                counts = {}
+                if scope:
+                    for value, mask in masks.items():
+                        count = (scope & mask).bit_count()
+                        if count:
+                            counts[value] = count
+                facet_counts[facet] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+            
+            return {
+                'total': result.bit_count(),
+                'slugs': [self._slugs[number] for number in ids_from_mask(result, limit)],
+                'facets': facet_counts
+            }
+
+def get_course_search_index(catalog=None) -> CourseSearchIndex:
+    """
+    Get the search index of a catalog, brought up to date with its changes.
+    
+    Edited courses are re-indexed one by one; the index is rebuilt only if
+    the catalog was reloaded or replaced.
+    
+    Args:
+        catalog: CourseCatalog (defaults to the process-wide catalog)
+    
+    Returns:
+        CourseSearchIndex
+    """
+    return get_catalog_index(CourseSearchIndex, catalog)
@@ -0,0 +1,233 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.course_search import mask_from_ids, ids_from_mask
+from utils.data_processor import get_course_catalog, get_catalog_index
+
+def split_tags(value: Any) -> List[str]:
+    """
+    Split an item tags value (field_17) into tags.
+    
+    Args:
+        value: Semicolon-joined string, or a list of such strings
+    
+    Returns:
+        Tags in their original order, without blanks or repeats
+    """
+    parts = value if isinstance(value, list) else [value]
+    tags = []
+    for part in parts:
+        for tag in str(part or '').split(';'):
+            tag = tag.strip()
+            if tag and tag not in tags:
+                tags.append(tag)
+    return tags
+
+def join_tags(tags: Iterable[str]) -> str:
+    """Store tags the way course_master.json does: one semicolon-joined string."""
+    return ';'.join(tags)
+
+class TagIndex:
+    """
+    Interned item tags with one bitset per tag.
+    
+    Each distinct tag gets an integer ID, each course keeps a tuple of tag IDs
+    (courses with the same tags share one tuple), and each tag has an int
+    bitset over course numbers (catalog order). Tag queries are bitwise
+    operations on those bitsets.
+    
+    Course numbers only stay the same until the index is rebuilt, so a query
+    result must be used with the generation it was made at.
+    """
+    
+    def __init__(self, courses: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.version = None
+        self.generation = 0
+        self._lock = threading.RLock()
+        self.build(courses or {})
+    
+    def build(self, courses: Dict[str, Dict[str, Any]]):
+        """Index the tags of every course from scratch."""
+        with self._lock:
+            self.generation += 1
+            self._slugs = list(courses)
+            self._ids = {slug: number for number, slug in enumerate(self._slugs)}
+            self._tag_ids = {}
+            self._tag_names = []
+            self._combos = {}
+            self._course_tags = []
+            members = []
+            for number, record in enumerate(courses.values()):
+                tag_ids = self._intern(split_tags(record.get('field_17')))
+                self._course_tags.append(tag_ids)
+                for tag_id in tag_ids:
+                    if tag_id == len(members):
+                        members.append([])
+                    members[tag_id].append(number)
+            size = len(self._slugs)
+            self._bits = [mask_from_ids(ids, size) for ids in members]
+            self._all = (1 << size) - 1
+    
+    def _intern(self, tags: List[str]) -> Tuple[int, ...]:
+        """Tag IDs of a tag list, assigning IDs to new tags and sharing identical tuples."""
+        tag_ids = []
+        for tag in tags:
+            tag_id = self._tag_ids.get(tag)
+            if tag_id is None:
+                tag_id = self._tag_ids[tag] = len(self._tag_names)
+                self._tag_names.append(tag)
+            tag_ids.append(tag_id)
+        key = tuple(tag_ids)
+        return self._combos.setdefault(key, key)
+    
+    def update(self, slug: str, record: Dict[str, Any]):
+        """Add a course or re-index its tags after an edit."""
+        with self._lock:
+            number = self._ids.get(slug)
+            if number is None:
+                number = len(self._slugs)
+                self._slugs.append(slug)
+                self._ids[slug] = number
+                self._course_tags.append(())
+                self._all |= 1 << number
+            bit = 1 << number
+            
+            old_ids = set(self._course_tags[number])
+            tag_ids = self._intern(split_tags(record.get('field_17')))
+            self._bits.extend([0] * (len(self._tag_names) - len(self._bits)))
+            for tag_id in old_ids - set(tag_ids):
+                self._bits[tag_id] &= ~bit
+            for tag_id in set(tag_ids) - old_ids:
+                self._bits[tag_id] |= bit
+            self._course_tags[number] = tag_ids
+    
+    def __len__(self) -> int:
+        return len(self._slugs)
+    
+    def tags(self) -> Dict[str, int]:
+        """Every tag in use with its number of courses, most common first."""
+        with self._lock:
+            counts = {name: self._bits[tag_id].bit_count() for tag_id, name in enumerate(self._tag_names)}
+        return {name: count for name, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])) if count}
+    
+    def tags_of(self, slug: str) -> List[str]:
+        """Tags of one course, in stored order."""
+        with self._lock:
+            return [self._tag_names[tag_id] for tag_id in self._course_tags[self._ids[slug]]]
+    
+    def query(self, all_of: Iterable[str] = (), any_of: Iterable[str] = (),
+              none_of: Iterable[str] = ()) -> int:
+        """
+        Select courses by tags, e.g. query(all_of=['livestream_course'], none_of=['webinar_offering']).
+        
+        Args:
+            all_of: Tags a course must all have
+            any_of: Tags of which a course must have at least one (ignored if empty)
+            none_of: Tags a course must not have
+        
+        Returns:
+            Bitset of matching course numbers, for count(), slugs() or bulk_update_tags()
+        """
+        with self._lock:
+            mask = self._all
+            for tag in all_of:
+                mask &= self._tag_bits(tag)
+            any_of = list(any_of)
+            if any_of:
+                either = 0
+                for tag in any_of:
+                    either |= self._tag_bits(tag)
+                mask &= either
+            for tag in none_of:
+                mask &= ~self._tag_bits(tag)
+            return mask
+    
+    def _tag_bits(self, tag: str) -> int:
+        tag_id = self._tag_ids.get(tag)
+        return self._bits[tag_id] if tag_id is not None else 0
+    
+    def slugs(self, mask: int, limit: Optional[int] = None) -> List[str]:
+        """Course codes in a query result, in catalog order."""
+        with self._lock:
+            return [self._slugs[number] for number in ids_from_mask(mask, limit)]
+    
+    @staticmethod
+    def count(mask: int) -> int:
+        """Number of courses in a query result."""
+        return mask.bit_count()
+    
+    def tag_changes(self, mask: int, generation: int, add: Iterable[str] = (),
+                    remove: Iterable[str] = ()) -> Dict[str, Dict[str, str]]:
+        """
+        Work out the field_17 patches that add and remove tags across a query result.
+        
+        Only courses whose tags actually change get a patch; which ones those
+        are is found with bitwise operations before any tag list is touched.
+        
+        Args:
+            mask: Query result
+            generation: self.generation when the query ran
+            add: Tags to add (appended after the existing ones)
+            remove: Tags to remove
+        
+        Returns:
+            Course code -> {'field_17': new tags}
+        
+        Raises:
+            ValueError: If the index was rebuilt since the query
+        """
+        remove = set(remove)
+        # Removing wins over adding the same tag
+        add = [tag for tag in dict.fromkeys(tag.strip() for tag in add) if tag and tag not in remove]
+        with self._lock:
+            if generation != self.generation:
+                raise ValueError("The catalog was reloaded since the tags were queried; run the query again")
+            affected = 0
+            for tag in add:
+                affected |= mask & ~self._tag_bits(tag)
+            for tag in remove:
+                affected |= mask & self._tag_bits(tag)
+            
+            patches = {}
+            for number in ids_from_mask(affected):
+                tags = [self._tag_names[tag_id] for tag_id in self._course_tags[number]]
+                tags = [tag for tag in tags if tag not in remove]
+                tags.extend(tag for tag in add if tag not in tags)
+                patches[self._slugs[number]] = {'field_17': join_tags(tags)}
+            return patches
+
+def bulk_update_tags(mask: int, generation: int, add: Iterable[str] = (), remove: Iterable[str] = (),
+                     catalog=None) -> int:
+    """
+    Add and remove tags across a query result in one catalog write.
+    
+    Args:
+        mask: Result of get_tag_index(catalog).query(...)
+        generation: The index's generation, read before the query ran
+        add: Tags to add
+        remove: Tags to remove
+        catalog: CourseCatalog (defaults to the process-wide catalog)
+    
+    Returns:
+        Number of courses changed
+    
+    Raises:
+        ValueError: If the catalog was reloaded or replaced since the query
+    """
+    if catalog is None:
+        catalog = get_course_catalog()
+    patches = get_tag_index(catalog).tag_changes(mask, generation, add=add, remove=remove)
+    if patches:
+        catalog.upsert_many(patches)
+    return len(patches)
+
+def get_tag_index(catalog=None) -> TagIndex:
+    """
+    Get the tag index of a catalog, brought up to date with its changes.
+    
+    Args:
+        catalog: CourseCatalog (defaults to the process-wide catalog)
+    
+    Returns:
+        TagIndex
+    """
+    return get_catalog_index(TagIndex, catalog)
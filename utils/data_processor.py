@@ -4,21 +4,96 @@ import datetime
 import re
 import os
 import json
-from typing import Dict, List, Any, Optional
+import stat
+import hashlib
+import time
+import atexit
+import tempfile
+import threading
+import weakref
+from typing import Dict, List, Any, Optional, Tuple
 from utils.config import CONFIG
+from utils.logger import log_error
+from utils.catalog_snapshots import get_snapshot_store
 import streamlit as st
 
+# Catalog field -> human-readable header; most course records also carry a
+# copy of each field under its header
+COURSE_HEADERS = {
+    'field_0': 'Slug',
+    'field_1': 'State',
+    'field_2': 'Parent',
+    'field_3': 'Parent Title',
+    'field_4': 'Item Name',
+    'field_5': 'Commodity Type',
+    'field_6': 'Item Type',
+    'field_7': 'Business Units',
+    'field_8': 'Subject Name - General',
+    'field_9': 'Subject ID',
+    'field_10': 'Parent Grade Tags',
+    'field_11': 'Days of Week',
+    'field_12': 'Parent Course Hours',
+    'field_13': 'Session Count',
+    'field_14': 'Capacity',
+    'field_15': 'Price Dollars',
+    'field_16': 'Content Product Image',
+    'field_17': 'Item Tags'
+}
+
+def _course_master_path() -> str:
+    return os.path.join(CONFIG['paths']['data_dir'], 'course_master.json')
+
+def replace_keeping_mode(temp_path: str, path: str):
+    """
+    Move a finished temporary file over path with os.replace.
+    
+    mkstemp creates files only their owner can read, so the temporary file
+    first gets the mode of the file it replaces (or the umask default for a
+    new file), as writing the file in place would have kept it.
+    
+    Args:
+        temp_path: Temporary file in the same directory as path
+        path: File to replace
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    os.chmod(temp_path, mode)
+    os.replace(temp_path, path)
+
+def with_header_copies(record: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extend a patch so the record's header copies (e.g. 'Item Tags') follow their fields.
+    
+    Only headers the record already has are set, so records without copies
+    are not given any.
+    
+    Args:
+        record: Current course record
+        patch: Fields to set, e.g. {'field_17': 'tag-a;tag-b'}
+    
+    Returns:
+        The patch, plus the header copy of every patched field the record has
+    """
+    copies = {COURSE_HEADERS[field]: value for field, value in patch.items()
+              if field in COURSE_HEADERS and COURSE_HEADERS[field] in record}
+    return {**patch, **copies} if copies else patch
+
 def load_course_master_data():
     """
-    Load course master data from JSON file.
+    Load course master data.
+    
+    Served from the in-memory catalog (see get_course_catalog), so edits made
+    with update_course are visible before they reach the file.
     
     Returns:
         Dictionary containing course master data
     """
-    master_data_path = os.path.join(CONFIG['paths']['data_dir'], 'course_master.json')
     try:
-        with open(master_data_path, 'r') as f:
-            return json.load(f)
+        return get_course_catalog().snapshot()
     except Exception as e:
         log_error("Error loading course data", exc_info=True)
         st.error("We couldn't load the course data. Please check your file or contact an administrator if the problem continues.")
@@ -26,20 +101,388 @@ def load_course_master_data():
 
 def save_course_master_data(data):
     """
-    Save course master data to JSON file.
+    Replace the course master data and write it to the JSON file.
     
     Args:
         data: Dictionary containing course master data
     """
-    master_data_path = os.path.join(CONFIG['paths']['data_dir'], 'course_master.json')
     try:
-        with open(master_data_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        catalog = get_course_catalog()
+        catalog.replace(data)
+        catalog.flush()
         return True
     except Exception as e:
         print(f"Error saving course master data: {str(e)}")
         return False
 
+def update_course(slug: str, patch: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply a field-level patch to one course.
+    
+    The change is visible to every session at once; writing it to
+    course_master.json is left to the catalog's background writer, which
+    combines patches made close together into a single file write.
+    
+    Args:
+        slug: Course code
+        patch: Fields to set, e.g. {'field_15': '$299.00'}
+    
+    Returns:
+        The updated course record
+    
+    Raises:
+        KeyError: If the course does not exist
+    """
+    return get_course_catalog().update(slug, patch)
+
+class CourseCatalog:
+    """
+    In-memory course master backed by course_master.json with write-behind persistence.
+    
+    Patches apply to memory under a lock and mark the catalog dirty. A
+    background thread waits flush_delay seconds for more patches, then writes
+    the whole catalog once to a temporary file and swaps it in with os.replace,
+    so readers of the file never see a half-written catalog.
+    
+    If another program rewrites the file, the catalog reloads it and re-applies
+    any patches that have not been written yet.
+    
+    version increases with every change, and changes_since() tells derived
+    structures (e.g. the course search index) which courses to refresh.
+    
+    Patches replace a course's record instead of changing it in place, so a
+    record seen by a reader never changes under it.
+    
+    If on_persist is given, it is called after every write with the written
+    (course code, record) pairs and a short note, e.g. to record a snapshot.
+    """
+    
+    def __init__(self, path: str, flush_delay: float = 0.5, on_persist=None):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.on_persist = on_persist
+        self._data = {}
+        self._pending = []
+        self._generation = 0
+        self._stamp = None
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = False
+        self.version = 0
+        self._changed = {}
+        self._reset_version = 0
+        self._load()
+        self._writer = threading.Thread(target=self._write_loop, name='course-catalog-writer', daemon=True)
+        self._writer.start()
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copy of every course record, safe for the caller to modify."""
+        with self._lock:
+            self._reload_if_changed()
+            return {slug: dict(record) for slug, record in self._data.items()}
+    
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        """Copy of one course record, or None if it does not exist."""
+        with self._lock:
+            self._reload_if_changed()
+            record = self._data.get(slug)
+            return dict(record) if record is not None else None
+    
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """(course code, record) pairs in catalog order; the records must not be modified."""
+        with self._lock:
+            self._reload_if_changed()
+            return list(self._data.items())
+    
+    def slugs(self) -> List[str]:
+        """Every course code, in catalog order."""
+        with self._lock:
+            self._reload_if_changed()
+            return list(self._data)
+    
+    def update(self, slug: str, patch: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a patch in memory and schedule a write. See update_course."""
+        with self._lock:
+            self._reload_if_changed()
+            if slug not in self._data:
+                raise KeyError(slug)
+            patch = with_header_copies(self._data[slug], patch)
+            self._data[slug] = {**self._data[slug], **patch}
+            self._pending.append((slug, dict(patch)))
+            self._touch(slug)
+            self._dirty.set()
+            return dict(self._data[slug])
+    
+    def upsert_many(self, patches: Dict[str, Dict[str, Any]]):
+        """
+        Add or patch many courses and write the catalog once, before returning.
+        
+        Args:
+            patches: Course code -> fields to set (the whole record for new courses)
+        """
+        with self._lock:
+            self._reload_if_changed()
+            for slug, patch in patches.items():
+                record = self._data.get(slug, {})
+                patch = with_header_copies(record, patch)
+                self._data[slug] = {**record, **patch}
+                self._pending.append((slug, dict(patch)))
+                self._touch(slug)
+        self.flush()
+    
+    def replace(self, data: Dict[str, Dict[str, Any]]):
+        """Replace the whole catalog and schedule a write."""
+        with self._lock:
+            self._data = {slug: dict(record) for slug, record in data.items()}
+            # A full replacement supersedes any patch not yet written
+            self._pending = [(None, None)]
+            self._generation += 1
+            self._reset()
+            self._dirty.set()
+    
+    def changes_since(self, version: int) -> Optional[List[str]]:
+        """
+        Course codes added or patched after the given version.
+        
+        Args:
+            version: A value of self.version seen earlier
+        
+        Returns:
+            List of course codes, or None if the catalog was reloaded or
+            replaced since then and must be read again in full
+        """
+        with self._lock:
+            self._reload_if_changed()
+            if version < self._reset_version:
+                return None
+            return [slug for slug, changed in self._changed.items() if changed > version]
+    
+    def flush(self):
+        """Write pending changes now."""
+        with self._write_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._reload_if_changed()
+                payload = json.dumps(self._data, indent=2)
+                written = len(self._pending)
+                generation = self._generation
+                replaced = any(slug is None for slug, _ in self._pending)
+                courses = list(self._data.items()) if self.on_persist else None
+            
+            directory = os.path.dirname(self.path) or '.'
+            fd, temp_path = tempfile.mkstemp(prefix='.course_master-', suffix='.json', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                replace_keeping_mode(temp_path, self.path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            
+            with self._lock:
+                # Patches made while writing stay pending for the next write; a
+                # replacement made meanwhile keeps its marker and is written next
+                if self._generation == generation:
+                    self._pending = self._pending[written:]
+                self._stamp = self._file_stamp()
+            
+            if self.on_persist is not None:
+                try:
+                    self.on_persist(courses, "Catalog replaced" if replaced else f"{written} course change(s)")
+                except Exception as e:
+                    print(f"Error recording course master snapshot: {str(e)}")
+    
+    def close(self):
+        """Write pending changes and stop the background writer."""
+        self._closed = True
+        self._dirty.set()
+        self.flush()
+    
+    def _load(self):
+        with open(self.path, 'r') as f:
+            self._data = json.load(f)
+        # Item tag strings repeat across most courses; keep one copy of each
+        shared = {}
+        for record in self._data.values():
+            for key in ('field_17', 'Item Tags'):
+                if isinstance(record.get(key), str):
+                    record[key] = shared.setdefault(record[key], record[key])
+        self._stamp = self._file_stamp()
+        self._reset()
+    
+    def _touch(self, slug: str):
+        self.version += 1
+        self._changed[slug] = self.version
+    
+    def _reset(self):
+        self.version += 1
+        self._reset_version = self.version
+        self._changed = {}
+    
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+    
+    def _reload_if_changed(self):
+        """Pick up a file rewritten by another program, keeping unwritten patches."""
+        if self._file_stamp() == self._stamp:
+            return
+        if any(slug is None for slug, _ in self._pending):
+            # An unwritten full replacement wins over the file
+            return
+        self._load()
+        for slug, patch in self._pending:
+            self._data.setdefault(slug, {}).update(patch)
+    
+    def _write_loop(self):
+        while not self._closed:
+            self._dirty.wait()
+            if self._closed:
+                return
+            # Let patches made close together share one write
+            time.sleep(self.flush_delay)
+            self._dirty.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error saving course master data: {str(e)}")
+                self._dirty.set()
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_course_catalog() -> CourseCatalog:
+    """
+    Get the process-wide course catalog, loading course_master.json on first use.
+    
+    Returns:
+        CourseCatalog instance
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            on_persist = None
+            if CONFIG['defaults'].get('catalog_snapshots'):
+                snapshots = get_snapshot_store()
+                on_persist = snapshots.record
+            _catalog = CourseCatalog(
+                _course_master_path(),
+                flush_delay=CONFIG['defaults'].get('catalog_flush_seconds', 0.5),
+                on_persist=on_persist
+            )
+            if on_persist is not None:
+                # Snapshot the catalog as loaded, so the first edit can be rolled back
+                try:
+                    snapshots.record(_catalog.items(), "Loaded course_master.json")
+                except Exception as e:
+                    print(f"Error recording course master snapshot: {str(e)}")
+            atexit.register(_catalog.close)
+        return _catalog
+
+_catalog_indexes = weakref.WeakKeyDictionary()
+_catalog_indexes_lock = threading.Lock()
+
+def get_catalog_index(index_type, catalog: Optional[CourseCatalog] = None):
+    """
+    Get an index derived from a catalog, brought up to date with its changes.
+    
+    One index of each type is kept per catalog. Courses changed since the
+    last refresh are re-indexed one by one; the index is rebuilt only if the
+    catalog was reloaded or replaced since.
+    
+    Args:
+        index_type: Class created without arguments, with build(courses),
+            update(slug, record) and a version attribute (e.g. CourseSearchIndex)
+        catalog: CourseCatalog (defaults to the process-wide catalog)
+    
+    Returns:
+        The catalog's index_type instance
+    """
+    if catalog is None:
+        catalog = get_course_catalog()
+    
+    with _catalog_indexes_lock:
+        indexes = _catalog_indexes.setdefault(catalog, {})
+        index = indexes.get(index_type)
+        if index is None:
+            index = indexes[index_type] = index_type()
+        if index.version == catalog.version:
+            return index
+        
+        version = catalog.version
+        changed = catalog.changes_since(index.version) if index.version is not None else None
+        if changed is None:
+            index.build(catalog.snapshot())
+        else:
+            for slug in changed:
+                record = catalog.get(slug)
+                if record is not None:
+                    index.update(slug, record)
+        index.version = version
+        return index
+
+def rollback_catalog(snapshot_id: str) -> int:
+    """
+    Return the catalog to an earlier snapshot.
+    
+    HEAD of the snapshot store moves to the snapshot and the catalog is
+    swapped in memory at once; course_master.json is rewritten by the
+    catalog's writer, and the write adds no new snapshot.
+    
+    Args:
+        snapshot_id: ID from get_snapshot_store().list_snapshots()
+    
+    Returns:
+        Number of courses in the restored catalog
+    """
+    courses = get_snapshot_store().restore(snapshot_id)
+    catalog = get_course_catalog()
+    catalog.replace(courses)
+    catalog.flush()
+    return len(courses)
+
+_catalog_version_cache = {}
+
+def get_catalog_version():
+    """
+    Get a content hash identifying the current course master data.
+    
+    The hash is cached against the file's size and modification time so it is
+    only recomputed after the catalog changes.
+    
+    Returns:
+        Hex SHA-256 digest of course_master.json, or an empty string if it is missing
+    """
+    master_data_path = _course_master_path()
+    # The hash must cover patches still waiting for the background writer
+    if _catalog is not None:
+        _catalog.flush()
+    try:
+        stat = os.stat(master_data_path)
+    except OSError:
+        return ''
+    
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _catalog_version_cache.get(master_data_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    
+    digest = hashlib.sha256()
+    with open(master_data_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    version = digest.hexdigest()
+    _catalog_version_cache[master_data_path] = (stamp, version)
+    return version
+
 def load_grade_master_data():
     """Load grade master data from JSON file."""
     try:
@@ -193,12 +636,14 @@ def get_title_grade_indicator_from_tags(parent_grade_tags, grade_master_data):
     
     return ""
 
-def process_class_data(approved_requests: pd.DataFrame) -> pd.DataFrame:
+def process_class_data(approved_requests: pd.DataFrame, progress_callback=None) -> pd.DataFrame:
     """
     Process approved class requests using course master data.
     
     Args:
         approved_requests: DataFrame containing approved class requests
+        progress_callback: Optional callable run as progress_callback(done, total)
+            after each request is processed
         
     Returns:
         DataFrame formatted for bulk upload with the required columns
@@ -392,6 +837,9 @@ def process_class_data(approved_requests: pd.DataFrame) -> pd.DataFrame:
         
         # Add to processed data
         processed_data = pd.concat([processed_data, pd.DataFrame([row_data])], ignore_index=True)
+        
+        if progress_callback is not None:
+            progress_callback(len(processed_data), len(approved_requests))
     
     return processed_data
 
@@ -0,0 +1,71 @@
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from utils.history import HistoryIndex, request_key, canonical_value
+
+# Existing requests with these statuses block a new identical request; denied ones do not
+ACTIVE_STATUSES = ('Pending', 'Approved')
+
+DUPLICATE_POLICIES = ('reject', 'flag', 'allow')
+
+REPORT_COLUMNS = [
+    'row', 'slug', 'meeting_days', 'start_date', 'end_date', 'start_time',
+    'matched_in', 'matched_id', 'matched_requested_by', 'matched_status', 'matched_date'
+]
+
+def find_duplicates(requests: List[Dict[str, Any]], store,
+                    history_index: Optional[HistoryIndex] = None,
+                    row_numbers: Optional[List[int]] = None) -> pd.DataFrame:
+    """
+    Report requests that repeat an existing request, an exported one or an
+    earlier row of the same batch.
+    
+    Requests match when their request key (slug, meeting days, dates and start
+    time) is equal, whoever requested them. Each check is a hash lookup, so
+    the cost is O(1) per request.
+    
+    Args:
+        requests: New request dictionaries, in submission order
+        store: RequestStore holding current requests
+        history_index: Optional HistoryIndex of exported requests
+        row_numbers: Row number to report for each request (e.g. spreadsheet
+            rows); defaults to positions in requests
+    
+    Returns:
+        DataFrame with one row per match (REPORT_COLUMNS)
+    """
+    if row_numbers is None:
+        row_numbers = list(range(len(requests)))
+    keys = [request_key(request) for request in requests]
+    history_matches = history_index.find_keys(keys) if history_index is not None and keys else {}
+    
+    report = []
+    first_row = {}
+    for position, (request, key) in enumerate(zip(requests, keys)):
+        matches = []
+        for request_id in sorted(store.ids_by_key(key)):
+            existing = store.get(request_id)
+            if existing is not None and existing.get('status') in ACTIVE_STATUSES:
+                matches.append(('requests', request_id, existing, existing.get('request_date')))
+        for record in history_matches.get(key, []):
+            matches.append(('history', None, record, record.get('history_date')))
+        if key in first_row:
+            first = first_row[key]
+            matches.append(('this batch', f"row {row_numbers[first]}", requests[first], None))
+        else:
+            first_row[key] = position
+        
+        for matched_in, matched_id, existing, matched_date in matches:
+            report.append({
+                'row': row_numbers[position],
+                'slug': request.get('slug'),
+                'meeting_days': request.get('meeting_days'),
+                'start_date': canonical_value(request.get('start_date')),
+                'end_date': canonical_value(request.get('end_date')),
+                'start_time': canonical_value(request.get('start_time')),
+                'matched_in': matched_in,
+                'matched_id': matched_id,
+                'matched_requested_by': existing.get('requested_by'),
+                'matched_status': existing.get('status'),
+                'matched_date': canonical_value(matched_date)
+            })
+    return pd.DataFrame(report, columns=REPORT_COLUMNS)
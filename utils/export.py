@@ -1,27 +1,42 @@
 import os
+import io
+import gzip
+import zipfile
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import datetime
 import re
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+from openpyxl import Workbook
+from utils.history import get_history_store
 
-def export_to_csv(data: pd.DataFrame, export_dir: str) -> str:
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Request columns that determine the content of an export
+EXPORT_KEY_COLUMNS = [
+    'slug', 'meeting_days', 'start_date', 'end_date', 'start_time',
+    'excluded_meeting_dates', 'class_type'
+]
+
+MANIFEST_FILENAME = 'manifest.json'
+_manifest_lock = threading.Lock()
+
+# Hex digits of the export key added to export file names
+EXPORT_KEY_PREFIX = 12
+
+def build_export_sections(data: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
-    Export processed data to CSV file with two sections.
+    Build the two sections of the bulk upload from processed data.
     
     Args:
         data: DataFrame containing processed data
-        export_dir: Directory to save the CSV file
         
     Returns:
-        Path to the exported CSV file
+        Tuple of (bulk upload DataFrame, BM upload DataFrame)
     """
-    # Create export directory if it doesn't exist
-    os.makedirs(export_dir, exist_ok=True)
-    
-    # Generate filename with timestamp
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"class_bulk_upload_{timestamp}.csv"
-    filepath = os.path.join(export_dir, filename)
-    
     # Make a copy of the data to avoid modifying the original
     export_data = data.copy()
     
@@ -213,56 +228,527 @@ def export_to_csv(data: pd.DataFrame, export_dir: str) -> str:
     bm_data['Presenter'] = ''
     bm_data['Course Name'] = export_data['course_title']
     
+    return export_data, bm_data
+
+def export_to_csv(data: pd.DataFrame, export_dir: str) -> str:
+    """
+    Export processed data to CSV file with two sections.
+    
+    Args:
+        data: DataFrame containing processed data
+        export_dir: Directory to save the CSV file
+        
+    Returns:
+        Path to the exported CSV file
+    """
+    # Create export directory if it doesn't exist
+    os.makedirs(export_dir, exist_ok=True)
+    
+    # Generate filename with timestamp
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"class_bulk_upload_{timestamp}.csv"
+    filepath = os.path.join(export_dir, filename)
+    
+    export_data, bm_data = build_export_sections(data)
+    
     # Write both sections to the CSV file
     with open(filepath, 'w', encoding='utf-8') as f:
-        # Write first section
-        export_data.to_csv(f, index=False)
-        
-        # Add 5 blank lines
-        f.write('\n' * 5)
+        write_csv_sections(f, export_data, bm_data)
+    
+    return filepath
+
+def write_csv_sections(f, export_data: pd.DataFrame, bm_data: pd.DataFrame):
+    """
+    Write the two bulk upload sections to an open text stream.
+    
+    Args:
+        f: Writable text stream
+        export_data: Bulk upload section
+        bm_data: BM upload section
+    """
+    # Write first section
+    export_data.to_csv(f, index=False)
+    
+    # Add 5 blank lines
+    f.write('\n' * 5)
+    
+    # Write second section
+    bm_data.to_csv(f, index=False)
+
+def _iter_sheet_rows(df: pd.DataFrame) -> Iterator[list]:
+    """
+    Yield the header and then each row of a DataFrame as plain lists.
+    
+    Missing values are converted to None so openpyxl writes empty cells.
+    
+    Args:
+        df: DataFrame to iterate
         
-        # Write second section
-        bm_data.to_csv(f, index=False)
+    Yields:
+        Header list followed by one list per row
+    """
+    yield [str(column) for column in df.columns]
+    for values in df.itertuples(index=False, name=None):
+        yield [None if _is_missing(value) else value for value in values]
+
+def _is_missing(value) -> bool:
+    """Return True for scalar missing values (None, NaN, NaT)."""
+    if isinstance(value, (list, tuple, dict)):
+        return False
+    return bool(pd.isna(value))
+
+def write_xlsx_sheets(sheets: Dict[str, pd.DataFrame], filepath: Union[str, IO[bytes]]):
+    """
+    Stream DataFrames into an XLSX workbook using openpyxl write-only mode.
+    
+    Write-only worksheets flush each row to disk as it is appended, so memory
+    stays flat regardless of how many rows are exported.
     
+    Args:
+        sheets: Mapping of sheet name to DataFrame, written in order
+        filepath: Path of the XLSX file to create, or a binary file object
+        
+    Returns:
+        The filepath argument
+    """
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in sheets.items():
+        worksheet = workbook.create_sheet(title=sheet_name)
+        for row in _iter_sheet_rows(df):
+            worksheet.append(row)
+    workbook.save(filepath)
     return filepath
 
-def save_to_history(requests: pd.DataFrame, history_dir: str):
+def export_to_xlsx(data: pd.DataFrame, export_dir: str) -> str:
     """
-    Save all processed requests to a history file.
+    Export processed data to an XLSX file with "Bulk Upload" and "BM Upload" sheets.
     
     Args:
-        requests: DataFrame containing all requests
-        history_dir: Directory to save the history file
+        data: DataFrame containing processed data
+        export_dir: Directory to save the XLSX file
+        
+    Returns:
+        Path to the exported XLSX file
+    """
+    # Create export directory if it doesn't exist
+    os.makedirs(export_dir, exist_ok=True)
+    
+    # Generate filename with timestamp
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"class_bulk_upload_{timestamp}.xlsx"
+    filepath = os.path.join(export_dir, filename)
+    
+    export_data, bm_data = build_export_sections(data)
+    
+    return write_xlsx_sheets({
+        'Bulk Upload': export_data,
+        'BM Upload': bm_data
+    }, filepath)
+
+def export_to_buffer(data: pd.DataFrame, export_format: str = 'csv',
+                     compression: Optional[str] = None,
+                     export_key: Optional[str] = None) -> Tuple[io.BytesIO, str, str]:
+    """
+    Render processed data into an in-memory export without touching disk.
+    
+    Args:
+        data: DataFrame containing processed data
+        export_format: 'csv' for the two-section CSV or 'xlsx' for the two-sheet workbook
+        compression: None, 'gzip' or 'zip'
+        export_key: Optional key from compute_export_key; its prefix is added to
+            the file name so different exports in the same second do not collide
+        
+    Returns:
+        Tuple of (buffer positioned at the start, file name, MIME type)
+    """
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    name = f"class_bulk_upload_{timestamp}"
+    if export_key:
+        name = f"{name}_{export_key[:EXPORT_KEY_PREFIX]}"
+    export_data, bm_data = build_export_sections(data)
+    return render_sections(export_data, bm_data, name, export_format, compression)
+
+def render_sections(export_data: pd.DataFrame, bm_data: pd.DataFrame, name: str, export_format: str = 'csv',
+                    compression: Optional[str] = None) -> Tuple[io.BytesIO, str, str]:
+    """
+    Render the bulk upload and BM upload sections into an in-memory file.
+    
+    Args:
+        export_data: Bulk upload section
+        bm_data: BM upload section
+        name: File name without extension
+        export_format: 'csv' for the two-section CSV or 'xlsx' for the two-sheet workbook
+        compression: None, 'gzip' or 'zip'
+        
+    Returns:
+        Tuple of (buffer positioned at the start, file name, MIME type)
+    """
+    filename = f"{name}.{export_format}"
+    buffer = io.BytesIO()
+    if export_format == 'xlsx':
+        write_xlsx_sheets({
+            'Bulk Upload': export_data,
+            'BM Upload': bm_data
+        }, buffer)
+        mime = XLSX_MIME
+    elif export_format == 'csv':
+        text = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+        write_csv_sections(text, export_data, bm_data)
+        text.flush()
+        # Detach so closing the wrapper later does not close the buffer
+        text.detach()
+        mime = 'text/csv'
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    
+    if compression == 'gzip':
+        payload = gzip.compress(buffer.getvalue())
+        buffer = io.BytesIO(payload)
+        filename = f"{filename}.gz"
+        mime = 'application/gzip'
+    elif compression == 'zip':
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(filename, buffer.getvalue())
+        buffer = archive
+        filename = f"{filename}.zip"
+        mime = 'application/zip'
+    elif compression is not None:
+        raise ValueError(f"Unsupported compression: {compression}")
+    
+    buffer.seek(0)
+    return buffer, filename, mime
+
+def persist_export_async(buffer: io.BytesIO, export_dir: str, filename: str,
+                         on_complete: Optional[Callable[[str], None]] = None) -> threading.Thread:
     """
-    # Create history directory if it doesn't exist
-    os.makedirs(history_dir, exist_ok=True)
+    Write an in-memory export to the export directory on a background thread.
     
-    # Generate filename with date
-    date = datetime.datetime.now().strftime("%Y%m%d")
-    filename = f"class_requests_history_{date}.csv"
-    filepath = os.path.join(history_dir, filename)
+    The file is written to a temporary name and then renamed into place so a
+    partially written export is never visible.
     
-    # Check if file exists and append if it does
-    if os.path.exists(filepath):
-        # Read existing history
-        existing_history = pd.read_csv(filepath)
+    Args:
+        buffer: Buffer returned by export_to_buffer
+        export_dir: Directory to save the export
+        filename: File name to save under
+        on_complete: Optional callback run with the final path once the file is in place
         
-        # Append new requests
-        combined_history = pd.concat([existing_history, requests], ignore_index=True)
+    Returns:
+        The started writer thread
+    """
+    # Copy the bytes now so the caller is free to hand the buffer elsewhere
+    payload = buffer.getvalue()
+    
+    def write():
+        try:
+            os.makedirs(export_dir, exist_ok=True)
+            filepath = os.path.join(export_dir, filename)
+            tmp_path = f"{filepath}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, filepath)
+            if on_complete is not None:
+                on_complete(filepath)
+        except Exception as e:
+            print(f"Error persisting export {filename}: {str(e)}")
+    
+    thread = threading.Thread(target=write, name=f"persist-{filename}", daemon=True)
+    thread.start()
+    return thread
+
+def get_partition_key(row: pd.Series, partition_by: str) -> str:
+    """
+    Get the shard key for a processed row.
+    
+    Args:
+        row: Processed export row
+        partition_by: 'brand' to split on the slug prefix (vtgsc, vtp, ...) or
+            'business_units' to split on the business units value
         
-        # Remove duplicates based on slug, meeting_days, start_date, end_date, and start_time
-        combined_history = combined_history.drop_duplicates(
-            subset=['slug', 'meeting_days', 'start_date', 'end_date', 'start_time'],
-            keep='last'
-        )
+    Returns:
+        Shard key safe to use in a file name
+    """
+    if partition_by == 'brand':
+        key = str(row.get('slug', '')).split('-')[0].lower()
+    elif partition_by == 'business_units':
+        key = str(row.get('business_units', '') or '')
+    else:
+        raise ValueError(f"Unsupported partition: {partition_by}")
+    
+    # Keep file names readable: "Varsity Tutors Platform|VT4S" -> "varsity_tutors_platform_vt4s"
+    key = re.sub(r'[^a-z0-9]+', '_', key.lower()).strip('_')
+    return key or 'unassigned'
+
+def _write_shard(export_data: pd.DataFrame, bm_data: pd.DataFrame, shard_dir: str, name: str,
+                 export_format: str, compression: Optional[str]) -> Dict[str, Any]:
+    """
+    Write one shard in the export format and describe it for the index.
+    
+    Args:
+        export_data: Bulk upload section for the shard
+        bm_data: BM upload section for the shard
+        shard_dir: Folder to write the shard to
+        name: Shard file name without extension
+        export_format: 'csv' or 'xlsx'
+        compression: None, 'gzip' or 'zip'
+        
+    Returns:
+        Dictionary with the shard file name, row count and SHA-256 checksum
+    """
+    buffer, filename, _ = render_sections(export_data, bm_data, name, export_format, compression)
+    payload = buffer.getvalue()
+    with open(os.path.join(shard_dir, filename), 'wb') as f:
+        f.write(payload)
+    
+    return {
+        'file': filename,
+        'rows': len(export_data),
+        'sha256': hashlib.sha256(payload).hexdigest()
+    }
+
+def export_sharded(data: pd.DataFrame, export_dir: str, partition_by: str = 'brand',
+                   max_workers: int = 4, export_format: str = 'csv',
+                   compression: Optional[str] = None, export_key: Optional[str] = None) -> str:
+    """
+    Export processed data as one file per brand or business unit.
+    
+    Each shard is written like a single export (two-section CSV or two-sheet
+    workbook, optionally compressed). Shards are written concurrently and
+    described in an index.json file that lists each shard's row count and
+    checksum.
+    
+    Args:
+        data: DataFrame containing processed data
+        export_dir: Directory to create the shard folder in
+        partition_by: 'brand' or 'business_units'
+        max_workers: Number of shard writer threads
+        export_format: 'csv' or 'xlsx'
+        compression: None, 'gzip' or 'zip', applied to each shard
+        export_key: Optional key from compute_export_key; its prefix is added to
+            the folder name so different exports in the same second do not collide
         
-        # Save combined history
-        combined_history.to_csv(filepath, index=False)
+    Returns:
+        Path to the shard folder's index.json
+    """
+    # Generate folder name with timestamp, format and compression
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    folder = f"class_bulk_upload_{timestamp}_by_{partition_by}_{export_format}"
+    if compression:
+        folder = f"{folder}_{compression}"
+    if export_key:
+        folder = f"{folder}_{export_key[:EXPORT_KEY_PREFIX]}"
+    shard_dir = os.path.join(export_dir, folder)
+    os.makedirs(shard_dir, exist_ok=True)
+    
+    # Build both sections once and split them together so rows stay aligned
+    export_data, bm_data = build_export_sections(data)
+    if export_data.empty:
+        keys = pd.Series(dtype=str)
     else:
-        # Save new history file
-        requests.to_csv(filepath, index=False)
+        keys = export_data.apply(get_partition_key, axis=1, partition_by=partition_by)
     
-    return filepath
+    shards = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for key, positions in keys.groupby(keys.values).indices.items():
+            future = executor.submit(
+                _write_shard,
+                export_data.iloc[positions],
+                bm_data.iloc[positions],
+                shard_dir,
+                f"class_bulk_upload_{key}",
+                export_format,
+                compression
+            )
+            futures[future] = key
+        
+        for future in as_completed(futures):
+            shards.append({'key': futures[future], **future.result()})
+    
+    shards.sort(key=lambda shard: shard['key'])
+    index = {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'partition_by': partition_by,
+        'format': export_format,
+        'compression': compression,
+        'total_rows': len(export_data),
+        'shards': shards
+    }
+    index_path = os.path.join(shard_dir, 'index.json')
+    with open(index_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    
+    return index_path
+
+def archive_shards(index_path: str) -> io.BytesIO:
+    """
+    Zip a sharded export (index.json plus every shard) into memory for download.
+    
+    The archive is offered as "<shard folder>.zip", so its name carries the
+    partition, format and compression of the shards.
+    
+    Args:
+        index_path: Path returned by export_sharded
+        
+    Returns:
+        Buffer containing the zip archive, positioned at the start
+    """
+    shard_dir = os.path.dirname(index_path)
+    with open(index_path, 'r') as f:
+        index = json.load(f)
+    
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.write(index_path, arcname='index.json')
+        for shard in index['shards']:
+            zf.write(os.path.join(shard_dir, shard['file']), arcname=shard['file'])
+    archive.seek(0)
+    return archive
+
+def compute_export_key(approved_requests: pd.DataFrame, catalog_version: str,
+                       options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Compute a stable hash identifying an export.
+    
+    The hash covers the approved request set (independent of row order), the
+    catalog version and any export options such as format or compression, so
+    two clicks on the same approved set produce the same key.
+    
+    Args:
+        approved_requests: DataFrame containing approved class requests
+        catalog_version: Version string from get_catalog_version
+        options: Export options that change the output file
+        
+    Returns:
+        Hex SHA-256 digest
+    """
+    rows = []
+    for record in approved_requests.to_dict('records'):
+        rows.append([_canonical_value(record.get(column)) for column in EXPORT_KEY_COLUMNS])
+    rows.sort()
+    
+    payload = json.dumps({
+        'requests': rows,
+        'catalog_version': catalog_version,
+        'options': options or {}
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _canonical_value(value) -> str:
+    """Render a request value as a stable string for hashing."""
+    if value is None or _is_missing(value):
+        return ''
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+def load_export_manifest(export_dir: str) -> Dict[str, Any]:
+    """
+    Load the export manifest from the export directory.
+    
+    Args:
+        export_dir: Directory holding exports and manifest.json
+        
+    Returns:
+        Dictionary mapping export keys to manifest entries
+    """
+    manifest_path = os.path.join(export_dir, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error reading export manifest: {str(e)}")
+        return {}
+
+def find_cached_export(export_dir: str, export_key: str, export_format: Optional[str] = None,
+                       compression: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Look up an existing export for a key.
+    
+    Args:
+        export_dir: Directory holding exports and manifest.json
+        export_key: Key from compute_export_key
+        export_format: Format the export must be in ('csv' or 'xlsx'), if known
+        compression: Compression the export must use (None, 'gzip' or 'zip'), if known
+        
+    Returns:
+        The manifest entry if the export file still exists (in the requested
+        format and compression), otherwise None
+    """
+    entry = load_export_manifest(export_dir).get(export_key)
+    if not entry or not os.path.exists(entry['path']):
+        return None
+    if export_format is not None and not _export_matches(entry['path'], export_format, compression):
+        return None
+    return entry
+
+def _export_matches(path: str, export_format: str, compression: Optional[str]) -> bool:
+    """Check that an export file (or shard index.json) has the given format and compression."""
+    if os.path.basename(path) == 'index.json':
+        try:
+            with open(path, 'r') as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading shard index: {str(e)}")
+            return False
+        return index.get('format') == export_format and index.get('compression') == compression
+    
+    suffix = f".{export_format}"
+    if compression == 'gzip':
+        suffix = f"{suffix}.gz"
+    elif compression == 'zip':
+        suffix = f"{suffix}.zip"
+    return path.endswith(suffix)
+
+def record_export(export_dir: str, export_key: str, path: str, rows: int,
+                  elapsed_seconds: float, request_ids: Iterable[Any], mime: str = 'text/csv'):
+    """
+    Record a finished export in the manifest.
+    
+    Args:
+        export_dir: Directory holding exports and manifest.json
+        export_key: Key from compute_export_key
+        path: Path of the export file (or shard index.json)
+        rows: Number of exported rows
+        elapsed_seconds: Time spent producing the export
+        request_ids: IDs of the source requests
+        mime: MIME type to serve the file with
+    """
+    with _manifest_lock:
+        manifest = load_export_manifest(export_dir)
+        manifest[export_key] = {
+            'path': path,
+            'mime': mime,
+            'rows': int(rows),
+            'elapsed_seconds': round(elapsed_seconds, 3),
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'request_ids': [str(request_id) for request_id in request_ids]
+        }
+        
+        os.makedirs(export_dir, exist_ok=True)
+        manifest_path = os.path.join(export_dir, MANIFEST_FILENAME)
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+def save_to_history(requests: pd.DataFrame, history_dir: str):
+    """
+    Save all processed requests to the append-only history store.
+    
+    Requests are appended to today's partition; rows already saved today with
+    the same content are skipped using the partition's key index.
+    
+    Args:
+        requests: DataFrame containing all requests
+        history_dir: Directory holding the history partitions
+        
+    Returns:
+        Path of the segment written to, or None if every request was already saved
+    """
+    return get_history_store(history_dir).save(requests)
 
 def format_meeting_days(days_str: str) -> str:
     """
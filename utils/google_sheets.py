@@ -1,63 +1,337 @@
-import gspread
-from google.oauth2 import service_account
-import pandas as pd
 import os
-from utils.config import CONFIG
+import datetime
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import pandas as pd
 
-def get_google_sheets_credentials():
+DEFAULT_CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'credentials.json')
+
+SCOPES = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+DRIVE_FILES_URL = 'https://www.googleapis.com/drive/v3/files/'
+
+class GoogleSheetsError(Exception):
+    """Base class for errors talking to Google Sheets."""
+
+class SheetsCredentialsError(GoogleSheetsError):
+    """The service account key is missing or invalid, or its token could not be refreshed."""
+
+class SpreadsheetNotFoundError(GoogleSheetsError):
+    """No spreadsheet with that ID, or it is not shared with the service account."""
+
+class WorksheetNotFoundError(GoogleSheetsError):
+    """The spreadsheet has no tab with that name."""
+
+class SheetsPermissionError(GoogleSheetsError):
+    """The service account may not read the spreadsheet."""
+
+class SheetsAPIError(GoogleSheetsError):
+    """Any other error returned by the Sheets or Drive API."""
+    
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class GspreadBackend:
     """
-    Get credentials for Google Sheets API.
+    Creates real gspread clients from a service account key file.
+    
+    gspread and google-auth are imported on first use, so the rest of the
+    app (and an InMemorySheetsBackend) works without them.
+    """
+    
+    def load_credentials(self, path: str):
+        if not os.path.exists(path):
+            raise SheetsCredentialsError(
+                "credentials.json file not found. Please download the service account key file "
+                "from Google Cloud Console and save it as 'credentials.json' in the project root directory."
+            )
+        from google.oauth2 import service_account
+        return service_account.Credentials.from_service_account_file(path, scopes=SCOPES)
+    
+    def authorize(self, credentials):
+        import gspread
+        # The client keeps one authorized HTTP session for all of its requests
+        return gspread.authorize(credentials)
+    
+    def refresh(self, credentials):
+        from google.auth.transport.requests import Request
+        credentials.refresh(Request())
+    
+    def revision(self, client, spreadsheet_id: str) -> str:
+        """The spreadsheet's Drive version, which increases with every edit."""
+        # gspread 6 moved request() from the client to its http_client
+        http = getattr(client, 'http_client', client)
+        response = http.request('get', DRIVE_FILES_URL + spreadsheet_id,
+                                params={'fields': 'version', 'supportsAllDrives': True})
+        return str(response.json()['version'])
+    
+    def translate_error(self, error: Exception, context: str) -> GoogleSheetsError:
+        """Map a gspread or google-auth exception to a GoogleSheetsError."""
+        if isinstance(error, ImportError):
+            return GoogleSheetsError(f"gspread and google-auth are required to read {context}: {str(error)}")
+        import gspread
+        from google.auth.exceptions import GoogleAuthError
+        if isinstance(error, gspread.exceptions.SpreadsheetNotFound):
+            return SpreadsheetNotFoundError(f"Spreadsheet not found for {context}")
+        if isinstance(error, gspread.exceptions.WorksheetNotFound):
+            return WorksheetNotFoundError(f"Worksheet not found for {context}")
+        if isinstance(error, GoogleAuthError):
+            return SheetsCredentialsError(f"Could not authorize {context}: {str(error)}")
+        if isinstance(error, gspread.exceptions.APIError):
+            status = getattr(getattr(error, 'response', None), 'status_code', None)
+            if status == 403:
+                return SheetsPermissionError(f"Permission denied for {context}; share the spreadsheet "
+                                             "with the service account's email address")
+            if status == 404:
+                return SpreadsheetNotFoundError(f"Spreadsheet not found for {context}")
+            return SheetsAPIError(f"Google Sheets error for {context}: {str(error)}", status)
+        return SheetsAPIError(f"Google Sheets error for {context}: {str(error)}")
+
+class SheetsClientPool:
+    """
+    Authorized Google Sheets clients shared by every caller in the process.
+    
+    The credentials and the authorized client are created once per key file
+    and reused, so pulling several sheets costs one authorization and runs
+    over one HTTP session. The access token is refreshed only when it has
+    expired (or was never fetched).
+    
+    The backend does the actual work; GspreadBackend talks to Google, and
+    InMemorySheetsBackend serves local data for offline runs and tests.
+    """
+    
+    def __init__(self, backend=None):
+        self.backend = backend or GspreadBackend()
+        self._lock = threading.Lock()
+        self._clients = {}
+    
+    def get_client(self, credentials_path: Optional[str] = None):
+        """
+        Get the authorized client for a key file, refreshing its token if needed.
+        
+        Args:
+            credentials_path: Service account key file (defaults to credentials.json
+                in the project root)
+        
+        Returns:
+            gspread Client (or the backend's equivalent)
+        
+        Raises:
+            SheetsCredentialsError: If the key is missing or the token cannot be refreshed
+        """
+        path = credentials_path or DEFAULT_CREDENTIALS_PATH
+        with self._lock:
+            entry = self._clients.get(path)
+            if entry is None:
+                with self.errors("the service account"):
+                    credentials = self.backend.load_credentials(path)
+                    entry = self._clients[path] = (credentials, self.backend.authorize(credentials))
+            credentials, client = entry
+            if not credentials.valid:
+                with self.errors("the service account"):
+                    self.backend.refresh(credentials)
+            return client
+    
+    @contextmanager
+    def errors(self, context: str) -> Iterator[None]:
+        """Re-raise anything the backend raises inside the block as a GoogleSheetsError."""
+        try:
+            yield
+        except GoogleSheetsError:
+            raise
+        except Exception as e:
+            raise self.backend.translate_error(e, context) from e
+    
+    def clear(self):
+        """Forget cached clients, e.g. after replacing the key file."""
+        with self._lock:
+            self._clients = {}
+
+class _MemoryCredentials:
+    def __init__(self, lifetime: datetime.timedelta):
+        self.lifetime = lifetime
+        self.token = None
+        self.expiry = None
+    
+    @property
+    def valid(self) -> bool:
+        return self.token is not None and datetime.datetime.now() < self.expiry
+
+class _MemoryWorksheet:
+    def __init__(self, backend, spreadsheet_id: str, title: str):
+        self._backend = backend
+        self._spreadsheet_id = spreadsheet_id
+        self.title = title
+    
+    def get_all_values(self) -> List[List[str]]:
+        self._backend.requests += 1
+        return [list(row) for row in self._backend.spreadsheets[self._spreadsheet_id][self.title]]
+
+class _MemorySpreadsheet:
+    def __init__(self, backend, spreadsheet_id: str):
+        self._backend = backend
+        self.id = spreadsheet_id
+    
+    def worksheet(self, title: str) -> _MemoryWorksheet:
+        if title not in self._backend.spreadsheets[self.id]:
+            raise WorksheetNotFoundError(f"Worksheet not found: {title}")
+        return _MemoryWorksheet(self._backend, self.id, title)
+    
+    def values_batch_get(self, ranges: List[str]) -> Dict[str, Any]:
+        """Whole-sheet ranges only, in the shape of the Sheets API response."""
+        self._backend.requests += 1
+        value_ranges = []
+        for sheet_range in ranges:
+            title = sheet_range.split('!', 1)[0]
+            if title.startswith("'") and title.endswith("'"):
+                title = title[1:-1].replace("''", "'")
+            sheets = self._backend.spreadsheets[self.id]
+            if title not in sheets:
+                raise WorksheetNotFoundError(f"Worksheet not found: {title}")
+            values = [list(row) for row in sheets[title]]
+            value_ranges.append({'range': sheet_range, 'values': values} if values else {'range': sheet_range})
+        return {'spreadsheetId': self.id, 'valueRanges': value_ranges}
+
+class _MemoryClient:
+    def __init__(self, backend, credentials: _MemoryCredentials):
+        self._backend = backend
+        self.credentials = credentials
+    
+    def open_by_key(self, spreadsheet_id: str) -> _MemorySpreadsheet:
+        if self.credentials.token is None:
+            raise SheetsCredentialsError("Client used without a token")
+        if spreadsheet_id not in self._backend.spreadsheets:
+            raise SpreadsheetNotFoundError(f"Spreadsheet not found: {spreadsheet_id}")
+        return _MemorySpreadsheet(self._backend, spreadsheet_id)
+
+class InMemorySheetsBackend:
+    """
+    Offline stand-in for GspreadBackend that serves spreadsheets from memory.
+    
+    It counts authorizations, token refreshes and requests so callers can
+    check what the pool reuses, e.g.:
+        
+        backend = InMemorySheetsBackend({'sheet-id': {'Subject Key': [['Subject', 'ID'], ['Math', '1']]}})
+        pool = set_sheets_backend(backend)
+        extract_sheet_to_dataframe('sheet-id', 'Subject Key')
+    """
+    
+    def __init__(self, spreadsheets: Optional[Dict[str, Dict[str, List[List[Any]]]]] = None,
+                 token_lifetime: datetime.timedelta = datetime.timedelta(hours=1)):
+        self.spreadsheets = spreadsheets or {}
+        self.token_lifetime = token_lifetime
+        self.revisions = {spreadsheet_id: 1 for spreadsheet_id in self.spreadsheets}
+        self.authorizations = 0
+        self.refreshes = 0
+        self.requests = 0
+    
+    def set_values(self, spreadsheet_id: str, title: str, values: List[List[Any]]):
+        """Replace a sheet's values (adding the sheet if needed) and bump the revision."""
+        self.spreadsheets.setdefault(spreadsheet_id, {})[title] = values
+        self.revisions[spreadsheet_id] = self.revisions.get(spreadsheet_id, 0) + 1
+    
+    def load_credentials(self, path: str) -> _MemoryCredentials:
+        return _MemoryCredentials(self.token_lifetime)
+    
+    def authorize(self, credentials: _MemoryCredentials) -> _MemoryClient:
+        self.authorizations += 1
+        return _MemoryClient(self, credentials)
+    
+    def refresh(self, credentials: _MemoryCredentials):
+        self.refreshes += 1
+        credentials.token = f"token-{self.refreshes}"
+        credentials.expiry = datetime.datetime.now() + credentials.lifetime
+    
+    def revision(self, client: _MemoryClient, spreadsheet_id: str) -> str:
+        client.open_by_key(spreadsheet_id)
+        self.requests += 1
+        return str(self.revisions[spreadsheet_id])
+    
+    def translate_error(self, error: Exception, context: str) -> GoogleSheetsError:
+        return SheetsAPIError(f"Google Sheets error for {context}: {str(error)}")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_sheets_pool() -> SheetsClientPool:
+    """
+    Get the process-wide Google Sheets client pool.
     
     Returns:
-        Credentials object for Google Sheets API
+        SheetsClientPool instance
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SheetsClientPool()
+        return _pool
+
+def set_sheets_backend(backend) -> SheetsClientPool:
+    """
+    Replace the process-wide pool with one using another backend.
+    
+    Args:
+        backend: GspreadBackend, InMemorySheetsBackend or an object with the same methods
+    
+    Returns:
+        The new SheetsClientPool
+    """
+    global _pool
+    with _pool_lock:
+        _pool = SheetsClientPool(backend)
+        return _pool
+
+def values_to_dataframe(values: List[List[Any]]) -> pd.DataFrame:
     """
-    # Check if credentials file exists
-    creds_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'credentials.json')
+    Turn sheet values into a DataFrame, using the first row as the header.
+    
+    The Sheets API drops trailing empty cells, so short rows are padded
+    with empty strings.
     
-    if not os.path.exists(creds_path):
-        raise FileNotFoundError(
-            "credentials.json file not found. Please download the service account key file "
-            "from Google Cloud Console and save it as 'credentials.json' in the project root directory."
-        )
+    Args:
+        values: Rows of cell values
     
-    # Create credentials from service account file
-    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-    credentials = service_account.Credentials.from_service_account_file(creds_path, scopes=scope)
+    Returns:
+        pandas DataFrame (empty if there are no values)
+    """
+    if not values:
+        return pd.DataFrame()
+    columns = values[0]
+    rows = [list(row[:len(columns)]) + [''] * (len(columns) - len(row)) for row in values[1:]]
+    return pd.DataFrame(rows, columns=columns)
+
+def get_google_sheets_credentials():
+    """
+    Get credentials for Google Sheets API.
+    
+    Returns:
+        Credentials object for Google Sheets API
     
-    return credentials
+    Raises:
+        SheetsCredentialsError: If credentials.json is missing
+    """
+    return GspreadBackend().load_credentials(DEFAULT_CREDENTIALS_PATH)
 
-def extract_sheet_to_dataframe(spreadsheet_id, sheet_name):
+def extract_sheet_to_dataframe(spreadsheet_id, sheet_name, pool: Optional[SheetsClientPool] = None):
     """
     Extract a sheet from Google Sheets to a pandas DataFrame.
     
     Args:
         spreadsheet_id: ID of the Google Sheets document
         sheet_name: Name of the sheet to extract
-        
+        pool: Client pool to use (defaults to the process-wide pool)
+    
     Returns:
-        pandas DataFrame containing the sheet data
+        pandas DataFrame containing the sheet data; the first row is the header
+    
+    Raises:
+        GoogleSheetsError: Or one of its subclasses, if the sheet cannot be read
     """
-    try:
-        # Get credentials
-        credentials = get_google_sheets_credentials()
-        
-        # Authorize with gspread
-        gc = gspread.authorize(credentials)
-        
-        # Open the spreadsheet
-        spreadsheet = gc.open_by_key(spreadsheet_id)
-        
-        # Get the specified worksheet
-        worksheet = spreadsheet.worksheet(sheet_name)
-        
-        # Get all values from the worksheet
-        data = worksheet.get_all_values()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data[1:], columns=data[0])
-        
-        return df
+    pool = pool or get_sheets_pool()
+    client = pool.get_client()
+    with pool.errors(f"sheet '{sheet_name}'"):
+        data = client.open_by_key(spreadsheet_id).worksheet(sheet_name).get_all_values()
     
-    except Exception as e:
-        print(f"Error extracting sheet '{sheet_name}': {str(e)}")
-        return pd.DataFrame() 
\ No newline at end of file
+    return values_to_dataframe(data)
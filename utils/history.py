@@ -0,0 +1,496 @@
+import os
+import re
+import glob
+import json
+import hashlib
+import datetime
+import sqlite3
+import time
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from utils.config import CONFIG
+
+# Columns that identify the same class request across saves
+HISTORY_KEY_COLUMNS = ['slug', 'meeting_days', 'start_date', 'end_date', 'start_time']
+
+# Roll over to a new segment once the current one reaches this size
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+
+INDEX_FILENAME = '_keys.idx'
+PARTITION_PATTERN = re.compile(r'^date=(\d{8})$')
+LEGACY_PATTERN = re.compile(r'^class_requests_history_(\d{8})\.csv$')
+
+def canonical_value(value) -> str:
+    """
+    Render a request value as a stable string.
+    
+    Dates and times use ISO format so values read back from JSON or CSV match
+    the date/time objects held in memory.
+    
+    Args:
+        value: Request field value
+    
+    Returns:
+        String form of the value ('' for missing values)
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.datetime, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, float) and pd.isna(value):
+        return ''
+    return str(value)
+
+def request_key(record: Dict[str, Any]) -> str:
+    """
+    Hash the (slug, meeting_days, start_date, end_date, start_time) key of a request.
+    
+    Args:
+        record: Request as a dictionary
+    
+    Returns:
+        Hex SHA-1 digest of the canonical key
+    """
+    key = '\x1f'.join(canonical_value(record.get(column)) for column in HISTORY_KEY_COLUMNS)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def _content_digest(record: Dict[str, Any]) -> str:
+    """Hash every field of a request so changed rows can be told apart."""
+    payload = json.dumps({k: canonical_value(v) for k, v in record.items()}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class HistoryStore:
+    """
+    Append-only request history partitioned by date.
+    
+    Each day lives in history_dir/date=YYYYMMDD/ as JSONL segments plus a key
+    index mapping request keys to the digest of their latest saved content.
+    Saving appends only rows whose content is new for the day, so each save
+    costs O(new rows) instead of rewriting the whole day's history.
+    Readers keep the last saved version of each key, matching the
+    drop_duplicates(keep='last') behaviour of the old CSV history.
+    """
+    
+    def __init__(self, history_dir: str):
+        self.history_dir = history_dir
+        self._indexes = {}
+        self._lock = threading.Lock()
+    
+    def partition_dir(self, day: str) -> str:
+        """Get the directory for a YYYYMMDD partition."""
+        return os.path.join(self.history_dir, f"date={day}")
+    
+    def save(self, requests: pd.DataFrame, day: Optional[str] = None) -> Optional[str]:
+        """
+        Append new or changed requests to a day's partition.
+        
+        Args:
+            requests: DataFrame containing requests
+            day: Partition date as YYYYMMDD (defaults to today)
+        
+        Returns:
+            Path of the segment written to, or None if nothing was new
+        """
+        day = day or datetime.datetime.now().strftime("%Y%m%d")
+        
+        with self._lock:
+            index = self._load_index(day)
+            
+            new_rows = []
+            new_entries = []
+            for record in requests.to_dict('records'):
+                key = request_key(record)
+                digest = _content_digest(record)
+                if index.get(key) == digest:
+                    continue
+                index[key] = digest
+                new_rows.append(record)
+                new_entries.append(f"{key} {digest}\n")
+            
+            if not new_rows:
+                return None
+            
+            segment_path = self._current_segment(day)
+            with open(segment_path, 'a', encoding='utf-8') as f:
+                for record in new_rows:
+                    f.write(json.dumps({k: _to_json(v) for k, v in record.items()}) + '\n')
+            
+            # Append to the index after the rows so a crash never indexes unsaved rows
+            with open(os.path.join(self.partition_dir(day), INDEX_FILENAME), 'a') as f:
+                f.writelines(new_entries)
+            
+            return segment_path
+    
+    def partitions(self) -> List[Tuple[str, str]]:
+        """
+        List stored partitions, including legacy class_requests_history_*.csv files.
+        
+        Returns:
+            Sorted list of (YYYYMMDD, path) tuples
+        """
+        found = []
+        if not os.path.isdir(self.history_dir):
+            return found
+        for name in os.listdir(self.history_dir):
+            match = PARTITION_PATTERN.match(name) or LEGACY_PATTERN.match(name)
+            if match:
+                found.append((match.group(1), os.path.join(self.history_dir, name)))
+        return sorted(found)
+    
+    def segments(self, day: str) -> List[str]:
+        """List the JSONL segments of a partition in write order."""
+        return sorted(glob.glob(os.path.join(self.partition_dir(day), 'segment-*.jsonl')))
+    
+    def iter_records(self, start_day: Optional[str] = None,
+                     end_day: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the latest version of each request, partition by partition.
+        
+        Args:
+            start_day: First YYYYMMDD partition to include
+            end_day: Last YYYYMMDD partition to include
+        
+        Yields:
+            Request dictionaries with a 'history_date' field added
+        """
+        for day, path in self.partitions():
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            
+            latest = {}
+            if path.endswith('.csv'):
+                for record in pd.read_csv(path, dtype=str, keep_default_na=False).to_dict('records'):
+                    latest[request_key(record)] = record
+            else:
+                for segment_path in self.segments(day):
+                    with open(segment_path, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            if line.strip():
+                                record = json.loads(line)
+                                latest[request_key(record)] = record
+            
+            for record in latest.values():
+                record['history_date'] = day
+                yield record
+    
+    def read(self, start_day: Optional[str] = None, end_day: Optional[str] = None) -> pd.DataFrame:
+        """
+        Read history into a DataFrame.
+        
+        Args:
+            start_day: First YYYYMMDD partition to include
+            end_day: Last YYYYMMDD partition to include
+        
+        Returns:
+            DataFrame with one row per request per day
+        """
+        return pd.DataFrame(list(self.iter_records(start_day, end_day)))
+    
+    def _load_index(self, day: str) -> Dict[str, str]:
+        """Load a partition's key index once per process and keep it in memory."""
+        if day in self._indexes:
+            return self._indexes[day]
+        
+        os.makedirs(self.partition_dir(day), exist_ok=True)
+        index = {}
+        index_path = os.path.join(self.partition_dir(day), INDEX_FILENAME)
+        if os.path.exists(index_path):
+            with open(index_path, 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        index[parts[0]] = parts[1]
+        self._indexes[day] = index
+        return index
+    
+    def _current_segment(self, day: str) -> str:
+        """Get the segment to append to, starting a new one when the last is full."""
+        segments = self.segments(day)
+        if segments and os.path.getsize(segments[-1]) < SEGMENT_MAX_BYTES:
+            return segments[-1]
+        return os.path.join(self.partition_dir(day), f"segment-{len(segments) + 1:04d}.jsonl")
+
+def _to_json(value):
+    """Convert a request value to something json.dumps accepts."""
+    if isinstance(value, (datetime.date, datetime.time, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, float) and pd.isna(value):
+        return None
+    if hasattr(value, 'item'):
+        # NumPy scalars
+        return value.item()
+    return value
+
+class HistoryIndex:
+    """
+    SQLite index over the history store for fast lookups by slug, requester,
+    status and class date range.
+    
+    The index is a sidecar (history_dir/_index.sqlite3) that can be deleted
+    and rebuilt at any time. refresh() ingests only what was appended since the
+    last call by remembering a byte offset per segment.
+    """
+    
+    def __init__(self, store: HistoryStore, refresh_interval: float = 1.0):
+        self.store = store
+        self.db_path = os.path.join(store.history_dir, '_index.sqlite3')
+        self.refresh_interval = refresh_interval
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(store.history_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                history_date TEXT NOT NULL,
+                key TEXT NOT NULL,
+                slug TEXT,
+                requested_by TEXT,
+                status TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                record TEXT NOT NULL,
+                PRIMARY KEY (history_date, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_slug ON history (slug, start_date);
+            CREATE INDEX IF NOT EXISTS idx_history_requested_by ON history (requested_by, start_date);
+            CREATE INDEX IF NOT EXISTS idx_history_status ON history (status, start_date);
+            CREATE INDEX IF NOT EXISTS idx_history_start_date ON history (start_date);
+            CREATE INDEX IF NOT EXISTS idx_history_key ON history (key);
+            CREATE TABLE IF NOT EXISTS ingested (
+                path TEXT PRIMARY KEY,
+                position INTEGER NOT NULL
+            );
+        """)
+    
+    def refresh(self, force: bool = False) -> int:
+        """
+        Ingest history written since the last refresh.
+        
+        Args:
+            force: Scan even if the last refresh was under refresh_interval seconds ago
+        
+        Returns:
+            Number of rows added or updated
+        """
+        if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return 0
+        
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            positions = dict(self._conn.execute("SELECT path, position FROM ingested"))
+            changed = 0
+            with self._conn:
+                for day, path in self.store.partitions():
+                    if path.endswith('.csv'):
+                        # Legacy files are rewritten in place, so re-read when the size changes
+                        size = os.path.getsize(path)
+                        if positions.get(path) == size:
+                            continue
+                        records = pd.read_csv(path, dtype=str, keep_default_na=False).to_dict('records')
+                        changed += self._upsert(day, records)
+                        self._set_position(path, size)
+                        continue
+                    
+                    for segment_path in self.store.segments(day):
+                        position = positions.get(segment_path, 0)
+                        if os.path.getsize(segment_path) <= position:
+                            continue
+                        with open(segment_path, 'r', encoding='utf-8') as f:
+                            f.seek(position)
+                            records = []
+                            while True:
+                                line = f.readline()
+                                if not line.endswith('\n'):
+                                    # Stop before a row that is still being written
+                                    break
+                                records.append(json.loads(line))
+                                position = f.tell()
+                        changed += self._upsert(day, records)
+                        self._set_position(segment_path, position)
+            return changed
+    
+    def query(self, slug: Optional[str] = None, slug_prefix: Optional[str] = None,
+              requested_by: Optional[str] = None, status: Optional[str] = None,
+              start_date_from: Optional[datetime.date] = None,
+              start_date_to: Optional[datetime.date] = None,
+              limit: Optional[int] = 1000) -> pd.DataFrame:
+        """
+        Find past requests.
+        
+        Args:
+            slug: Exact course code
+            slug_prefix: Course code prefix, e.g. "vtgsc-"
+            requested_by: Requesting username
+            status: Request status (Pending, Approved, Denied)
+            start_date_from: Earliest class start date
+            start_date_to: Latest class start date
+            limit: Maximum rows to return (None for no limit)
+        
+        Returns:
+            DataFrame of matching requests, newest class start date first
+        """
+        self.refresh()
+        
+        clauses = []
+        params = []
+        if slug:
+            clauses.append("slug = ?")
+            params.append(slug)
+        if slug_prefix:
+            # Range scan on the slug index instead of LIKE
+            clauses.append("slug >= ? AND slug < ?")
+            params.extend([slug_prefix, slug_prefix + '\uffff'])
+        if requested_by:
+            clauses.append("requested_by = ?")
+            params.append(requested_by)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if start_date_from:
+            clauses.append("start_date >= ?")
+            params.append(canonical_value(start_date_from))
+        if start_date_to:
+            clauses.append("start_date <= ?")
+            params.append(canonical_value(start_date_to))
+        
+        sql = "SELECT history_date, record FROM history"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY start_date DESC, history_date DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        
+        records = []
+        for history_date, record in rows:
+            record = json.loads(record)
+            record['history_date'] = history_date
+            records.append(record)
+        return pd.DataFrame(records)
+    
+    def find_keys(self, keys: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Look up past requests by request key (see request_key).
+        
+        Args:
+            keys: Request keys to look up
+        
+        Returns:
+            Dictionary mapping each key found to its history records, each with
+            a history_date field
+        """
+        self.refresh()
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, history_date, record FROM history WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, history_date, record in rows:
+                    record = json.loads(record)
+                    record['history_date'] = history_date
+                    found.setdefault(key, []).append(record)
+        return found
+    
+    def distinct(self, column: str) -> List[str]:
+        """List the distinct values of an indexed column (slug, requested_by or status)."""
+        if column not in ('slug', 'requested_by', 'status'):
+            raise ValueError(f"Unsupported column: {column}")
+        self.refresh()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT {column} FROM history WHERE {column} != '' ORDER BY {column}"
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def _upsert(self, day: str, records: List[Dict[str, Any]]) -> int:
+        rows = [
+            (
+                day,
+                request_key(record),
+                canonical_value(record.get('slug')),
+                canonical_value(record.get('requested_by')),
+                canonical_value(record.get('status')),
+                canonical_value(record.get('start_date')),
+                canonical_value(record.get('end_date')),
+                json.dumps({k: _to_json(v) for k, v in record.items()})
+            )
+            for record in records
+        ]
+        # Later rows for the same key replace earlier ones, as in iter_records
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO history "
+            "(history_date, key, slug, requested_by, status, start_date, end_date, record) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        return len(rows)
+    
+    def _set_position(self, path: str, position: int):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO ingested (path, position) VALUES (?, ?)",
+            (path, position)
+        )
+
+_stores = {}
+_indexes = {}
+_stores_lock = threading.Lock()
+
+def get_history_store(history_dir: str) -> HistoryStore:
+    """
+    Get the shared HistoryStore for a directory so its key indexes are loaded once.
+    
+    Args:
+        history_dir: Directory holding the history partitions
+    
+    Returns:
+        HistoryStore instance
+    """
+    with _stores_lock:
+        store = _stores.get(history_dir)
+        if store is None:
+            store = _stores[history_dir] = HistoryStore(history_dir)
+        return store
+
+def get_history_index(history_dir: str) -> HistoryIndex:
+    """
+    Get the shared HistoryIndex for a directory.
+    
+    Args:
+        history_dir: Directory holding the history partitions
+    
+    Returns:
+        HistoryIndex instance
+    """
+    store = get_history_store(history_dir)
+    with _stores_lock:
+        index = _indexes.get(history_dir)
+        if index is None:
+            index = _indexes[history_dir] = HistoryIndex(store)
+        return index
+
+def query_history(history_dir: Optional[str] = None, **filters) -> pd.DataFrame:
+    """
+    Query request history, e.g. query_history(slug='vtgsc-math-6', start_date_from=date(2025, 3, 1)).
+    
+    Args:
+        history_dir: Directory holding the history partitions (defaults to the configured one)
+        **filters: Filters accepted by HistoryIndex.query
+    
+    Returns:
+        DataFrame of matching requests
+    """
+    if history_dir is None:
+        history_dir = CONFIG['paths']['history_dir']
+    return get_history_index(history_dir).query(**filters)
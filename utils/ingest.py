@@ -0,0 +1,252 @@
+import os
+import datetime
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from utils.config import CONFIG
+from utils.duplicates import find_duplicates, DUPLICATE_POLICIES, REPORT_COLUMNS
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Accepted spellings of each column in planning spreadsheets
+COLUMN_ALIASES = {
+    'slug': ['slug', 'course code', 'course_code', 'course'],
+    'meeting_days': ['meeting_days', 'meeting days', 'days', 'days of week'],
+    'start_date': ['start_date', 'start date', 'start'],
+    'end_date': ['end_date', 'end date', 'end'],
+    'start_time': ['start_time', 'start time', 'time', 'start time (central)'],
+    'excluded_meeting_dates': ['excluded_meeting_dates', 'excluded meeting dates', 'excluded dates', 'exclusions']
+}
+
+REQUIRED_COLUMNS = ['slug', 'meeting_days', 'start_date', 'end_date', 'start_time']
+
+SLUG_PATTERN = r'^[a-zA-Z]+-[a-zA-Z0-9-]+'
+
+def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Rename spreadsheet headers to request field names."""
+    lookup = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    renamed = {}
+    for column in df.columns:
+        field = lookup.get(str(column).strip().lower())
+        if field and field not in renamed.values():
+            renamed[column] = field
+    return df.rename(columns=renamed)
+
+def read_table(source: Union[str, IO], chunksize: int = 5000,
+               file_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV or XLSX file in chunks of rows, keeping its own headers.
+    
+    Args:
+        source: Path or binary file object (e.g. a Streamlit UploadedFile)
+        chunksize: Rows per chunk
+        file_name: File name used to detect the format when source is a file object
+    
+    Yields:
+        DataFrames of up to chunksize rows, all values as strings
+    """
+    name = file_name or (source if isinstance(source, str) else getattr(source, 'name', ''))
+    extension = os.path.splitext(str(name))[1].lower()
+    
+    if extension in ('.xlsx', '.xlsm'):
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(value).strip() if value is not None else '' for value in next(rows, [])]
+            batch = []
+            for row in rows:
+                batch.append(['' if value is None else value for value in row])
+                if len(batch) >= chunksize:
+                    yield _xlsx_frame(batch, header)
+                    batch = []
+            if batch:
+                yield _xlsx_frame(batch, header)
+        finally:
+            workbook.close()
+    else:
+        yield from pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunksize)
+
+def read_request_file(source: Union[str, IO], chunksize: int = 5000,
+                      file_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV or XLSX planning file in chunks of rows.
+    
+    Args:
+        source: Path or binary file object (e.g. a Streamlit UploadedFile)
+        chunksize: Rows per chunk
+        file_name: File name used to detect the format when source is a file object
+    
+    Yields:
+        DataFrames of up to chunksize rows with normalized column names, all as strings
+    """
+    for chunk in read_table(source, chunksize=chunksize, file_name=file_name):
+        yield _normalize_columns(chunk)
+
+def _xlsx_frame(rows: List[list], header: List[str]) -> pd.DataFrame:
+    """Build a string DataFrame from worksheet rows, keeping dates and times ISO formatted."""
+    def to_text(value):
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        return str(value)
+    width = len(header)
+    data = [[to_text(value) for value in (list(row[:width]) + [''] * (width - len(row)))] for row in rows]
+    return pd.DataFrame(data, columns=header)
+
+def normalize_meeting_days(days: pd.Series) -> pd.Series:
+    """
+    Normalize meeting days to the form's "Monday,Wednesday" format, vectorized.
+    
+    Accepts full names, three-letter abbreviations and any separator
+    ("Mon/Wed", "mon|wed", "Monday, Wednesday").
+    
+    Args:
+        days: Series of meeting day strings
+    
+    Returns:
+        Series of comma-separated full day names ('' when no day is recognized)
+    """
+    lowered = days.fillna('').astype(str).str.lower()
+    result = pd.Series('', index=days.index)
+    for day in DAY_NAMES:
+        has_day = lowered.str.contains(rf'\b{day[:3].lower()}', regex=True)
+        separator = np.where(result == '', '', ',')
+        result = result.where(~has_day, result + separator + day)
+    return result
+
+def validate_request_chunk(chunk: pd.DataFrame, catalog_slugs: Iterable[str],
+                           row_offset: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Validate a chunk of uploaded requests against the catalog with vectorized checks.
+    
+    Args:
+        chunk: DataFrame from read_request_file
+        catalog_slugs: Course codes in course_master.json
+        row_offset: Number of data rows before this chunk, for error row numbers
+    
+    Returns:
+        Tuple of (valid requests DataFrame with their row numbers, errors DataFrame
+        with row, slug and error columns)
+    """
+    # Spreadsheet row numbers: header is row 1
+    rows = pd.Series(np.arange(len(chunk)) + row_offset + 2, index=chunk.index)
+    
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        errors = pd.DataFrame({
+            'row': rows,
+            'slug': chunk.get('slug', pd.Series('', index=chunk.index)),
+            'error': f"Missing column(s): {', '.join(missing)}"
+        })
+        return pd.DataFrame(columns=['row'] + REQUIRED_COLUMNS + ['excluded_meeting_dates']), errors
+    
+    slugs = chunk['slug'].fillna('').astype(str).str.strip()
+    meeting_days = normalize_meeting_days(chunk['meeting_days'])
+    start_dates = pd.to_datetime(chunk['start_date'].str.strip(), errors='coerce', format='mixed')
+    end_dates = pd.to_datetime(chunk['end_date'].str.strip(), errors='coerce', format='mixed')
+    start_times = pd.to_datetime(chunk['start_time'].str.strip(), errors='coerce', format='mixed')
+    if 'excluded_meeting_dates' in chunk.columns:
+        excluded = chunk['excluded_meeting_dates'].fillna('').astype(str).str.replace(r'\s+', '', regex=True)
+    else:
+        excluded = pd.Series('', index=chunk.index)
+    
+    # Each check is a boolean mask over the whole chunk; the first failing check is reported
+    checks = [
+        (slugs == '', "Missing course code"),
+        (~slugs.str.match(SLUG_PATTERN), "Invalid course code format"),
+        (~slugs.isin(set(catalog_slugs)), "Course code not found in course master"),
+        (meeting_days == '', "No valid meeting days"),
+        (start_dates.isna(), "Invalid start date"),
+        (end_dates.isna(), "Invalid end date"),
+        (end_dates < start_dates, "End date is before start date"),
+        (start_times.isna(), "Invalid start time"),
+        (~excluded.str.fullmatch(r'(\d{4}-\d{2}-\d{2})?(,\d{4}-\d{2}-\d{2})*'), "Excluded dates must be YYYY-MM-DD separated by commas"),
+    ]
+    error = pd.Series('', index=chunk.index)
+    for mask, message in checks:
+        error = error.where(~(mask.fillna(True) & (error == '')), message)
+    
+    failed = error != ''
+    errors = pd.DataFrame({'row': rows[failed], 'slug': slugs[failed], 'error': error[failed]})
+    
+    ok = ~failed
+    valid = pd.DataFrame({
+        'row': rows[ok],
+        'slug': slugs[ok],
+        'meeting_days': meeting_days[ok],
+        'start_date': start_dates[ok].dt.date,
+        'end_date': end_dates[ok].dt.date,
+        'start_time': start_times[ok].dt.time,
+        'excluded_meeting_dates': excluded[ok]
+    })
+    return valid, errors
+
+def ingest_requests(source: Union[str, IO], requested_by: str, store, catalog_slugs: Iterable[str],
+                    chunksize: int = 5000, file_name: Optional[str] = None,
+                    duplicate_policy: Optional[str] = None, history_index=None) -> Dict[str, object]:
+    """
+    Validate a planning file and add every valid row to the request store in one batched write.
+    
+    Args:
+        source: Path or binary file object of a CSV or XLSX file
+        requested_by: Username recorded on the new requests
+        store: RequestStore to add requests to
+        catalog_slugs: Course codes in course_master.json
+        chunksize: Rows parsed and validated at a time
+        file_name: File name used to detect the format when source is a file object
+        duplicate_policy: 'reject' to skip rows repeating an existing request,
+            'flag' to add them but report them, or 'allow' to skip the check
+            (defaults to CONFIG['defaults']['duplicate_policy'])
+        history_index: Optional HistoryIndex so exported requests count as existing
+    
+    Returns:
+        Dictionary with 'added' (count), 'request_ids', 'errors' (DataFrame of
+        rejected rows) and 'duplicates' (DataFrame of matches, see find_duplicates)
+    """
+    duplicate_policy = duplicate_policy or CONFIG['defaults'].get('duplicate_policy', 'flag')
+    if duplicate_policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate policy: {duplicate_policy}")
+    
+    catalog_slugs = set(catalog_slugs)
+    valid_chunks = []
+    error_chunks = []
+    row_offset = 0
+    for chunk in read_request_file(source, chunksize=chunksize, file_name=file_name):
+        valid, errors = validate_request_chunk(chunk, catalog_slugs, row_offset)
+        valid_chunks.append(valid)
+        error_chunks.append(errors)
+        row_offset += len(chunk)
+    
+    valid = pd.concat(valid_chunks, ignore_index=True) if valid_chunks else pd.DataFrame(columns=['row'])
+    errors = pd.concat(error_chunks, ignore_index=True) if error_chunks else pd.DataFrame(columns=['row', 'slug', 'error'])
+    duplicates = pd.DataFrame(columns=REPORT_COLUMNS)
+    
+    request_ids = []
+    if not valid.empty:
+        valid['requested_by'] = requested_by
+        valid['request_date'] = datetime.datetime.now().date()
+        valid['status'] = 'Pending'
+        rows = valid.pop('row')
+        requests = valid.to_dict('records')
+        
+        if duplicate_policy != 'allow':
+            duplicates = find_duplicates(requests, store, history_index, row_numbers=rows.tolist())
+            if duplicate_policy == 'reject' and not duplicates.empty:
+                duplicate_rows = duplicates.drop_duplicates('row')
+                rejected = pd.DataFrame({
+                    'row': duplicate_rows['row'],
+                    'slug': duplicate_rows['slug'],
+                    'error': "Duplicate of an existing request"
+                })
+                errors = pd.concat([errors, rejected], ignore_index=True).sort_values('row', ignore_index=True)
+                keep = ~rows.isin(duplicate_rows['row']).to_numpy()
+                requests = [request for request, kept in zip(requests, keep) if kept]
+        
+        request_ids = store.add_many(requests)
+    
+    return {
+        'added': len(request_ids),
+        'request_ids': request_ids,
+        'errors': errors,
+        'duplicates': duplicates
+    }
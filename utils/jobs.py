@@ -0,0 +1,259 @@
+import os
+import time
+import uuid
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import pandas as pd
+from utils.config import CONFIG
+from utils.data_processor import process_class_data, get_catalog_version
+from utils.export import (
+    export_to_buffer, persist_export_async, export_sharded, archive_shards,
+    compute_export_key, find_cached_export, record_export, save_to_history
+)
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been asked to stop."""
+
+class Job:
+    """
+    A unit of background work with progress, stage and cancellation state.
+    
+    Jobs live in the process-wide runner rather than in st.session_state, so a
+    browser refresh or rerun can pick a job back up by its ID.
+    """
+    
+    def __init__(self, job_id: str, description: str):
+        self.id = job_id
+        self.description = description
+        self.status = 'queued'  # queued, running, done, failed, cancelled
+        self.progress = 0.0
+        self.stage = 'Queued'
+        self.result = None
+        self.error = None
+        self.created_at = datetime.datetime.now()
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._future = None
+    
+    def report(self, progress: float, stage: str):
+        """
+        Update progress and stage, stopping the job if cancellation was requested.
+        
+        Args:
+            progress: Fraction complete between 0 and 1
+            stage: Short description of the current step
+        """
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.progress = min(max(progress, 0.0), 1.0)
+        self.stage = stage
+    
+    def cancel(self):
+        """Ask the job to stop at its next progress report."""
+        self._cancel_event.set()
+        if self._future is not None and self._future.cancel():
+            # Never started, so nothing will report back
+            self._finish('cancelled', stage='Cancelled')
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed', 'cancelled')
+    
+    def _finish(self, status: str, stage: str, result=None, error=None):
+        self.status = status
+        self.stage = stage
+        self.result = result
+        self.error = error
+        self.finished_at = datetime.datetime.now()
+
+class JobRunner:
+    """
+    Thread pool executor that tracks jobs by ID.
+    
+    Finished jobs are kept for retention_seconds so their results can still be
+    collected after a rerun or browser refresh.
+    """
+    
+    def __init__(self, max_workers: int = 2, retention_seconds: int = 3600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.retention_seconds = retention_seconds
+    
+    def submit(self, description: str, func: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Run func(job, *args, **kwargs) in the background.
+        
+        Args:
+            description: Human-readable job description
+            func: Callable receiving the Job as its first argument
+        
+        Returns:
+            The new Job
+        """
+        job = Job(uuid.uuid4().hex[:12], description)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job._future = self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+    
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        """Get a job by ID, or None if it is unknown or expired."""
+        if not job_id:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation of a job.
+        
+        Returns:
+            True if the job exists and was not already finished
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel()
+        return True
+    
+    def _run(self, job: Job, func, args, kwargs):
+        if job._cancel_event.is_set():
+            job._finish('cancelled', stage='Cancelled')
+            return
+        job.status = 'running'
+        job.stage = 'Starting'
+        try:
+            result = func(job, *args, **kwargs)
+            job.progress = 1.0
+            job._finish('done', stage='Done', result=result)
+        except JobCancelled:
+            job._finish('cancelled', stage='Cancelled')
+        except Exception as e:
+            job._finish('failed', stage='Failed', error=str(e))
+            print(f"Error in job {job.id} ({job.description}): {str(e)}")
+    
+    def _prune(self):
+        """Drop finished jobs older than the retention window."""
+        cutoff = datetime.datetime.now() - datetime.timedelta(seconds=self.retention_seconds)
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def get_job_runner() -> JobRunner:
+    """
+    Get the process-wide job runner, shared by every Streamlit session.
+    
+    Returns:
+        JobRunner instance
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(max_workers=CONFIG['defaults'].get('export_workers', 2))
+        return _runner
+
+def run_export_job(job: Job, approved_requests: pd.DataFrame, export_format: str = 'csv',
+                   compression: Optional[str] = None, partition_by: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Process approved requests and export them, reporting progress on the job.
+    
+    Args:
+        job: Job to report progress on
+        approved_requests: DataFrame containing approved class requests
+        export_format: 'csv' or 'xlsx' (of every file, for split exports)
+        compression: None, 'gzip' or 'zip' (of every file, for split exports)
+        partition_by: None, 'brand' or 'business_units'
+    
+    Returns:
+        Dictionary with the export path, download file name, MIME type, bytes
+        to download and whether an earlier export was reused
+    """
+    export_dir = CONFIG['paths']['export_dir']
+    
+    # Keep a record of every exported request; rows already saved are skipped,
+    # so re-exporting the same approved set (cached or not) records it once
+    job.report(0.0, "Saving request history")
+    save_to_history(approved_requests, CONFIG['paths']['history_dir'])
+    
+    # Identical approved sets against the same catalog reuse the earlier export
+    job.report(0.0, "Checking for an identical export")
+    export_key = compute_export_key(
+        approved_requests,
+        get_catalog_version(),
+        {'format': export_format, 'compression': compression, 'split': partition_by}
+    )
+    cached_export = find_cached_export(export_dir, export_key, export_format, compression)
+    if cached_export:
+        return _collect_export(cached_export['path'], cached_export.get('mime', 'text/csv'), cached=True)
+    
+    export_started = time.perf_counter()
+    
+    def on_row(done, total):
+        job.report(0.05 + 0.8 * done / total, f"Processing requests ({done}/{total})")
+    
+    job.report(0.05, "Processing requests")
+    processed_data = process_class_data(approved_requests, progress_callback=on_row)
+    request_ids = list(approved_requests.index)
+    
+    if partition_by:
+        job.report(0.85, "Writing split files")
+        index_path = export_sharded(
+            processed_data, export_dir, partition_by,
+            export_format=export_format, compression=compression, export_key=export_key
+        )
+        record_export(
+            export_dir, export_key, index_path, len(processed_data),
+            time.perf_counter() - export_started, request_ids, mime="application/json"
+        )
+        return _collect_export(index_path, "application/json", cached=False)
+    
+    job.report(0.85, "Writing export")
+    buffer, export_name, mime = export_to_buffer(
+        processed_data,
+        export_format=export_format,
+        compression=compression,
+        export_key=export_key
+    )
+    elapsed = time.perf_counter() - export_started
+    
+    # Keep a copy in the exports folder and record it once it is on disk
+    job.report(0.95, "Saving a copy to the exports folder")
+    persist_export_async(
+        buffer, export_dir, export_name,
+        on_complete=lambda path: record_export(
+            export_dir, export_key, path, len(processed_data), elapsed, request_ids, mime=mime
+        )
+    )
+    return {
+        'path': os.path.join(export_dir, export_name),
+        'file_name': export_name,
+        'mime': mime,
+        'data': buffer.getvalue(),
+        'cached': False
+    }
+
+def _collect_export(path: str, mime: str, cached: bool) -> Dict[str, Any]:
+    """Load an export from disk into a job result."""
+    if path.endswith('index.json'):
+        data = archive_shards(path).getvalue()
+        file_name = f"{os.path.basename(os.path.dirname(path))}.zip"
+        mime = "application/zip"
+    else:
+        with open(path, 'rb') as f:
+            data = f.read()
+        file_name = os.path.basename(path)
+    return {
+        'path': path,
+        'file_name': file_name,
+        'mime': mime,
+        'data': data,
+        'cached': cached
+    }
@@ -0,0 +1,125 @@
+import os
+import pickle
+import datetime
+import tempfile
+from typing import Dict, Optional
+import pandas as pd
+from utils.config import CONFIG
+from utils.google_sheets import SheetsAPIError, SheetsClientPool, get_sheets_pool, values_to_dataframe
+
+def sheet_range(title: str) -> str:
+    """A1 range covering a whole sheet, quoting the title."""
+    return "'" + title.replace("'", "''") + "'"
+
+def fetch_reference_tabs(spreadsheet_id: str, sheets: Dict[str, str],
+                         pool: Optional[SheetsClientPool] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch several tabs of a spreadsheet in one values_batch_get request.
+    
+    Args:
+        spreadsheet_id: ID of the Google Sheets document
+        sheets: Name -> tab title, e.g. {'subject_key': 'Subject Key'}
+        pool: Client pool to use (defaults to the process-wide pool)
+    
+    Returns:
+        Name -> DataFrame of the tab (first row as header)
+    
+    Raises:
+        SheetsAPIError: If the response does not hold one value range per tab
+    """
+    pool = pool or get_sheets_pool()
+    client = pool.get_client()
+    with pool.errors(f"sheets {', '.join(sheets.values())}"):
+        response = client.open_by_key(spreadsheet_id).values_batch_get([sheet_range(title) for title in sheets.values()])
+    
+    value_ranges = response.get('valueRanges', [])
+    if len(value_ranges) != len(sheets):
+        raise SheetsAPIError(f"Requested {len(sheets)} sheets but received {len(value_ranges)} value ranges")
+    
+    # Value ranges come back in the order they were requested
+    return {name: values_to_dataframe(value_range.get('values', []))
+            for name, value_range in zip(sheets, value_ranges)}
+
+def _read_cache(cache_path: str) -> Optional[dict]:
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading reference data cache: {str(e)}")
+        return None
+
+def _write_cache(cache_path: str, cache: dict):
+    directory = os.path.dirname(cache_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.reference-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def load_reference_data(spreadsheet_id: Optional[str] = None, sheets: Optional[Dict[str, str]] = None,
+                        cache_path: Optional[str] = None, pool: Optional[SheetsClientPool] = None,
+                        refresh: bool = False) -> Dict[str, pd.DataFrame]:
+    """
+    Get the reference tabs, from the local cache while the spreadsheet is unchanged.
+    
+    Each call asks Drive for the spreadsheet's revision (a small metadata
+    request). If the cache was written at that revision for the same tabs it
+    is returned as is; otherwise every tab is fetched in one batch request
+    and the cache is rewritten. If the revision cannot be checked (e.g. when
+    offline), the cached tabs are used.
+    
+    Args:
+        spreadsheet_id: ID of the Google Sheets document (defaults to
+            CONFIG['data']['reference_spreadsheet_id'])
+        sheets: Name -> tab title (defaults to CONFIG['data']['reference_sheets'])
+        cache_path: Pickle file for the cache (defaults to CONFIG['paths']['reference_cache'])
+        pool: Client pool to use (defaults to the process-wide pool)
+        refresh: Fetch the tabs even if the cache is current
+    
+    Returns:
+        Name -> DataFrame, e.g. {'parent_data': ..., 'subject_key': ..., 'grade_lookup': ...}
+    
+    Raises:
+        ValueError: If no spreadsheet ID is configured
+        GoogleSheetsError: If the tabs cannot be fetched and there is no usable cache
+    """
+    spreadsheet_id = spreadsheet_id or CONFIG['data']['reference_spreadsheet_id']
+    sheets = dict(sheets or CONFIG['data']['reference_sheets'])
+    cache_path = cache_path or CONFIG['paths']['reference_cache']
+    pool = pool or get_sheets_pool()
+    if not spreadsheet_id:
+        raise ValueError("No reference spreadsheet ID configured; set data.reference_spreadsheet_id in config.json")
+    
+    cache = _read_cache(cache_path)
+    if cache is not None and (cache['spreadsheet_id'] != spreadsheet_id or cache['sheets'] != sheets):
+        cache = None
+    
+    try:
+        client = pool.get_client()
+        with pool.errors("the reference spreadsheet revision"):
+            revision = pool.backend.revision(client, spreadsheet_id)
+    except Exception as e:
+        if cache is None:
+            raise
+        print(f"Error checking reference data revision, using the cache from {cache['fetched_at']}: {str(e)}")
+        return cache['frames']
+    
+    if cache is not None and cache['revision'] == revision and not refresh:
+        return cache['frames']
+    
+    frames = fetch_reference_tabs(spreadsheet_id, sheets, pool=pool)
+    _write_cache(cache_path, {
+        'spreadsheet_id': spreadsheet_id,
+        'sheets': sheets,
+        'revision': revision,
+        'fetched_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'frames': frames
+    })
+    return frames
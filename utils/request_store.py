@@ -0,0 +1,830 @@
+import os
+import json
+import sqlite3
+import contextlib
+import time
+import itertools
+import uuid
+import atexit
+import datetime
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import pandas as pd
+from utils.config import CONFIG
+from utils.history import request_key, HISTORY_KEY_COLUMNS
+
+# Columns every request has, in display order
+REQUEST_COLUMNS = [
+    'slug', 'meeting_days', 'start_date', 'end_date', 'start_time',
+    'excluded_meeting_dates', 'requested_by', 'request_date', 'status', 'class_type'
+]
+
+REQUEST_STATUSES = ['Pending', 'Approved', 'Denied']
+CLASS_TYPES = ['Livestream', 'Group Class']
+
+# Low-cardinality columns stored as pandas categoricals in frame(); None means
+# the categories are taken from the data
+CATEGORICAL_COLUMNS = {
+    'status': REQUEST_STATUSES,
+    'class_type': CLASS_TYPES,
+    'requested_by': None,
+    'meeting_days': None
+}
+
+DATE_FIELDS = ('start_date', 'end_date', 'request_date')
+TIME_FIELDS = ('start_time',)
+
+def _encode(value):
+    """Convert a request value to something json.dumps accepts."""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, float) and pd.isna(value):
+        return None
+    if hasattr(value, 'item'):
+        # NumPy scalars
+        return value.item()
+    return value
+
+def _decode(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn ISO strings from the log back into date and time objects."""
+    for field in DATE_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str) and value:
+            record[field] = datetime.date.fromisoformat(value[:10])
+    for field in TIME_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str) and value:
+            record[field] = datetime.time.fromisoformat(value)
+    return record
+
+def _to_frame(rows: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """Build the DataFrame returned by frame() from request ID -> request."""
+    df = pd.DataFrame.from_dict(rows, orient='index')
+    df = df.reindex(columns=REQUEST_COLUMNS + [c for c in df.columns if c not in REQUEST_COLUMNS])
+    df.index.name = 'request_id'
+    for column, categories in CATEGORICAL_COLUMNS.items():
+        df[column] = pd.Categorical(df[column], categories=categories)
+    # Request IDs are time-ordered, so this keeps submission order
+    return df.sort_index()
+
+def _transition_fields(status: str, class_type: Optional[str]) -> Dict[str, Any]:
+    """Validate a status change and return the fields to set."""
+    if status not in REQUEST_STATUSES:
+        raise ValueError(f"Unknown status: {status}")
+    if class_type is not None and class_type not in CLASS_TYPES:
+        raise ValueError(f"Unknown class type: {class_type}")
+    fields = {'status': status}
+    if class_type is not None:
+        fields['class_type'] = class_type
+    return fields
+
+class RequestStore:
+    """
+    Process-wide class request store shared by every Streamlit session.
+    
+    Every change is appended to a JSONL event log (insert, update and delete
+    events) and replayed on startup. A batch update is a single event, so it
+    is applied all-or-nothing on replay and can carry one audit record.
+    
+    Writes go to the OS immediately but are fsynced in batches by a
+    background thread: after fsync_batch events or fsync_interval seconds,
+    whichever comes first.
+    
+    In-memory indexes by status, requester, slug and request key (see
+    history.request_key) make filters and duplicate checks O(1) lookups
+    instead of scans over every request. They are rebuilt from the log on
+    startup.
+    """
+    
+    def __init__(self, path: str, fsync_interval: float = 0.5, fsync_batch: int = 100):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        
+        self._records = {}
+        self._by_status = {}
+        self._by_requester = {}
+        self._by_slug = {}
+        self._by_key = {}
+        # Bumped on every change so derived views (e.g. conflicts) know when to recompute
+        self.version = 0
+        self._lock = threading.RLock()
+        self._pending_sync = 0
+        self._sync_needed = threading.Event()
+        self._closed = False
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._replay()
+        self._log = open(path, 'a', encoding='utf-8')
+        
+        self._syncer = threading.Thread(target=self._sync_loop, name='request-store-fsync', daemon=True)
+        self._syncer.start()
+    
+    # Reads
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of one request, or None if it does not exist."""
+        with self._lock:
+            record = self._records.get(request_id)
+            return dict(record) if record is not None else None
+    
+    def ids_by_status(self, status: str) -> Set[str]:
+        """Get the IDs of requests with a status."""
+        with self._lock:
+            return set(self._by_status.get(status, ()))
+    
+    def ids_by_requester(self, username: str) -> Set[str]:
+        """Get the IDs of requests made by a user."""
+        with self._lock:
+            return set(self._by_requester.get(username, ()))
+    
+    def ids_by_slug(self, slug: str) -> Set[str]:
+        """Get the IDs of requests for a course code."""
+        with self._lock:
+            return set(self._by_slug.get(slug, ()))
+    
+    def ids_by_key(self, key: str) -> Set[str]:
+        """Get the IDs of requests with a request key (same course, days, dates and time)."""
+        with self._lock:
+            return set(self._by_key.get(key, ()))
+    
+    def ids_where(self, status: Optional[str] = None, requested_by: Optional[str] = None,
+                  slug: Optional[str] = None) -> Set[str]:
+        """
+        Get the IDs matching every given filter by intersecting the index sets.
+        
+        The smallest set is copied and the others are only probed, so the cost is
+        proportional to the smallest matching set rather than to all requests.
+        
+        Args:
+            status: Request status
+            requested_by: Requesting username
+            slug: Course code
+        
+        Returns:
+            Set of matching request IDs (every ID when no filter is given)
+        """
+        with self._lock:
+            candidates = []
+            if status is not None:
+                candidates.append(self._by_status.get(status, set()))
+            if requested_by is not None:
+                candidates.append(self._by_requester.get(requested_by, set()))
+            if slug is not None:
+                candidates.append(self._by_slug.get(slug, set()))
+            if not candidates:
+                return set(self._records)
+            candidates.sort(key=len)
+            return {request_id for request_id in candidates[0]
+                    if all(request_id in other for other in candidates[1:])}
+    
+    def records(self, request_ids: Iterable[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Get (request ID, copy of request) pairs for existing IDs."""
+        with self._lock:
+            return [(request_id, dict(self._records[request_id]))
+                    for request_id in request_ids if request_id in self._records]
+    
+    def count_by_status(self) -> Dict[str, int]:
+        """Get the number of requests per status without building a frame."""
+        with self._lock:
+            return {status: len(ids) for status, ids in self._by_status.items()}
+    
+    def frame(self, request_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Build a DataFrame of requests indexed by request ID.
+        
+        Args:
+            request_ids: IDs to include (defaults to every request)
+        
+        Returns:
+            DataFrame with REQUEST_COLUMNS, in submission order
+        """
+        with self._lock:
+            if request_ids is None:
+                request_ids = self._records.keys()
+            rows = {request_id: self._records[request_id]
+                    for request_id in request_ids if request_id in self._records}
+        
+        return _to_frame(rows)
+    
+    def snapshot(self, status: Optional[str] = None, requested_by: Optional[str] = None) -> pd.DataFrame:
+        """
+        Build a DataFrame of the requests matching the filters as of one moment.
+        
+        Args:
+            status: Request status
+            requested_by: Requesting username
+        
+        Returns:
+            DataFrame as returned by frame()
+        """
+        with self._lock:
+            return self.frame(self.ids_where(status=status, requested_by=requested_by))
+    
+    # Writes
+    
+    def add_many(self, requests: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Add new requests in one batched append.
+        
+        Args:
+            requests: Request dictionaries
+        
+        Returns:
+            The new request IDs, in order
+        """
+        events = []
+        with self._lock:
+            for request in requests:
+                request_id = _new_request_id()
+                record = {column: request.get(column) for column in REQUEST_COLUMNS}
+                record.update({k: v for k, v in request.items() if k not in record})
+                events.append({'op': 'insert', 'id': request_id, 'record': record})
+            self._append(events)
+            for event in events:
+                self._apply(event)
+        return [event['id'] for event in events]
+    
+    def add(self, request: Dict[str, Any]) -> str:
+        """Add one new request and return its ID."""
+        return self.add_many([request])[0]
+    
+    def update_many(self, request_ids: Iterable[str], audit: Optional[Dict[str, Any]] = None, **fields) -> int:
+        """
+        Set fields (e.g. status, class_type) on several requests in one log event.
+        
+        Args:
+            request_ids: Requests to change
+            audit: Optional details of the change (who, why, which selection),
+                written with the event as the batch's audit record
+            **fields: Field values to set
+        
+        Returns:
+            Number of requests updated
+        """
+        with self._lock:
+            ids = [request_id for request_id in dict.fromkeys(request_ids) if request_id in self._records]
+            if not ids:
+                return 0
+            event = {'op': 'update', 'ids': ids, 'fields': fields}
+            if audit is not None:
+                event['audit'] = {
+                    'at': datetime.datetime.now().isoformat(timespec='seconds'),
+                    'count': len(ids),
+                    **audit
+                }
+            self._append([event])
+            self._apply(event)
+        return len(ids)
+    
+    def update(self, request_id: str, **fields) -> bool:
+        """Set fields on one request. Returns False if it does not exist."""
+        return self.update_many([request_id], **fields) == 1
+    
+    def transition(self, request_ids: Iterable[str], status: str,
+                   class_type: Optional[str] = None, audit: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Move requests to a new status, keeping the status index in step.
+        
+        Args:
+            request_ids: Requests to change
+            status: One of REQUEST_STATUSES
+            class_type: Class type to record with the change (e.g. on approval)
+            audit: Optional details of the change, see update_many
+        
+        Returns:
+            Number of requests changed
+        """
+        return self.update_many(request_ids, audit=audit, **_transition_fields(status, class_type))
+    
+    def audit_records(self) -> List[Dict[str, Any]]:
+        """
+        Read the audit record of every audited batch change, oldest first.
+        
+        Returns:
+            List of audit dictionaries, each with the new field values under 'fields'
+        """
+        with self._lock:
+            if not self._closed:
+                self._log.flush()
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if '"audit"' not in line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if 'audit' in event:
+                    records.append({**event['audit'], 'fields': event.get('fields', {})})
+        return records
+    
+    def remove(self, request_ids: Iterable[str]) -> int:
+        """
+        Delete requests.
+        
+        Returns:
+            Number of requests removed
+        """
+        with self._lock:
+            ids = [request_id for request_id in request_ids if request_id in self._records]
+            if not ids:
+                return 0
+            event = {'op': 'delete', 'ids': ids}
+            self._append([event])
+            self._apply(event)
+        return len(ids)
+    
+    def flush(self):
+        """Flush and fsync everything written so far."""
+        with self._lock:
+            if self._closed:
+                return
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._pending_sync = 0
+    
+    def close(self):
+        """Flush the log and stop the fsync thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._closed = True
+            self._log.close()
+        self._sync_needed.set()
+    
+    # Internals
+    
+    def _append(self, events: List[Dict[str, Any]]):
+        if not events:
+            return
+        lines = []
+        for event in events:
+            if 'record' in event:
+                event = {**event, 'record': {k: _encode(v) for k, v in event['record'].items()}}
+            if 'fields' in event:
+                event = {**event, 'fields': {k: _encode(v) for k, v in event['fields'].items()}}
+            lines.append(json.dumps(event) + '\n')
+        self._log.writelines(lines)
+        self._log.flush()
+        self._pending_sync += len(events)
+        if self._pending_sync >= self.fsync_batch:
+            os.fsync(self._log.fileno())
+            self._pending_sync = 0
+        else:
+            self._sync_needed.set()
+    
+    def _apply(self, event: Dict[str, Any]):
+        self.version += 1
+        op = event['op']
+        if op == 'insert':
+            self._records[event['id']] = event['record']
+            self._index(event['id'], event['record'])
+        elif op == 'update':
+            for request_id in event['ids']:
+                record = self._records.get(request_id)
+                if record is None:
+                    continue
+                self._unindex(request_id, record)
+                record.update(event['fields'])
+                self._index(request_id, record)
+        elif op == 'delete':
+            for request_id in event['ids']:
+                record = self._records.pop(request_id, None)
+                if record is not None:
+                    self._unindex(request_id, record)
+    
+    def _index(self, request_id: str, record: Dict[str, Any]):
+        self._by_status.setdefault(record.get('status'), set()).add(request_id)
+        self._by_requester.setdefault(record.get('requested_by'), set()).add(request_id)
+        self._by_slug.setdefault(record.get('slug'), set()).add(request_id)
+        self._by_key.setdefault(request_key(record), set()).add(request_id)
+    
+    def _unindex(self, request_id: str, record: Dict[str, Any]):
+        for index, key in ((self._by_status, record.get('status')),
+                           (self._by_requester, record.get('requested_by')),
+                           (self._by_slug, record.get('slug')),
+                           (self._by_key, request_key(record))):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(request_id)
+                if not ids:
+                    del index[key]
+    
+    def _replay(self):
+        """Rebuild state from the event log."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; everything before it is intact
+                    print(f"Skipping unreadable line {line_number} in {self.path}")
+                    continue
+                if 'record' in event:
+                    _decode(event['record'])
+                if 'fields' in event:
+                    _decode(event['fields'])
+                self._apply(event)
+    
+    def _sync_loop(self):
+        while not self._closed:
+            self._sync_needed.wait()
+            if self._closed:
+                return
+            # Give more writes a chance to join this fsync
+            time.sleep(self.fsync_interval)
+            self._sync_needed.clear()
+            try:
+                with self._lock:
+                    if not self._closed and self._pending_sync:
+                        os.fsync(self._log.fileno())
+                        self._pending_sync = 0
+            except OSError as e:
+                print(f"Error syncing request log: {str(e)}")
+
+class SqliteRequestStore:
+    """
+    Class request store in a SQLite database in WAL mode.
+    
+    Use this instead of RequestStore when several Streamlit server processes
+    (e.g. behind a load balancer) must share the same requests: every process
+    reads and writes the database directly, so there is no in-memory copy to
+    fall out of step. It has the same interface as RequestStore.
+    
+    Each thread of each process reuses one connection. Writes run in
+    BEGIN IMMEDIATE transactions, so concurrent writers queue on SQLite's
+    write lock (for up to busy_timeout seconds) instead of failing, and
+    readers are never blocked by WAL mode.
+    """
+    
+    def __init__(self, path: str, busy_timeout: float = 30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        columns = ',\n'.join(f"                {column} TEXT" for column in REQUEST_COLUMNS)
+        with self._transaction(bump_version=False) as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS requests (
+                    request_id TEXT PRIMARY KEY,
+{columns},
+                    request_key TEXT NOT NULL,
+                    extra TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_status ON requests (status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_requested_by ON requests (requested_by, status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_slug ON requests (slug)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_key ON requests (request_key)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS audit (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fields TEXT NOT NULL,
+                    details TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('version', 0)")
+    
+    # Reads
+    
+    @property
+    def version(self) -> int:
+        """Change counter shared by every process; bumped by each write."""
+        return self._connect().execute("SELECT value FROM meta WHERE name = 'version'").fetchone()[0]
+    
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+    
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of one request, or None if it does not exist."""
+        records = self.records([request_id])
+        return records[0][1] if records else None
+    
+    def ids_by_status(self, status: str) -> Set[str]:
+        """Get the IDs of requests with a status."""
+        return self.ids_where(status=status)
+    
+    def ids_by_requester(self, username: str) -> Set[str]:
+        """Get the IDs of requests made by a user."""
+        return self.ids_where(requested_by=username)
+    
+    def ids_by_slug(self, slug: str) -> Set[str]:
+        """Get the IDs of requests for a course code."""
+        return self.ids_where(slug=slug)
+    
+    def ids_by_key(self, key: str) -> Set[str]:
+        """Get the IDs of requests with a request key (same course, days, dates and time)."""
+        rows = self._connect().execute("SELECT request_id FROM requests WHERE request_key = ?", (key,))
+        return {row[0] for row in rows}
+    
+    def ids_where(self, status: Optional[str] = None, requested_by: Optional[str] = None,
+                  slug: Optional[str] = None) -> Set[str]:
+        """
+        Get the IDs matching every given filter using the table's indexes.
+        
+        Args:
+            status: Request status
+            requested_by: Requesting username
+            slug: Course code
+        
+        Returns:
+            Set of matching request IDs (every ID when no filter is given)
+        """
+        sql, params = self._where(status=status, requested_by=requested_by, slug=slug)
+        return {row[0] for row in self._connect().execute(f"SELECT request_id FROM requests{sql}", params)}
+    
+    def records(self, request_ids: Iterable[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Get (request ID, copy of request) pairs for existing IDs, in the order given."""
+        request_ids = list(request_ids)
+        found = {}
+        conn = self._connect()
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(request_ids), 500):
+            batch = request_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT * FROM requests WHERE request_id IN ({','.join('?' * len(batch))})", batch
+            )
+            found.update(self._decode_rows(rows))
+        return [(request_id, found[request_id]) for request_id in request_ids if request_id in found]
+    
+    def count_by_status(self) -> Dict[str, int]:
+        """Get the number of requests per status without building a frame."""
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM requests GROUP BY status")
+        return dict(rows.fetchall())
+    
+    def frame(self, request_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Build a DataFrame of requests indexed by request ID.
+        
+        Args:
+            request_ids: IDs to include (defaults to every request)
+        
+        Returns:
+            DataFrame with REQUEST_COLUMNS, in submission order
+        """
+        if request_ids is None:
+            return self.snapshot()
+        return _to_frame(dict(self.records(request_ids)))
+    
+    def snapshot(self, status: Optional[str] = None, requested_by: Optional[str] = None) -> pd.DataFrame:
+        """
+        Build a DataFrame of the requests matching the filters as of one moment.
+        
+        The rows come from a single query, so writes from other processes are
+        either wholly included or wholly left out.
+        
+        Args:
+            status: Request status
+            requested_by: Requesting username
+        
+        Returns:
+            DataFrame as returned by frame()
+        """
+        sql, params = self._where(status=status, requested_by=requested_by)
+        rows = self._connect().execute(f"SELECT * FROM requests{sql}", params)
+        return _to_frame(dict(self._decode_rows(rows)))
+    
+    # Writes
+    
+    def add_many(self, requests: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Add new requests in one transaction.
+        
+        Args:
+            requests: Request dictionaries
+        
+        Returns:
+            The new request IDs, in order
+        """
+        rows = []
+        for request in requests:
+            record = {column: request.get(column) for column in REQUEST_COLUMNS}
+            extra = {k: _encode(v) for k, v in request.items() if k not in record}
+            rows.append(
+                [_new_request_id()]
+                + [_encode(record[column]) for column in REQUEST_COLUMNS]
+                + [request_key(record), json.dumps(extra) if extra else None]
+            )
+        if rows:
+            placeholders = ','.join('?' * len(rows[0]))
+            with self._transaction() as conn:
+                conn.executemany(f"INSERT INTO requests VALUES ({placeholders})", rows)
+        return [row[0] for row in rows]
+    
+    def add(self, request: Dict[str, Any]) -> str:
+        """Add one new request and return its ID."""
+        return self.add_many([request])[0]
+    
+    def update_many(self, request_ids: Iterable[str], audit: Optional[Dict[str, Any]] = None, **fields) -> int:
+        """
+        Set fields (e.g. status, class_type) on several requests in one transaction.
+        
+        Args:
+            request_ids: Requests to change
+            audit: Optional details of the change (who, why, which selection),
+                stored as the batch's audit record
+            **fields: Field values to set (REQUEST_COLUMNS only)
+        
+        Returns:
+            Number of requests updated
+        """
+        unknown = [field for field in fields if field not in REQUEST_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown request field(s): {', '.join(unknown)}")
+        request_ids = list(dict.fromkeys(request_ids))
+        if not request_ids or not fields:
+            return 0
+        
+        assignments = ', '.join(f"{field} = ?" for field in fields)
+        values = [_encode(value) for value in fields.values()]
+        changed = 0
+        with self._transaction() as conn:
+            for start in range(0, len(request_ids), 500):
+                batch = request_ids[start:start + 500]
+                cursor = conn.execute(
+                    f"UPDATE requests SET {assignments} WHERE request_id IN ({','.join('?' * len(batch))})",
+                    values + batch
+                )
+                changed += cursor.rowcount
+            if set(fields) & set(HISTORY_KEY_COLUMNS):
+                # The duplicate-detection key depends on these fields
+                updated = self.records(request_ids)
+                conn.executemany(
+                    "UPDATE requests SET request_key = ? WHERE request_id = ?",
+                    [(request_key(record), request_id) for request_id, record in updated]
+                )
+            if audit is not None and changed:
+                details = {
+                    'at': datetime.datetime.now().isoformat(timespec='seconds'),
+                    'count': changed,
+                    **audit
+                }
+                conn.execute(
+                    "INSERT INTO audit (fields, details) VALUES (?, ?)",
+                    (json.dumps(dict(zip(fields, values))), json.dumps(details, default=str))
+                )
+        return changed
+    
+    def update(self, request_id: str, **fields) -> bool:
+        """Set fields on one request. Returns False if it does not exist."""
+        return self.update_many([request_id], **fields) == 1
+    
+    def transition(self, request_ids: Iterable[str], status: str,
+                   class_type: Optional[str] = None, audit: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Move requests to a new status.
+        
+        Args:
+            request_ids: Requests to change
+            status: One of REQUEST_STATUSES
+            class_type: Class type to record with the change (e.g. on approval)
+            audit: Optional details of the change, see update_many
+        
+        Returns:
+            Number of requests changed
+        """
+        return self.update_many(request_ids, audit=audit, **_transition_fields(status, class_type))
+    
+    def audit_records(self) -> List[Dict[str, Any]]:
+        """
+        Read the audit record of every audited batch change, oldest first.
+        
+        Returns:
+            List of audit dictionaries, each with the new field values under 'fields'
+        """
+        rows = self._connect().execute("SELECT fields, details FROM audit ORDER BY id")
+        return [{**json.loads(details), 'fields': json.loads(fields)} for fields, details in rows]
+    
+    def remove(self, request_ids: Iterable[str]) -> int:
+        """
+        Delete requests.
+        
+        Returns:
+            Number of requests removed
+        """
+        request_ids = list(dict.fromkeys(request_ids))
+        if not request_ids:
+            return 0
+        removed = 0
+        with self._transaction() as conn:
+            for start in range(0, len(request_ids), 500):
+                batch = request_ids[start:start + 500]
+                cursor = conn.execute(
+                    f"DELETE FROM requests WHERE request_id IN ({','.join('?' * len(batch))})", batch
+                )
+                removed += cursor.rowcount
+        return removed
+    
+    def flush(self):
+        """Copy committed changes from the WAL into the main database file."""
+        self._connect().execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def close(self):
+        """Close every connection this process opened."""
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    print(f"Error closing request database: {str(e)}")
+            self._connections = []
+        self._local = threading.local()
+    
+    # Internals
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use (or after a fork)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Durable at each checkpoint rather than each commit; a crash can lose
+            # only the last transactions, never corrupt the database
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    @contextlib.contextmanager
+    def _transaction(self, bump_version: bool = True):
+        """Run a write transaction, taking the write lock up front."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            if bump_version:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'version'")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    
+    @staticmethod
+    def _where(**filters) -> Tuple[str, list]:
+        clauses = [f"{column} = ?" for column, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+    
+    @staticmethod
+    def _decode_rows(rows) -> List[Tuple[str, Dict[str, Any]]]:
+        decoded = []
+        for row in rows:
+            record = {column: row[column] for column in REQUEST_COLUMNS}
+            if row['extra']:
+                record.update(json.loads(row['extra']))
+            decoded.append((row['request_id'], _decode(record)))
+        return decoded
+
+_sequence = itertools.count()
+
+def _new_request_id() -> str:
+    """Time-ordered unique request ID, e.g. 20250613153012123456-0042-1a2b3c."""
+    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')
+    return f"{timestamp}-{next(_sequence) % 10000:04d}-{uuid.uuid4().hex[:6]}"
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_request_store():
+    """
+    Get the process-wide request store, replaying the log on first use.
+    
+    CONFIG['defaults']['request_backend'] picks the storage: 'jsonl' (one
+    server process, RequestStore) or 'sqlite' (several server processes,
+    SqliteRequestStore).
+    
+    Returns:
+        RequestStore or SqliteRequestStore instance
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if CONFIG['defaults'].get('request_backend', 'jsonl') == 'sqlite':
+                _store = SqliteRequestStore(CONFIG['paths']['requests_db'])
+            else:
+                _store = RequestStore(CONFIG['paths']['requests_file'])
+            atexit.register(_store.close)
+        return _store